@@ -2,6 +2,10 @@
 import { createContext, useContext, useState, useEffect, useRef, useCallback } from 'react';
 import api from './api';
 
+const API_BASE_URL = import.meta.env.VITE_API_URL || 'http://localhost:8000/api';
+const WS_URL = API_BASE_URL.replace(/^http/, 'ws').replace(/\/api\/?$/, '') + '/ws/';
+const RECONNECT_DELAY_MS = 5000;
+
 const NotificationContext = createContext();
 
 export function NotificationProvider({ children }) {
@@ -9,6 +13,8 @@ export function NotificationProvider({ children }) {
   const [notifications, setNotifications] = useState([]);
   const [isLoading, setIsLoading] = useState(false);
   const pollingIntervalRef = useRef(null);
+  const socketRef = useRef(null);
+  const reconnectTimerRef = useRef(null);
   const lastFetchRef = useRef(0);
   const isMountedRef = useRef(true);
 
@@ -183,22 +189,113 @@ export function NotificationProvider({ children }) {
     }
   }, []);
 
-  // Setup polling and event listeners
+  const formatNotification = (notif) => ({
+    id: notif.id,
+    type: notif.notification_type,
+    title: notif.title || getNotificationTitle(notif.notification_type),
+    message: notif.message,
+    time: formatTime(notif.created_at),
+    read: notif.read,
+    data: notif.data || {}
+  });
+
+  // Apply a push from the user's topic (see trendsync/notifications.py).
+  // Only SimpleNotification ("simple") events feed this context.
+  const handleSocketMessage = useCallback((message) => {
+    const { event, data } = message;
+    if (!event || !data) return;
+
+    if (event === 'notification.unread') {
+      setUnreadCount(data.simple || 0);
+      return;
+    }
+    if (data.source !== 'simple') return;
+
+    if (event === 'notification.created') {
+      setNotifications(prev => [
+        formatNotification(data.notification),
+        ...prev.filter(notif => notif.id !== data.notification.id)
+      ]);
+    } else if (event === 'notification.read') {
+      setNotifications(prev => prev.map(notif =>
+        data.ids === null || data.ids.includes(notif.id) ? { ...notif, read: true } : notif
+      ));
+    } else if (event === 'notification.deleted') {
+      setNotifications(prev => data.ids === null ? [] : prev.filter(notif => !data.ids.includes(notif.id)));
+    } else {
+      return;
+    }
+    setUnreadCount(prev => Math.max(0, prev + (data.unread_delta || 0)));
+  }, []);
+
+  const stopPolling = () => {
+    if (pollingIntervalRef.current) {
+      clearInterval(pollingIntervalRef.current);
+      pollingIntervalRef.current = null;
+    }
+  };
+
+  // Poll only while the socket is down
+  const startPolling = () => {
+    if (!pollingIntervalRef.current) {
+      pollingIntervalRef.current = setInterval(() => {
+        fetchNotifications();
+      }, 30000);
+    }
+  };
+
+  const closeSocket = () => {
+    clearTimeout(reconnectTimerRef.current);
+    if (socketRef.current) {
+      socketRef.current.onclose = null;
+      socketRef.current.close();
+      socketRef.current = null;
+    }
+  };
+
+  const connectSocket = useCallback(() => {
+    closeSocket();
+    const token = getToken();
+    if (!token || isUserSeller() || !isMountedRef.current) return;
+
+    const socket = new WebSocket(`${WS_URL}?token=${encodeURIComponent(token)}`);
+    socketRef.current = socket;
+
+    socket.onopen = () => {
+      stopPolling();
+      // Catch up on anything missed while disconnected
+      fetchNotifications(true);
+    };
+    socket.onmessage = (e) => {
+      try {
+        handleSocketMessage(JSON.parse(e.data));
+      } catch (error) {
+        console.error("[NotificationContext] Bad socket message:", error);
+      }
+    };
+    socket.onclose = () => {
+      socketRef.current = null;
+      if (!isMountedRef.current) return;
+      startPolling();
+      reconnectTimerRef.current = setTimeout(connectSocket, RECONNECT_DELAY_MS);
+    };
+  }, [fetchNotifications, handleSocketMessage]);
+
+  // Setup the socket and event listeners
   useEffect(() => {
     isMountedRef.current = true;
     
     // Initial fetch
     fetchNotifications(true);
 
-    // Set up polling (every 30 seconds)
-    pollingIntervalRef.current = setInterval(() => {
-      fetchNotifications();
-    }, 30000);
+    // Live updates; falls back to polling while disconnected
+    connectSocket();
 
     // Event handlers
     const handleAuthChange = () => {
       console.log("[NotificationContext] Auth changed, refreshing");
       fetchNotifications(true);
+      connectSocket();
     };
 
     const handleNewNotification = () => {
@@ -214,6 +311,7 @@ export function NotificationProvider({ children }) {
     const handleStorageChange = (e) => {
       if (e.key === 'accessToken' || e.key === 'access' || e.key === 'user') {
         fetchNotifications(true);
+        connectSocket();
       }
     };
 
@@ -226,15 +324,14 @@ export function NotificationProvider({ children }) {
     // Cleanup
     return () => {
       isMountedRef.current = false;
-      if (pollingIntervalRef.current) {
-        clearInterval(pollingIntervalRef.current);
-      }
+      stopPolling();
+      closeSocket();
       window.removeEventListener('authStateChanged', handleAuthChange);
       window.removeEventListener('newNotification', handleNewNotification);
       window.removeEventListener('followCompleted', handleFollowCompleted);
       window.removeEventListener('storage', handleStorageChange);
     };
-  }, [fetchNotifications]);
+  }, [fetchNotifications, connectSocket]);
 
   return (
     <NotificationContext.Provider value={{
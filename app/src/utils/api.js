@@ -547,9 +547,18 @@ class Api {
 
   async searchProducts(query, category = 'all') {
     const params = new URLSearchParams();
-    if (query) params.append('search', query);
     if (category && category !== 'all') params.append('category', category);
-    return this.request(`/products/?${params.toString()}`);
+    if (!query) return this.request(`/products/?${params.toString()}`);
+    // Ranked search; callers get the matching products as data, plus count and facets.
+    params.append('q', query);
+    params.append('limit', '100');
+    const res = await this.request(`/products/search/?${params.toString()}`);
+    if (res.error) return res;
+    return { ...res, data: res.data.results, count: res.data.count, facets: res.data.facets };
+  }
+
+  async suggestProducts(query) {
+    return this.request(`/products/suggest/?q=${encodeURIComponent(query)}`);
   }
 
   async changeEmail(newEmail, password) {
@@ -2,20 +2,22 @@ import os
 
 from django.core.asgi import get_asgi_application
 from channels.routing import ProtocolTypeRouter, URLRouter
-from channels.auth import AuthMiddlewareStack
 from django.urls import path
 
-from trendsync.consumers import TrendsyncConsumer
-
 os.environ.setdefault("DJANGO_SETTINGS_MODULE", "config.settings")
+django_asgi_app = get_asgi_application()
+
+from trendsync.consumers import SellerLocationConsumer, TrendsyncConsumer  # noqa: E402 (needs apps loaded)
+from trendsync.ws_auth import JWTAuthMiddlewareStack  # noqa: E402
 
 application = ProtocolTypeRouter(
     {
-        "http": get_asgi_application(),
-        "websocket": AuthMiddlewareStack(
+        "http": django_asgi_app,
+        "websocket": JWTAuthMiddlewareStack(
             URLRouter(
                 [
                     path("ws/", TrendsyncConsumer.as_asgi()),
+                    path("ws/locations/", SellerLocationConsumer.as_asgi()),
                 ]
             )
         ),
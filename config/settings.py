@@ -140,11 +140,154 @@ MEDIA_ROOT = BASE_DIR / "media"
 DEFAULT_AUTO_FIELD = "django.db.models.BigAutoField"
 
 
+# Cache
+# Set REDIS_URL (e.g. redis://127.0.0.1:6379/1) to share the cache between
+# workers; without it each process keeps its own in-memory cache.
+REDIS_URL = os.environ.get("REDIS_URL")
+
+if REDIS_URL:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.redis.RedisCache",
+            "LOCATION": REDIS_URL,
+            "KEY_PREFIX": "trendsync",
+        }
+    }
+else:
+    CACHES = {
+        "default": {
+            "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+            "LOCATION": "trendsync",
+        }
+    }
+
+PRODUCT_CACHE_TIMEOUT = 300
+
+
+# Counters (likes, helpful votes, views, followers)
+# With BUFFERED on, increments are coalesced in memory and flushed every
+# FLUSH_INTERVAL seconds or once MAX_PENDING rows are dirty.
+COUNTERS = {
+    "BUFFERED": False,
+    "FLUSH_INTERVAL": 5.0,
+    "MAX_PENDING": 1000,
+}
+
+# QuickDeal impressions are always write-behind. The 'redis' backend shares
+# one buffer between workers; drain it with `manage.py flush_quickdeal_views`.
+QUICKDEAL_VIEWS = {
+    "BACKEND": "redis" if REDIS_URL else "local",
+    "REDIS_URL": REDIS_URL,
+    "FLUSH_INTERVAL": 10.0,
+    "MAX_PENDING": 500,
+}
+
+
+# DusuPay HTTP client: pooled keep-alive session, bounded retries with
+# jittered backoff, and a circuit breaker that opens after BREAKER_THRESHOLD
+# consecutive failures for BREAKER_RESET seconds.
+DUSUPAY_HTTP = {
+    "POOL_SIZE": 10,
+    "CONNECT_TIMEOUT": 3.05,
+    "READ_TIMEOUT": 15,
+    "MAX_RETRIES": 2,
+    "BACKOFF": 0.25,
+    "BACKOFF_CAP": 2.0,
+    "BREAKER_THRESHOLD": 5,
+    "BREAKER_RESET": 30.0,
+}
+
+# Pending-payment reconciliation (manage.py reconcile_payments): orders are
+# polled CONCURRENCY at a time, BATCH_SIZE per pass, with backoff doubling
+# from BACKOFF up to BACKOFF_CAP seconds while the gateway says pending.
+# Pending orders that never started a payment are cancelled, and their
+# reserved stock released, UNPAID_EXPIRY seconds after checkout.
+DUSUPAY_RECONCILE = {
+    "BATCH_SIZE": 100,
+    "CONCURRENCY": 4,
+    "BACKOFF": 30,
+    "BACKOFF_CAP": 3600,
+    "UNPAID_EXPIRY": 3600,
+}
+
+
+# Reverse geocoding for seller locations. Addresses are cached per geohash
+# cell (PRECISION 7 is about 150 m) for TTL seconds, and misses are looked up
+# by WORKERS background threads. Use trendsync.geocoding.StubGeocoder offline.
+GEOCODER = {
+    "BACKEND": "trendsync.geocoding.NominatimGeocoder",
+    "PRECISION": 7,
+    "TTL": 86400,
+    "MAX_ENTRIES": 10000,
+    "WORKERS": 1,
+    "ASYNC": True,
+}
+
+
+# Product search (/api/products/search/, ?search= on the product list).
+# BACKEND defaults to the SQLite FTS5 index, or to icontains matching
+# (products.services.search.DatabaseSearchBackend) on other databases.
+# PRICE_BUCKETS are the upper bounds of the price facet buckets.
+PRODUCT_SEARCH = {
+    "PRICE_BUCKETS": [10000, 50000, 100000, 500000],
+}
+
+
+# Seller location streaming (ws/locations/): buyers get at most one update
+# per BROADCAST_INTERVAL seconds per seller; the Seller row is written once
+# the seller moves PERSIST_DISTANCE_M metres or every PERSIST_INTERVAL seconds.
+LOCATION_STREAM = {
+    "BROADCAST_INTERVAL": 1.0,
+    "PERSIST_INTERVAL": 30.0,
+    "PERSIST_DISTANCE_M": 100,
+}
+
+
 # Django Channels
-CHANNEL_LAYERS = {
-    "default": {
-        "BACKEND": "channels.layers.InMemoryChannelLayer"
+# The in-memory layer only reaches consumers in the same process. With more
+# than one Daphne worker set CHANNEL_REDIS_URL (defaults to REDIS_URL) so
+# group sends cross processes; CHANNEL_LAYER=redis-pubsub selects the
+# pub/sub variant. Tests always use the in-memory layer (TEST_RUNNER below).
+CHANNEL_REDIS_URL = os.environ.get("CHANNEL_REDIS_URL", REDIS_URL)
+CHANNEL_LAYER = os.environ.get("CHANNEL_LAYER", "redis" if CHANNEL_REDIS_URL else "memory")
+
+if CHANNEL_LAYER == "redis":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.core.RedisChannelLayer",
+            "CONFIG": {
+                "hosts": [CHANNEL_REDIS_URL],
+                "prefix": "trendsync",
+                "capacity": 1000,
+                "expiry": 60,
+            },
+        }
+    }
+elif CHANNEL_LAYER == "redis-pubsub":
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels_redis.pubsub.RedisPubSubChannelLayer",
+            "CONFIG": {
+                "hosts": [CHANNEL_REDIS_URL],
+                "prefix": "trendsync",
+            },
+        }
     }
+else:
+    CHANNEL_LAYERS = {
+        "default": {
+            "BACKEND": "channels.layers.InMemoryChannelLayer"
+        }
+    }
+
+TEST_RUNNER = "config.test_runner.TestRunner"
+
+# Topic publishes to a network channel layer are coalesced per group for
+# BATCH_WINDOW seconds (at most BATCH_MAX messages) and sent as one
+# group_send. Set BATCH_WINDOW to 0 to send every message on its own.
+REALTIME = {
+    "BATCH_WINDOW": 0.01,
+    "BATCH_MAX": 100,
 }
 
 
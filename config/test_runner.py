@@ -0,0 +1,20 @@
+from django.test.runner import DiscoverRunner
+from django.test.utils import override_settings
+
+
+class TestRunner(DiscoverRunner):
+    """
+    Runs the suite on the in-memory channel layer, whatever CHANNEL_LAYER or
+    REDIS_URL are set to, so tests never need (or write to) Redis.
+    """
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._channel_layers = override_settings(
+            CHANNEL_LAYERS={"default": {"BACKEND": "channels.layers.InMemoryChannelLayer"}}
+        )
+        self._channel_layers.enable()
+
+    def teardown_test_environment(self, **kwargs):
+        self._channel_layers.disable()
+        super().teardown_test_environment(**kwargs)
@@ -0,0 +1,126 @@
+import os
+import random
+import sqlite3
+import statistics
+import tempfile
+import time
+
+from django.core.management.base import BaseCommand
+
+from products.services.search import configure_rank_sql, create_table_sql, match_expression
+
+ADJECTIVES = [
+    'red', 'blue', 'green', 'black', 'white', 'fresh', 'organic', 'local', 'large', 'small',
+    'leather', 'cotton', 'wooden', 'steel', 'handmade', 'vintage', 'premium', 'classic', 'smart', 'portable',
+]
+NOUNS = [
+    'shoes', 'shirt', 'dress', 'bag', 'phone', 'charger', 'tomatoes', 'bananas', 'matooke', 'beans',
+    'chair', 'table', 'lamp', 'radio', 'kettle', 'blender', 'watch', 'sandals', 'jacket', 'mattress',
+    'bicycle', 'helmet', 'speaker', 'headphones', 'backpack', 'saucepan', 'charcoal', 'sugar', 'rice', 'coffee',
+]
+FILLER = [
+    'quality', 'delivered', 'kampala', 'wholesale', 'retail', 'brand', 'new', 'durable', 'original', 'warranty',
+    'available', 'stock', 'price', 'negotiable', 'genuine', 'imported', 'market', 'daily', 'season', 'offer',
+]
+
+PAGE_SIZE = 20
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark product search on a throwaway SQLite database of synthetic "
+        "products: LIKE '%term%' scans vs the FTS5 index (ranked and prefix)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--products', type=int, default=1_000_000, help="Synthetic products to generate")
+        parser.add_argument('--queries', type=int, default=50, help="Queries per strategy")
+        parser.add_argument('--seed', type=int, default=1)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        fd, path = tempfile.mkstemp(suffix='.sqlite3')
+        os.close(fd)
+        try:
+            db = sqlite3.connect(path)
+            self.populate(db, rng, options['products'])
+            queries = [self.query(rng) for _ in range(options['queries'])]
+            self.report('LIKE scan', [self.time(self.like, db, query) for query in queries])
+            self.report('FTS ranked', [self.time(self.fts, db, query) for query in queries])
+            self.report('FTS + category', [self.time(self.fts_category, db, query, rng.randint(1, 20))
+                                           for query in queries])
+            self.report('FTS prefix', [self.time(self.prefix, db, query[:3]) for query in queries])
+            db.close()
+        finally:
+            os.remove(path)
+
+    def populate(self, db, rng, count):
+        self.stdout.write(f"Generating {count} products...")
+        db.execute(
+            "CREATE TABLE product (id INTEGER PRIMARY KEY, category_id INTEGER, "
+            "unit_price INTEGER, name TEXT, description TEXT)"
+        )
+        db.execute("CREATE INDEX product_category ON product (category_id)")
+        db.execute(create_table_sql())
+        db.execute(configure_rank_sql())
+        started = time.perf_counter()
+        batch = []
+        for product_id in range(1, count + 1):
+            name = f"{rng.choice(ADJECTIVES)} {rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+            description = ' '.join(rng.choice(FILLER + NOUNS) for _ in range(12))
+            batch.append((product_id, rng.randint(1, 20), rng.randint(1, 1000) * 1000, name, description))
+            if len(batch) == 10_000 or product_id == count:
+                db.executemany("INSERT INTO product VALUES (?, ?, ?, ?, ?)", batch)
+                db.executemany(
+                    "INSERT INTO product_search(rowid, name, description) VALUES (?, ?, ?)",
+                    [(row[0], row[3], row[4]) for row in batch],
+                )
+                batch = []
+        db.commit()
+        self.stdout.write(f"Built table and index in {time.perf_counter() - started:.1f}s")
+
+    def query(self, rng):
+        return f"{rng.choice(ADJECTIVES)} {rng.choice(NOUNS)}"
+
+    def time(self, strategy, db, *args):
+        started = time.perf_counter()
+        strategy(db, *args)
+        return (time.perf_counter() - started) * 1000
+
+    def like(self, db, query):
+        # What SearchFilter generated: every word in name OR description.
+        clauses, params = [], []
+        for word in query.split():
+            clauses.append("(name LIKE ? OR description LIKE ?)")
+            params += [f'%{word}%', f'%{word}%']
+        where = ' AND '.join(clauses)
+        db.execute(f"SELECT id FROM product WHERE {where} ORDER BY id DESC LIMIT {PAGE_SIZE}", params).fetchall()
+        db.execute(f"SELECT count(*) FROM product WHERE {where}", params).fetchone()
+
+    def fts(self, db, query):
+        expression = match_expression(query)
+        db.execute(
+            "SELECT rowid FROM product_search WHERE product_search MATCH ? ORDER BY rank LIMIT ?",
+            [expression, PAGE_SIZE],
+        ).fetchall()
+        db.execute("SELECT count(*) FROM product_search WHERE product_search MATCH ?", [expression]).fetchone()
+
+    def fts_category(self, db, query, category_id):
+        db.execute(
+            "SELECT rowid FROM product_search WHERE product_search MATCH ? "
+            "AND +rowid IN (SELECT id FROM product WHERE category_id = ?) ORDER BY rank LIMIT ?",
+            [match_expression(query), category_id, PAGE_SIZE],
+        ).fetchall()
+
+    def prefix(self, db, text):
+        db.execute(
+            "SELECT rowid, name FROM product_search WHERE product_search MATCH ? ORDER BY rank LIMIT 8",
+            [match_expression(text, column='name')],
+        ).fetchall()
+
+    def report(self, label, timings):
+        timings.sort()
+        p95 = timings[min(len(timings) - 1, int(len(timings) * 0.95))]
+        self.stdout.write(self.style.SUCCESS(
+            f"{label:<16} p50 {statistics.median(timings):8.1f} ms   p95 {p95:8.1f} ms   max {timings[-1]:8.1f} ms"
+        ))
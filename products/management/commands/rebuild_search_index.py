@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from products.services.search import rebuild_index
+
+
+class Command(BaseCommand):
+    help = "Rebuild the product full-text search index from the product table"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding product search index...")
+        total = rebuild_index()
+        self.stdout.write(self.style.SUCCESS(f"Indexed {total} products."))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from products.services.trending import rebuild_trending_rollups
+
+
+class Command(BaseCommand):
+    help = "Rebuild the daily trending rollup table from order history"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding trending rollups...")
+        total = rebuild_trending_rollups()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} rollup buckets."))
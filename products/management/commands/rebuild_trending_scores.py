@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from products.services.trending import rebuild_trending_scores
+
+
+class Command(BaseCommand):
+    help = "Rebuild the time-decayed trending scores from order history"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding decayed trending scores...")
+        total = rebuild_trending_scores()
+        self.stdout.write(self.style.SUCCESS(f"Scored {total} products."))
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from products.services.feed_scores import refresh_product_scores
+from products.services.ratings import recompute_product_ratings
+
+
+class Command(BaseCommand):
+    help = "Recompute product rating count/mean from comments and report or fix drift"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--check', action='store_true', help="Only report drifted products; don't write")
+
+    def handle(self, *args, **options):
+        self.stdout.write("Recomputing product rating aggregates...")
+        drifted = recompute_product_ratings(fix=not options['check'])
+        if not drifted:
+            self.stdout.write(self.style.SUCCESS("No drift found."))
+            return
+        preview = ', '.join(str(product_id) for product_id in drifted[:20])
+        more = f" (+{len(drifted) - 20} more)" if len(drifted) > 20 else ''
+        if options['check']:
+            self.stdout.write(self.style.WARNING(f"{len(drifted)} products drifted: {preview}{more}"))
+            return
+        refresh_product_scores(drifted)
+        self.stdout.write(self.style.SUCCESS(f"Fixed {len(drifted)} drifted products: {preview}{more}"))
@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from products.services.feed_scores import rebuild_feed_scores
+
+
+class Command(BaseCommand):
+    help = "Recompute the materialized home-feed score for every product"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Refreshing feed scores...")
+        total = rebuild_feed_scores()
+        self.stdout.write(self.style.SUCCESS(f"Refreshed {total} feed scores."))
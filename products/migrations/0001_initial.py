@@ -0,0 +1,36 @@
+# Generated by Django 6.1.2 on 2026-10-16 23:53
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    initial = True
+
+    dependencies = [
+        ('trendsync', '0009_alter_quickdeal_options_remove_quickdeal_priority_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductFeedScore',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='feed_score', serialize=False, to='trendsync.product')),
+                ('seller_location', models.CharField(blank=True, max_length=200)),
+                ('date_of_post', models.DateTimeField()),
+                ('recent_likes', models.PositiveIntegerField(default=0)),
+                ('recent_comments', models.PositiveIntegerField(default=0)),
+                ('avg_rating', models.FloatField(default=0.0)),
+                ('price_score', models.FloatField(default=0.0)),
+                ('seller_score', models.FloatField(default=0.0)),
+                ('interaction_score', models.FloatField(default=0.0)),
+                ('popularity_score', models.FloatField(default=0.0)),
+                ('final_score', models.FloatField(default=0.0)),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-final_score', '-date_of_post'], name='feed_score_rank_idx'), models.Index(fields=['seller_location', '-final_score', '-date_of_post'], name='feed_score_location_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-16 23:58
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0001_initial'),
+        ('trendsync', '0009_alter_quickdeal_options_remove_quickdeal_priority_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='TrendingRollup',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('bucket', models.DateField()),
+                ('units_sold', models.PositiveIntegerField(default=0)),
+                ('purchase_count', models.PositiveIntegerField(default=0)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='trendsync.category')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='trending_rollups', to='trendsync.product')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['bucket'], name='trending_bucket_idx'), models.Index(fields=['location', 'bucket'], name='trending_location_idx'), models.Index(fields=['category', 'bucket'], name='trending_category_idx')],
+                'unique_together': {('product', 'bucket')},
+            },
+        ),
+    ]
@@ -0,0 +1,28 @@
+# Generated by Django 6.1.2 on 2026-10-16 23:59
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0002_trendingrollup'),
+        ('trendsync', '0009_alter_quickdeal_options_remove_quickdeal_priority_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ProductTrendScore',
+            fields=[
+                ('product', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='decayed_trend', serialize=False, to='trendsync.product')),
+                ('location', models.CharField(blank=True, max_length=200)),
+                ('log_score', models.FloatField()),
+                ('updated_at', models.DateTimeField(auto_now=True)),
+                ('category', models.ForeignKey(blank=True, null=True, on_delete=django.db.models.deletion.SET_NULL, related_name='+', to='trendsync.category')),
+            ],
+            options={
+                'indexes': [models.Index(fields=['-log_score'], name='trend_score_rank_idx'), models.Index(fields=['location', '-log_score'], name='trend_score_location_idx'), models.Index(fields=['category', '-log_score'], name='trend_score_category_idx')],
+            },
+        ),
+    ]
@@ -0,0 +1,37 @@
+from django.db import migrations
+
+
+def create_search_index(apps, schema_editor):
+    # FTS5 index for products.services.search.SQLiteFTSBackend; other
+    # databases use the icontains backend and need no table.
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute(
+            "CREATE VIRTUAL TABLE IF NOT EXISTS product_search USING fts5("
+            "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+        )
+        cursor.execute("INSERT INTO product_search(product_search, rank) VALUES ('rank', 'bm25(10.0, 1.0)')")
+        cursor.execute(
+            "INSERT INTO product_search(rowid, name, description) "
+            "SELECT id, name, description FROM trendsync_product"
+        )
+
+
+def drop_search_index(apps, schema_editor):
+    if schema_editor.connection.vendor != 'sqlite':
+        return
+    with schema_editor.connection.cursor() as cursor:
+        cursor.execute("DROP TABLE IF EXISTS product_search")
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('products', '0003_producttrendscore'),
+        ('trendsync', '0017_verified_purchase'),
+    ]
+
+    operations = [
+        migrations.RunPython(create_search_index, drop_search_index),
+    ]
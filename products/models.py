@@ -1,3 +1,82 @@
 from django.db import models
 
-# Create your models here.
+from trendsync.models import Product, Category
+
+
+class ProductFeedScore(models.Model):
+    """
+    Materialized home-feed ranking for a product.
+    Rows are refreshed by products.services.feed_scores whenever likes,
+    comments, sales or seller stats change, so the feed never aggregates.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='feed_score')
+    seller_location = models.CharField(max_length=200, blank=True)
+    date_of_post = models.DateTimeField()
+    recent_likes = models.PositiveIntegerField(default=0)
+    recent_comments = models.PositiveIntegerField(default=0)
+    avg_rating = models.FloatField(default=0.0)
+    price_score = models.FloatField(default=0.0)
+    seller_score = models.FloatField(default=0.0)
+    interaction_score = models.FloatField(default=0.0)
+    popularity_score = models.FloatField(default=0.0)
+    final_score = models.FloatField(default=0.0)
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-final_score', '-date_of_post'], name='feed_score_rank_idx'),
+            models.Index(fields=['seller_location', '-final_score', '-date_of_post'], name='feed_score_location_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.final_score:.4f}"
+
+
+class TrendingRollup(models.Model):
+    """
+    Daily sales totals per product, bucketed by order date. Maintained as
+    orders become paid so trending is a range-sum over a few small rows.
+    """
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='trending_rollups')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    location = models.CharField(max_length=200, blank=True)
+    bucket = models.DateField()
+    units_sold = models.PositiveIntegerField(default=0)
+    purchase_count = models.PositiveIntegerField(default=0)
+
+    class Meta:
+        unique_together = ('product', 'bucket')
+        indexes = [
+            models.Index(fields=['bucket'], name='trending_bucket_idx'),
+            models.Index(fields=['location', 'bucket'], name='trending_location_idx'),
+            models.Index(fields=['category', 'bucket'], name='trending_category_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id} @ {self.bucket}: {self.units_sold}"
+
+
+class ProductTrendScore(models.Model):
+    """
+    Exponentially time-decayed sales score for a product.
+
+    log_score is stored as log2(sum(units * 2 ** (t / half_life))), a forward
+    decay against a fixed epoch: a new sale is one O(1) update, older sales
+    never need rewriting, and ordering by log_score equals ordering by the
+    decayed score at any moment.
+    """
+    product = models.OneToOneField(Product, on_delete=models.CASCADE, primary_key=True, related_name='decayed_trend')
+    category = models.ForeignKey(Category, on_delete=models.SET_NULL, null=True, blank=True, related_name='+')
+    location = models.CharField(max_length=200, blank=True)
+    log_score = models.FloatField()
+    updated_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['-log_score'], name='trend_score_rank_idx'),
+            models.Index(fields=['location', '-log_score'], name='trend_score_location_idx'),
+            models.Index(fields=['category', '-log_score'], name='trend_score_category_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.product_id}: {self.log_score:.4f}"
@@ -1,5 +1,5 @@
-from django.db.models import Count, Avg, F, FloatField, ExpressionWrapper
-from django.db.models.functions import Coalesce
+from django.db.models import Count, F, FloatField, ExpressionWrapper
+from django.db.models.functions import Cast
 from trendsync.models import Product, Buyer
 from decimal import Decimal
 
@@ -9,8 +9,10 @@ def base_feed_queryset():
         .select_related('seller', 'category')
         .annotate(
             recent_likes=Count('likes', distinct=True),
-            recent_comments=Count('comments', distinct=True),
-            avg_rating=Coalesce(Avg('comments__rating'), 0.0),
+            # Every comment carries a rating, so the denormalized rating
+            # columns stand in for a join over comments.
+            recent_comments=F('rating_number'),
+            avg_rating=Cast('rating_magnitude', FloatField()),
         )
     )
 
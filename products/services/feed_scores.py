@@ -0,0 +1,99 @@
+from django.db import transaction
+from django.db.models import F
+from django.utils import timezone
+from trendsync.models import Product
+from products.models import ProductFeedScore
+from products.services.algorithm import ranked_feed_queryset
+
+SCORE_FIELDS = [
+    'recent_likes', 'recent_comments', 'avg_rating', 'price_score',
+    'seller_score', 'interaction_score', 'popularity_score', 'final_score',
+]
+
+REFRESH_BATCH_SIZE = 500
+
+# Seller columns that feed into seller_score or the location filter.
+SELLER_RANKING_FIELDS = {'sales', 'trust', 'followers', 'location'}
+
+
+def refresh_product_scores(product_ids):
+    """
+    Recompute and upsert the feed score rows for the given products.
+    Only the listed products are aggregated, so a single like or comment
+    costs one indexed per-product aggregate instead of a catalog scan.
+    """
+    product_ids = list(set(product_ids))
+    if not product_ids:
+        return 0
+
+    now = timezone.now()
+    rows = []
+    for start in range(0, len(product_ids), REFRESH_BATCH_SIZE):
+        batch = product_ids[start:start + REFRESH_BATCH_SIZE]
+        values = (
+            ranked_feed_queryset()
+            .filter(id__in=batch)
+            .order_by()
+            .values('id', 'date_of_post', 'seller__location', *SCORE_FIELDS)
+        )
+        for v in values:
+            rows.append(ProductFeedScore(
+                product_id=v['id'],
+                seller_location=(v['seller__location'] or '').lower(),
+                date_of_post=v['date_of_post'],
+                updated_at=now,
+                **{field: v[field] or 0 for field in SCORE_FIELDS},
+            ))
+
+    ProductFeedScore.objects.bulk_create(
+        rows,
+        batch_size=REFRESH_BATCH_SIZE,
+        update_conflicts=True,
+        unique_fields=['product'],
+        update_fields=['seller_location', 'date_of_post', 'updated_at', *SCORE_FIELDS],
+    )
+    return len(rows)
+
+
+def refresh_seller_scores(seller_ids):
+    product_ids = Product.objects.filter(seller_id__in=seller_ids).values_list('id', flat=True)
+    return refresh_product_scores(product_ids)
+
+
+def rebuild_feed_scores():
+    """Refresh every product's score, e.g. after deploying or changing weights."""
+    total = 0
+    product_ids = list(Product.objects.order_by('id').values_list('id', flat=True))
+    for start in range(0, len(product_ids), REFRESH_BATCH_SIZE):
+        total += refresh_product_scores(product_ids[start:start + REFRESH_BATCH_SIZE])
+    return total
+
+
+def schedule_refresh(product_ids=(), seller_ids=()):
+    """
+    Refresh scores once the surrounding transaction commits, so a rolled
+    back like or comment never leaks into the feed.
+    """
+    product_ids = list(product_ids)
+    seller_ids = list(seller_ids)
+    if product_ids:
+        transaction.on_commit(lambda: refresh_product_scores(product_ids))
+    if seller_ids:
+        transaction.on_commit(lambda: refresh_seller_scores(seller_ids))
+
+
+def home_feed_queryset(location=None):
+    """
+    Products ordered by their materialized feed score. The ORDER BY runs
+    against ProductFeedScore's composite indexes instead of aggregating
+    likes and comments across the catalog.
+    """
+    qs = Product.objects.select_related('seller', 'category').filter(feed_score__isnull=False)
+
+    if location:
+        qs = qs.filter(feed_score__seller_location=location.lower())
+
+    return (
+        qs.annotate(final_score=F('feed_score__final_score'))
+        .order_by('-feed_score__final_score', '-feed_score__date_of_post')
+    )
@@ -0,0 +1,102 @@
+from functools import reduce
+from operator import or_
+
+from django.db.models import Count, Q
+
+from trendsync.geo import covering_cells, haversine_km
+from trendsync.models import Product, Seller
+
+NEARBY_DEFAULT_RADIUS_KM = 5.0
+NEARBY_MAX_RADIUS_KM = 200.0
+NEARBY_DEFAULT_LIMIT = 50
+NEARBY_MAX_LIMIT = 200
+
+
+def sellers_within(lat, lng, radius_km, location_type=None):
+    """
+    Sellers within `radius_km` of (lat, lng), nearest first, each with a
+    `distance_km` attribute. The geohash prefix filter prunes candidates to
+    nine cells via the location_geohash index, and exact haversine distance
+    is only computed for those.
+    """
+    qs = Seller.objects.filter(location_lat__isnull=False, location_lng__isnull=False)
+    cells = covering_cells(lat, lng, radius_km)
+    if cells is not None:
+        qs = qs.filter(reduce(or_, [Q(location_geohash__startswith=cell) for cell in cells]))
+    if location_type:
+        qs = qs.filter(location_type=location_type)
+
+    sellers = []
+    for seller in qs:
+        distance = haversine_km(lat, lng, seller.location_lat, seller.location_lng)
+        if distance <= radius_km:
+            seller.distance_km = distance
+            sellers.append(seller)
+    sellers.sort(key=lambda seller: (seller.distance_km, seller.id))
+    return sellers
+
+
+def nearest_sellers(lat, lng, radius_km=NEARBY_DEFAULT_RADIUS_KM, limit=NEARBY_DEFAULT_LIMIT, location_type=None):
+    return sellers_within(lat, lng, radius_km, location_type=location_type)[:limit]
+
+
+def products_within(lat, lng, radius_km=NEARBY_DEFAULT_RADIUS_KM, limit=NEARBY_DEFAULT_LIMIT,
+                    category_id=None, location_type=None):
+    """
+    Products whose seller is within `radius_km`, nearest seller first and
+    newest product first within a seller. Each product has `distance_km`.
+    """
+    distances = {
+        seller.id: seller.distance_km
+        for seller in sellers_within(lat, lng, radius_km, location_type=location_type)
+    }
+    if not distances:
+        return []
+
+    qs = Product.objects.all()
+    if category_id:
+        qs = qs.filter(category_id=category_id)
+
+    # Walk sellers nearest first using per-seller product counts, so the page
+    # is loaded from at most `limit` sellers and ordered here rather than by
+    # a CASE with one branch per seller in the radius.
+    counts = dict(
+        qs.filter(seller_id__in=list(distances)).order_by()
+        .values('seller_id').annotate(count=Count('id')).values_list('seller_id', 'count')
+    )
+    page_sellers, remaining = [], limit
+    for seller_id in distances:
+        if seller_id in counts:
+            page_sellers.append(seller_id)
+            remaining -= counts[seller_id]
+            if remaining <= 0:
+                break
+    if not page_sellers:
+        return []
+
+    newest_first = ('-date_of_post', '-id')
+    *whole, last = page_sellers
+    products = list(qs.filter(seller_id__in=whole).order_by(*newest_first)) if whole else []
+    products += qs.filter(seller_id=last).order_by(*newest_first)[:limit - len(products)]
+    rank = {seller_id: index for index, seller_id in enumerate(page_sellers)}
+    products.sort(key=lambda product: rank[product.seller_id])  # stable: newest first within a seller
+
+    for product in products:
+        product.distance_km = distances[product.seller_id]
+    return products
+
+
+def parse_nearby_query(params):
+    """
+    (lat, lng, radius_km, limit) from query params; raises ValueError on
+    missing or out-of-range coordinates. Radius and limit are clamped.
+    """
+    lat = float(params['lat'])
+    lng = float(params['lng'])
+    if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+        raise ValueError('Coordinates out of range')
+    radius_km = float(params.get('radius_km', NEARBY_DEFAULT_RADIUS_KM))
+    radius_km = max(0.01, min(radius_km, NEARBY_MAX_RADIUS_KM))
+    limit = int(params.get('limit', NEARBY_DEFAULT_LIMIT))
+    limit = max(1, min(limit, NEARBY_MAX_LIMIT))
+    return lat, lng, radius_km, limit
@@ -0,0 +1,72 @@
+from decimal import Decimal
+
+from django.db.models import Count, DecimalField, ExpressionWrapper, F, Sum, Value
+from django.db.models.functions import Coalesce, Greatest, Round
+
+from trendsync.models import Product
+
+RECOMPUTE_BATCH_SIZE = 500
+
+
+def mean_rating(rating_sum, rating_number):
+    """
+    rating_sum / rating_number rounded to 2 places by the database. Both the
+    incremental update and the reconcile use it, so a half-way mean is
+    rounded the same way on each side and never reported as drift.
+    """
+    mean = ExpressionWrapper(
+        rating_sum * Value(Decimal('1.00')) / Greatest(rating_number, Value(1)),
+        output_field=DecimalField(max_digits=4, decimal_places=2),
+    )
+    return Round(mean, 2)
+
+
+def apply_rating_change(product_id, sum_delta, count_delta):
+    """
+    Fold one comment's rating change into Product.rating_sum / rating_number
+    and recompute rating_magnitude, all in a single UPDATE so concurrent
+    comments never lose an increment. Pass (rating, 1) for a new comment,
+    (-rating, -1) for a deleted one and (new - old, 0) for an edit.
+    """
+    if not sum_delta and not count_delta:
+        return 0
+    new_sum = F('rating_sum') + sum_delta
+    new_number = F('rating_number') + count_delta
+    # SET expressions read the pre-update row, so the mean uses the new totals.
+    return Product.objects.filter(id=product_id).update(
+        rating_sum=new_sum,
+        rating_number=new_number,
+        rating_magnitude=mean_rating(new_sum, new_number),
+    )
+
+
+def recompute_product_ratings(product_ids=None, fix=True):
+    """
+    Recompute rating aggregates from ProductComment rows in batches and
+    return the ids whose stored values had drifted. With fix=True the
+    drifted rows are corrected with bulk_update.
+    """
+    products = Product.objects.order_by('id')
+    if product_ids is not None:
+        products = products.filter(id__in=list(product_ids))
+    ids = list(products.values_list('id', flat=True))
+
+    drifted = []
+    for start in range(0, len(ids), RECOMPUTE_BATCH_SIZE):
+        batch = ids[start:start + RECOMPUTE_BATCH_SIZE]
+        totals = {
+            row['id']: row
+            for row in Product.objects.filter(id__in=batch).order_by()
+            .values('id').annotate(total=Coalesce(Sum('comments__rating'), 0), count=Count('comments'))
+            .annotate(magnitude=mean_rating(F('total'), F('count')))
+        }
+        stale = []
+        for product in Product.objects.filter(id__in=batch).only('id', 'rating_sum', 'rating_number', 'rating_magnitude'):
+            total, count, magnitude = (totals[product.id][key] for key in ('total', 'count', 'magnitude'))
+            if (product.rating_sum, product.rating_number, product.rating_magnitude) != (total, count, magnitude):
+                product.rating_sum, product.rating_number, product.rating_magnitude = total, count, magnitude
+                stale.append(product)
+        if fix and stale:
+            Product.objects.bulk_update(stale, ['rating_sum', 'rating_number', 'rating_magnitude'])
+        drifted.extend(product.id for product in stale)
+    return drifted
@@ -0,0 +1,296 @@
+"""
+Product search.
+
+SQLiteFTSBackend keeps an FTS5 table (rowid = product id) in step with
+Product saves and deletes and ranks matches with BM25, weighting the name
+above the description. The last word of a query is matched as a prefix, so
+as-you-type searches use the FTS prefix index instead of LIKE '%term%'
+scans. DatabaseSearchBackend is the icontains fallback for databases
+without FTS5; select one with PRODUCT_SEARCH['BACKEND'].
+"""
+import re
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection
+from django.db.models import Case, Count, IntegerField, Q, Value, When
+from django.db.models.expressions import RawSQL
+from django.utils.module_loading import import_string
+
+from trendsync.models import Category, Product
+
+FTS_TABLE = 'product_search'
+NAME_WEIGHT = 10.0
+DESCRIPTION_WEIGHT = 1.0
+
+SEARCH_DEFAULT_LIMIT = 20
+SEARCH_MAX_LIMIT = 100
+SUGGEST_LIMIT = 8
+
+# Fields whose changes require reindexing a product.
+INDEXED_FIELDS = {'name', 'description'}
+
+TOKEN_RE = re.compile(r'\w+')
+
+
+def _setting(name, default):
+    return getattr(settings, 'PRODUCT_SEARCH', {}).get(name, default)
+
+
+def create_table_sql(table=FTS_TABLE):
+    return (
+        f"CREATE VIRTUAL TABLE IF NOT EXISTS {table} USING fts5("
+        "name, description, tokenize='unicode61 remove_diacritics 2', prefix='2 3')"
+    )
+
+
+def configure_rank_sql(table=FTS_TABLE):
+    # Persist the BM25 column weights so ORDER BY rank uses them.
+    return f"INSERT INTO {table}({table}, rank) VALUES ('rank', 'bm25({NAME_WEIGHT}, {DESCRIPTION_WEIGHT})')"
+
+
+def match_expression(text, prefix=True, column=None):
+    """
+    FTS5 query for free text: every word must match and the last one may be
+    a prefix ('red sho' -> '"red" "sho"*'). Words are quoted, so user input
+    never reaches the FTS query syntax. None when there is nothing to match.
+    """
+    tokens = TOKEN_RE.findall((text or '').lower())
+    if not tokens:
+        return None
+    terms = [f'"{token}"' for token in tokens]
+    if prefix:
+        terms[-1] += '*'
+    expression = ' '.join(terms)
+    if column:
+        expression = f'{column} : ({expression})'
+    return expression
+
+
+def product_filters(category_id=None, min_price=None, max_price=None):
+    filters = Q()
+    if category_id:
+        filters &= Q(category_id=category_id)
+    if min_price is not None:
+        filters &= Q(unit_price__gte=min_price)
+    if max_price is not None:
+        filters &= Q(unit_price__lte=max_price)
+    return filters
+
+
+class SQLiteFTSBackend:
+    table = FTS_TABLE
+
+    def index(self, products):
+        rows = [(product.id, product.name, product.description or '') for product in products]
+        if rows:
+            with connection.cursor() as cursor:
+                cursor.executemany(
+                    f"INSERT OR REPLACE INTO {self.table}(rowid, name, description) VALUES (%s, %s, %s)", rows
+                )
+
+    def remove(self, product_ids):
+        product_ids = list(product_ids)
+        if product_ids:
+            placeholders = ', '.join(['%s'] * len(product_ids))
+            with connection.cursor() as cursor:
+                cursor.execute(f"DELETE FROM {self.table} WHERE rowid IN ({placeholders})", product_ids)
+
+    def clear(self):
+        with connection.cursor() as cursor:
+            cursor.execute(f"DELETE FROM {self.table}")
+
+    def matches(self, text):
+        expression = match_expression(text)
+        if expression is None:
+            return Product.objects.none()
+        return Product.objects.filter(
+            id__in=RawSQL(f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s", [expression])
+        )
+
+    def ranked_ids(self, text, filters, limit, offset):
+        expression = match_expression(text)
+        if expression is None:
+            return []
+        sql = f"SELECT rowid FROM {self.table} WHERE {self.table} MATCH %s"
+        params = [expression]
+        if filters:
+            subquery, subquery_params = Product.objects.filter(filters).values('id').query.sql_with_params()
+            # Unary + keeps SQLite from turning the IN list into rowid lookups
+            # on the FTS table, which re-runs the MATCH once per candidate.
+            sql += f" AND +rowid IN ({subquery})"
+            params.extend(subquery_params)
+        sql += " ORDER BY rank LIMIT %s OFFSET %s"
+        params.extend([limit, offset])
+        with connection.cursor() as cursor:
+            cursor.execute(sql, params)
+            return [row[0] for row in cursor.fetchall()]
+
+    def suggest(self, text, limit):
+        expression = match_expression(text, column='name')
+        if expression is None:
+            return []
+        with connection.cursor() as cursor:
+            cursor.execute(
+                f"SELECT rowid, name FROM {self.table} WHERE {self.table} MATCH %s ORDER BY rank LIMIT %s",
+                [expression, limit],
+            )
+            return [{'id': row[0], 'name': row[1]} for row in cursor.fetchall()]
+
+
+class DatabaseSearchBackend:
+    """icontains matching for databases without FTS5; nothing to index."""
+
+    def index(self, products):
+        pass
+
+    def remove(self, product_ids):
+        pass
+
+    def clear(self):
+        pass
+
+    def _word_filter(self, text, fields):
+        tokens = TOKEN_RE.findall((text or '').lower())
+        if not tokens:
+            return None
+        condition = Q()
+        for token in tokens:
+            condition &= Q(*[Q(**{f'{field}__icontains': token}) for field in fields], _connector=Q.OR)
+        return condition
+
+    def matches(self, text):
+        condition = self._word_filter(text, ['name', 'description'])
+        if condition is None:
+            return Product.objects.none()
+        return Product.objects.filter(condition)
+
+    def ranked_ids(self, text, filters, limit, offset):
+        name_match = self._word_filter(text, ['name'])
+        rank = Case(When(name_match, then=Value(0)), default=Value(1), output_field=IntegerField())
+        qs = self.matches(text).filter(filters).annotate(search_rank=rank)
+        return list(qs.order_by('search_rank', '-date_of_post', '-id').values_list('id', flat=True)[offset:offset + limit])
+
+    def suggest(self, text, limit):
+        condition = self._word_filter(text, ['name'])
+        if condition is None:
+            return []
+        return list(Product.objects.filter(condition).order_by('-date_of_post').values('id', 'name')[:limit])
+
+
+_backend = None
+
+
+def get_backend():
+    global _backend
+    if _backend is None:
+        default = 'products.services.search.SQLiteFTSBackend' if connection.vendor == 'sqlite' \
+            else 'products.services.search.DatabaseSearchBackend'
+        _backend = import_string(_setting('BACKEND', default))()
+    return _backend
+
+
+def _reset(**kwargs):
+    global _backend
+    if kwargs.get('setting') == 'PRODUCT_SEARCH':
+        _backend = None
+
+
+setting_changed.connect(_reset)
+
+
+def index_products(products):
+    get_backend().index(products)
+
+
+def remove_products(product_ids):
+    get_backend().remove(product_ids)
+
+
+def rebuild_index(batch_size=2000):
+    backend = get_backend()
+    backend.clear()
+    total = 0
+    products = Product.objects.order_by('id').only('id', 'name', 'description')
+    batch = []
+    for product in products.iterator(chunk_size=batch_size):
+        batch.append(product)
+        if len(batch) >= batch_size:
+            backend.index(batch)
+            total += len(batch)
+            batch = []
+    backend.index(batch)
+    return total + len(batch)
+
+
+def search_products(text, category_id=None, min_price=None, max_price=None,
+                    limit=SEARCH_DEFAULT_LIMIT, offset=0):
+    """(products in rank order, total matches) for one page of results."""
+    backend = get_backend()
+    filters = product_filters(category_id, min_price, max_price)
+    ids = backend.ranked_ids(text, filters, limit, offset)
+    by_id = Product.objects.select_related('seller', 'category').in_bulk(ids)
+    products = [by_id[product_id] for product_id in ids if product_id in by_id]
+    total = backend.matches(text).filter(filters).count()
+    return products, total
+
+
+def price_buckets():
+    return list(_setting('PRICE_BUCKETS', [10000, 50000, 100000, 500000]))
+
+
+def search_facets(text, category_id=None, min_price=None, max_price=None):
+    """
+    Match counts per category and per price bucket. Each facet ignores its
+    own filter so the client can show the alternatives next to a selection.
+    """
+    matches = get_backend().matches(text)
+
+    by_category = (
+        matches.filter(product_filters(min_price=min_price, max_price=max_price))
+        .order_by().values('category_id').annotate(count=Count('id')).order_by('-count')
+    )
+    names = dict(Category.objects.filter(id__in=[row['category_id'] for row in by_category]).values_list('id', 'name'))
+    categories = [
+        {'id': row['category_id'], 'name': names.get(row['category_id']), 'count': row['count']}
+        for row in by_category
+    ]
+
+    bounds = price_buckets()
+    bucket = Case(
+        *[When(unit_price__lt=bound, then=Value(index)) for index, bound in enumerate(bounds)],
+        default=Value(len(bounds)),
+        output_field=IntegerField(),
+    )
+    counts = dict(
+        matches.filter(product_filters(category_id=category_id))
+        .order_by().annotate(bucket=bucket).values('bucket').annotate(count=Count('id')).values_list('bucket', 'count')
+    )
+    edges = [None, *bounds, None]
+    prices = [
+        {'min': edges[index], 'max': edges[index + 1], 'count': counts.get(index, 0)}
+        for index in range(len(bounds) + 1)
+    ]
+    return {'category': categories, 'price': prices}
+
+
+def suggest(text, limit=SUGGEST_LIMIT):
+    return get_backend().suggest(text, limit)
+
+
+def parse_search_query(params):
+    """
+    (text, category_id, min_price, max_price, limit, offset) from query
+    params; raises ValueError on malformed numbers. Limit is clamped.
+    """
+    text = (params.get('q') or params.get('search') or '').strip()
+    category_id = params.get('category') or None
+    if category_id is not None:
+        category_id = int(category_id)
+    min_price = params.get('min_price')
+    max_price = params.get('max_price')
+    min_price = int(min_price) if min_price not in (None, '') else None
+    max_price = int(max_price) if max_price not in (None, '') else None
+    limit = max(1, min(int(params.get('limit', SEARCH_DEFAULT_LIMIT)), SEARCH_MAX_LIMIT))
+    offset = max(0, int(params.get('offset', 0)))
+    return text, category_id, min_price, max_price, limit, offset
@@ -1,39 +1,234 @@
+import math
 from django.utils import timezone
 from datetime import timedelta
-from django.db.models import Sum, Count
-from django.db.models.functions import Coalesce
-from trendsync.models import Product, Buyer
+from django.db import transaction, IntegrityError
+from django.db.models import Sum, Count, F, Value
+from django.db.models.functions import Coalesce, Greatest, TruncDate
+from trendsync.models import Product, Buyer, OrderItem
+from products.models import TrendingRollup, ProductTrendScore
 
 TRENDING_DAYS = 30
 
-def trending_since():
-    return timezone.now() - timedelta(days=TRENDING_DAYS)
+# A sale's weight in the decayed score halves every TRENDING_HALF_LIFE_HOURS.
+# Changing it requires `manage.py rebuild_trending_scores`.
+TRENDING_HALF_LIFE_HOURS = 72
 
+# Orders in these states count as sales. Cancelling or refunding a counted
+# order takes its units back out of the rollup.
+SOLD_STATUSES = {'paid', 'shipped', 'delivered'}
 
 
-def trending_products_queryset():
-    since = trending_since()
+def trending_since(days=TRENDING_DAYS):
+    return timezone.now() - timedelta(days=days)
+
+
+def trending_products_queryset(location=None, category_id=None, days=TRENDING_DAYS):
+    """
+    Products ranked by units sold over the last `days` days, summed from
+    the daily TrendingRollup buckets instead of scanning order items.
+    """
+    since = timezone.localdate(trending_since(days))
+
+    rollup_filter = {'trending_rollups__bucket__gte': since}
+    if location:
+        rollup_filter['trending_rollups__location'] = location.lower()
+    if category_id:
+        rollup_filter['trending_rollups__category_id'] = category_id
 
     return (
         Product.objects
-        .filter(
-            orderitem__order__status='paid',
-            orderitem__order__order_date__gte=since
-        )
+        .filter(**rollup_filter)
         .annotate(
-            units_sold=Coalesce(Sum('orderitem__quantity'), 0),
-            purchase_count=Count('orderitem__order', distinct=True)
+            units_sold=Coalesce(Sum('trending_rollups__units_sold'), 0),
+            purchase_count=Coalesce(Sum('trending_rollups__purchase_count'), 0)
         )
+        .filter(units_sold__gt=0)
         .order_by('-units_sold', '-purchase_count')
     )
 
-def trending_products_for_buyer(buyer: Buyer, category_id=None):
-    qs = trending_products_queryset()
+def trending_products_for_buyer(buyer: Buyer, category_id=None, days=TRENDING_DAYS):
+    return trending_products_queryset(location=buyer.location or None, category_id=category_id, days=days)
 
-    if buyer.location:
-        qs = qs.filter(seller__location__iexact=buyer.location)
 
+def decayed_trending_queryset(location=None, category_id=None):
+    """
+    Products ranked by their time-decayed sales score. This is an index scan
+    over ProductTrendScore, so reading the top-k never aggregates.
+    """
+    qs = Product.objects.filter(decayed_trend__isnull=False)
+    if location:
+        qs = qs.filter(decayed_trend__location=location.lower())
     if category_id:
-        qs = qs.filter(category_id=category_id)
+        qs = qs.filter(decayed_trend__category_id=category_id)
+
+    return qs.annotate(trend_score=F('decayed_trend__log_score')).order_by('-trend_score', '-id')
+
+
+def decayed_trending_for_buyer(buyer: Buyer, category_id=None):
+    return decayed_trending_queryset(location=buyer.location or None, category_id=category_id)
+
+
+def _half_lives(moment):
+    return moment.timestamp() / (TRENDING_HALF_LIFE_HOURS * 3600)
+
+
+def _log2_add(a, b):
+    high, low = max(a, b), min(a, b)
+    return high + math.log2(1 + 2 ** (low - high))
+
+
+def _log2_sub(a, b):
+    if b >= a:
+        return None
+    return a + math.log2(1 - 2 ** (b - a))
+
+
+def decayed_score(log_score, now=None):
+    """Current value of a stored log_score, in units sold."""
+    return 2 ** (log_score - _half_lives(now or timezone.now()))
+
+
+def _add_to_decayed_score(product, units, moment):
+    delta = math.log2(abs(units)) + _half_lives(moment)
+    with transaction.atomic():
+        row = ProductTrendScore.objects.select_for_update().filter(product=product).first()
+        if row is None:
+            if units < 0:
+                return
+            try:
+                with transaction.atomic():
+                    ProductTrendScore.objects.create(
+                        product=product,
+                        category_id=product.category_id,
+                        location=(product.seller.location or '').lower(),
+                        log_score=delta,
+                    )
+                return
+            except IntegrityError:
+                row = ProductTrendScore.objects.select_for_update().get(product=product)
+
+        if units > 0:
+            row.log_score = _log2_add(row.log_score, delta)
+        else:
+            row.log_score = _log2_sub(row.log_score, delta)
+            if row.log_score is None:
+                row.delete()
+                return
+        row.save(update_fields=['log_score', 'updated_at'])
+
+
+def _add_to_rollup(product, bucket, units, purchases):
+    # Floored at zero: a refund can remove more than the bucket holds (e.g. an
+    # order paid before the rollups were backfilled), and a CHECK failure here
+    # would abort the order save that triggered it.
+    updated = TrendingRollup.objects.filter(product=product, bucket=bucket).update(
+        units_sold=Greatest(F('units_sold') + units, Value(0)),
+        purchase_count=Greatest(F('purchase_count') + purchases, Value(0)),
+    )
+    if updated:
+        return
+    try:
+        with transaction.atomic():
+            TrendingRollup.objects.create(
+                product=product,
+                category_id=product.category_id,
+                location=(product.seller.location or '').lower(),
+                bucket=bucket,
+                units_sold=max(units, 0),
+                purchase_count=max(purchases, 0),
+            )
+    except IntegrityError:
+        # Another worker created the bucket first; apply ours on top.
+        _add_to_rollup(product, bucket, units, purchases)
+
+
+def set_trending_category(product_id, category_id):
+    """Refile a product's rollups and decayed score under its current category."""
+    TrendingRollup.objects.filter(product_id=product_id).update(category_id=category_id)
+    ProductTrendScore.objects.filter(product_id=product_id).update(category_id=category_id)
+
+
+def set_trending_location(seller_id, location):
+    """Refile the trending rows of a seller's products under its current location."""
+    location = (location or '').lower()
+    TrendingRollup.objects.filter(product__seller_id=seller_id).update(location=location)
+    ProductTrendScore.objects.filter(product__seller_id=seller_id).update(location=location)
+
+
+def record_order_items(order, items, sign=1):
+    """Add (sign=1) or remove (sign=-1) the given order lines from the rollup."""
+    bucket = timezone.localdate(order.order_date)
+    units_by_product = {}
+    products = {}
+    for item in items:
+        units_by_product[item.product_id] = units_by_product.get(item.product_id, 0) + item.quantity
+        products[item.product_id] = item.product
+
+    with transaction.atomic():
+        for product_id, units in units_by_product.items():
+            _add_to_rollup(products[product_id], bucket, sign * units, sign)
+            if units:
+                _add_to_decayed_score(products[product_id], sign * units, order.order_date)
+
+
+def record_order_transition(order, previous_status):
+    was_sold = previous_status in SOLD_STATUSES
+    is_sold = order.status in SOLD_STATUSES
+    if was_sold == is_sold:
+        return
+    items = order.items.select_related('product__seller')
+    record_order_items(order, items, sign=1 if is_sold else -1)
+
+
+def rebuild_trending_rollups():
+    """Recompute every bucket from order history in a single aggregate pass."""
+    rows = (
+        OrderItem.objects
+        .filter(order__status__in=SOLD_STATUSES)
+        .annotate(bucket=TruncDate('order__order_date'))
+        .values('product_id', 'product__category_id', 'product__seller__location', 'bucket')
+        .annotate(units_sold=Sum('quantity'), purchase_count=Count('order', distinct=True))
+    )
+    rollups = [
+        TrendingRollup(
+            product_id=row['product_id'],
+            category_id=row['product__category_id'],
+            location=(row['product__seller__location'] or '').lower(),
+            bucket=row['bucket'],
+            units_sold=row['units_sold'],
+            purchase_count=row['purchase_count'],
+        )
+        for row in rows
+    ]
+    with transaction.atomic():
+        TrendingRollup.objects.all().delete()
+        TrendingRollup.objects.bulk_create(rollups, batch_size=500)
+    return len(rollups)
+
+
+def rebuild_trending_scores():
+    """Recompute every decayed score from order history, e.g. after changing the half-life."""
+    scores = {}
+    rows = (
+        OrderItem.objects
+        .filter(order__status__in=SOLD_STATUSES, quantity__gt=0)
+        .values_list('product_id', 'product__category_id', 'product__seller__location',
+                     'quantity', 'order__order_date')
+        .iterator()
+    )
+    for product_id, category_id, location, quantity, order_date in rows:
+        delta = math.log2(quantity) + _half_lives(order_date)
+        if product_id in scores:
+            scores[product_id].log_score = _log2_add(scores[product_id].log_score, delta)
+        else:
+            scores[product_id] = ProductTrendScore(
+                product_id=product_id,
+                category_id=category_id,
+                location=(location or '').lower(),
+                log_score=delta,
+            )
 
-    return qs
\ No newline at end of file
+    with transaction.atomic():
+        ProductTrendScore.objects.all().delete()
+        ProductTrendScore.objects.bulk_create(scores.values(), batch_size=500)
+    return len(scores)
@@ -0,0 +1,101 @@
+from django.db.models.signals import post_init, post_save, post_delete
+from django.dispatch import receiver
+from trendsync.models import Product, ProductLike, ProductComment, Seller, Order, OrderItem
+from products.services.feed_scores import schedule_refresh, SELLER_RANKING_FIELDS
+from products.services.trending import (
+    record_order_transition, record_order_items, set_trending_category, set_trending_location, SOLD_STATUSES,
+)
+from products.services.search import INDEXED_FIELDS, index_products, remove_products
+
+
+@receiver(post_save, sender=Product)
+def refresh_score_on_product_save(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh(product_ids=[instance.id])
+
+
+@receiver(post_init, sender=Product)
+def remember_product_category(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads don't trigger a query.
+    instance._trending_category_id = instance.__dict__.get('category_id')
+
+
+@receiver(post_save, sender=Product)
+def update_trending_on_category_change(sender, instance, created, raw=False, **kwargs):
+    # Trending rows copy the category at sale time; keep them filterable by the current one.
+    category_id = instance.__dict__.get('category_id')
+    if not created and not raw and category_id != instance._trending_category_id:
+        set_trending_category(instance.id, category_id)
+    instance._trending_category_id = category_id
+
+
+@receiver(post_save, sender=Product)
+def index_product_on_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    # Fixtures (loaddata) are indexed afterwards with rebuild_search_index.
+    if raw:
+        return
+    # Counter and rating updates don't change the indexed text.
+    if update_fields is not None and not INDEXED_FIELDS.intersection(update_fields):
+        return
+    index_products([instance])
+
+
+@receiver(post_delete, sender=Product)
+def remove_product_from_index(sender, instance, **kwargs):
+    remove_products([instance.id])
+
+
+@receiver(post_save, sender=ProductLike)
+@receiver(post_delete, sender=ProductLike)
+@receiver(post_save, sender=ProductComment)
+@receiver(post_delete, sender=ProductComment)
+def refresh_score_on_interaction(sender, instance, raw=False, **kwargs):
+    if not raw:
+        schedule_refresh(product_ids=[instance.product_id])
+
+
+@receiver(post_save, sender=Seller)
+def refresh_score_on_seller_save(sender, instance, raw=False, update_fields=None, **kwargs):
+    if raw:
+        return
+    # Frequent writes such as live location pings don't touch the ranking.
+    if update_fields is not None and not SELLER_RANKING_FIELDS.intersection(update_fields):
+        return
+    schedule_refresh(seller_ids=[instance.id])
+
+
+@receiver(post_init, sender=Seller)
+def remember_seller_location(sender, instance, **kwargs):
+    instance._trending_location = instance.__dict__.get('location')
+
+
+@receiver(post_save, sender=Seller)
+def update_trending_on_seller_move(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    if created or raw or (update_fields is not None and 'location' not in update_fields):
+        return
+    location = instance.__dict__.get('location')
+    if location != instance._trending_location:
+        set_trending_location(instance.id, location)
+        instance._trending_location = location
+
+
+@receiver(post_init, sender=Order)
+def remember_order_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads don't trigger a query.
+    instance._trending_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def update_trending_on_order_status(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._trending_status
+    record_order_transition(instance, previous)
+    instance._trending_status = instance.status
+
+
+@receiver(post_save, sender=OrderItem)
+def update_trending_on_order_item(sender, instance, created, raw=False, **kwargs):
+    # Lines added to an order that is already paid (e.g. seed data or admin).
+    if created and not raw and instance.order.status in SOLD_STATUSES:
+        record_order_items(instance.order, [instance])
@@ -1,12 +1,14 @@
-from rest_framework import viewsets
+from rest_framework import status, viewsets
 from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.permissions import AllowAny
 
 from trendsync.models import Product
 from trendsync.serializers import ProductSerializer
-from products.services.trending import trending_products_for_buyer
-from products.services.algorithm import ranked_feed_queryset
+from trendsync.pagination import FeedKeysetPagination, TrendingKeysetPagination, DecayedTrendingKeysetPagination
+from products.services.trending import trending_products_for_buyer, decayed_trending_for_buyer, TRENDING_DAYS
+from products.services.feed_scores import home_feed_queryset
+from products.services.nearby import products_within, parse_nearby_query
 
 class ProductFeedViewSet(viewsets.ReadOnlyModelViewSet):
     """
@@ -24,35 +26,68 @@ class ProductFeedViewSet(viewsets.ReadOnlyModelViewSet):
         """
         return Product.objects.none()
     
-    @action(detail=False, methods=['get'], url_path='trending')
-    def trending(self, request):
+    def get_trending_buyer(self, request):
         buyer = None
-        category_id = request.query_params.get('category')
-
         if request.user.is_authenticated:
             buyer = getattr(request.user, 'buyer_profile', None)
+        # fallback: global trending (no region filter)
+        return buyer or type('Anon', (), {'location': None})()
 
-        if buyer:
-            qs = trending_products_for_buyer(buyer, category_id=category_id)
-        else:
-            # fallback: global trending (no region filter)
-            qs = trending_products_for_buyer(
-                buyer=type('Anon', (), {'location': None})(),
-                category_id=category_id
-            )
+    def list_response(self, qs):
+        page = self.paginate_queryset(qs)
+        if page is not None:
+            serializer = self.get_serializer(page, many=True)
+            return self.get_paginated_response(serializer.data)
 
         serializer = self.get_serializer(qs, many=True)
         return Response(serializer.data)
+
+    @action(detail=False, methods=['get'], url_path='trending', pagination_class=DecayedTrendingKeysetPagination)
+    def trending(self, request):
+        """Ranked by time-decayed sales, so recent sales dominate without a fixed window."""
+        category_id = request.query_params.get('category')
+        qs = decayed_trending_for_buyer(self.get_trending_buyer(request), category_id=category_id)
+        return self.list_response(qs)
+
+    @action(detail=False, methods=['get'], url_path='trending/window', pagination_class=TrendingKeysetPagination)
+    def trending_window(self, request):
+        """Ranked by units sold over the last `days` days (default TRENDING_DAYS)."""
+        category_id = request.query_params.get('category')
+        try:
+            days = max(1, min(int(request.query_params.get('days', TRENDING_DAYS)), 365))
+        except ValueError:
+            days = TRENDING_DAYS
+
+        qs = trending_products_for_buyer(self.get_trending_buyer(request), category_id=category_id, days=days)
+        return self.list_response(qs)
     
-    @action(detail=False, methods=['get'], url_path='home')
+    @action(detail=False, methods=['get'], url_path='home', pagination_class=FeedKeysetPagination)
     def home_feed(self, request):
-        qs = ranked_feed_queryset()
+        location = None
 
         # Optional: region bias if buyer exists
         if request.user.is_authenticated:
             buyer = getattr(request.user, 'buyer_profile', None)
             if buyer and buyer.location:
-                qs = qs.filter(seller__location__iexact=buyer.location)
+                location = buyer.location
 
-        serializer = self.get_serializer(qs, many=True)
-        return Response(serializer.data)
\ No newline at end of file
+        qs = home_feed_queryset(location=location)
+        return self.list_response(qs)
+
+    @action(detail=False, methods=['get'], url_path='nearby')
+    def nearby(self, request):
+        """Products from sellers within ?radius_km= of ?lat=&lng=, nearest seller first."""
+        try:
+            lat, lng, radius_km, limit = parse_nearby_query(request.query_params)
+        except (KeyError, ValueError):
+            return Response({'error': 'lat and lng are required and must be valid coordinates'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        products = products_within(
+            lat, lng, radius_km=radius_km, limit=limit,
+            category_id=request.query_params.get('category'),
+            location_type=request.query_params.get('type'),
+        )
+        data = self.get_serializer(products, many=True).data
+        for row, product in zip(data, products):
+            row['distance_km'] = round(product.distance_km, 3)
+        return Response(data)
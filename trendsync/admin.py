@@ -300,7 +300,7 @@ class OrderItemInline(admin.TabularInline):
     readonly_fields = ('unit_price', 'subtotal')
     raw_id_fields = ('product',)
 
-from .models import DusuPayConfig
+from .models import DusuPayConfig, DusuPayWebhookEvent
 
 @admin.register(Order)
 class OrderAdmin(admin.ModelAdmin):
@@ -335,6 +335,14 @@ class DusuPayConfigAdmin(admin.ModelAdmin):
     readonly_fields = ('webhook_received_at', 'updated_at')
 
 
+@admin.register(DusuPayWebhookEvent)
+class DusuPayWebhookEventAdmin(admin.ModelAdmin):
+    list_display = ('internal_reference', 'event', 'received_at', 'processed_at', 'attempts')
+    list_filter = ('event', 'processed_at')
+    search_fields = ('internal_reference', 'merchant_reference')
+    readonly_fields = ('received_at', 'processed_at', 'attempts', 'next_attempt_at', 'last_error')
+
+
 
 @admin.register(Payment)
 class PaymentAdmin(admin.ModelAdmin):
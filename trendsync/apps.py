@@ -6,4 +6,6 @@ class TrendsyncConfig(AppConfig):
     name = 'trendsync'
     
     def ready(self):
-        import trendsync.signals
\ No newline at end of file
+        import trendsync.signals
+        from .impressions import install_shutdown_handler
+        install_shutdown_handler()
@@ -0,0 +1,119 @@
+import logging
+import threading
+
+from django.conf import settings
+from django.core.cache import cache
+
+from .models import Product, ProductLike
+
+logger = logging.getLogger(__name__)
+
+# Bump whenever ProductSerializer output changes so stale payloads are never served.
+CACHE_VERSION = 1
+
+PRODUCT_CACHE_TIMEOUT = getattr(settings, 'PRODUCT_CACHE_TIMEOUT', 300)
+
+ALL_PRODUCTS_KEY = 'all_products'
+
+
+def product_key(product_id):
+    return f'product_{product_id}'
+
+
+def category_products_key(category_id):
+    return f'category_{category_id}_products'
+
+
+def seller_products_key(seller_id):
+    return f'seller_{seller_id}_products'
+
+
+class CacheStats:
+    """Per-process hit/miss counters for the product cache."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def record(self, hit):
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def snapshot(self):
+        with self._lock:
+            total = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / total if total else 0.0,
+            }
+
+    def reset(self):
+        with self._lock:
+            self.hits = 0
+            self.misses = 0
+
+
+stats = CacheStats()
+
+
+def fetch(key, build):
+    """
+    Read-through lookup: return (data, hit). On a miss `build()` produces
+    the payload, which is stored under the versioned key.
+    """
+    data = cache.get(key, version=CACHE_VERSION)
+    hit = data is not None
+    stats.record(hit)
+    if not hit:
+        data = build()
+        cache.set(key, data, PRODUCT_CACHE_TIMEOUT, version=CACHE_VERSION)
+    logger.debug("product cache %s: %s", 'hit' if hit else 'miss', key)
+    return data, hit
+
+
+def invalidate_product(product):
+    invalidate_products([product])
+
+
+def invalidate_products(products):
+    keys = {ALL_PRODUCTS_KEY}
+    for product in products:
+        keys.add(product_key(product.id))
+        # A product that moved seller or category must also leave the lists
+        # it was cached in before; the ids it was loaded with are kept by a
+        # post_init receiver.
+        for seller_id in {product.seller_id, getattr(product, '_cached_seller_id', None)}:
+            if seller_id:
+                keys.add(seller_products_key(seller_id))
+        for category_id in {product.category_id, getattr(product, '_cached_category_id', None)}:
+            if category_id:
+                keys.add(category_products_key(category_id))
+    cache.delete_many(list(keys), version=CACHE_VERSION)
+
+
+def invalidate_seller_products(seller_id):
+    """The seller's name is embedded in every one of their product payloads."""
+    invalidate_products(Product.objects.filter(seller_id=seller_id).only('id', 'seller_id', 'category_id'))
+
+
+def personalize_products(request, rows):
+    """
+    Cached payloads are shared between users, so re-apply the requesting
+    buyer's is_liked flags with a single query.
+    """
+    buyer = None
+    if request.user.is_authenticated:
+        buyer = getattr(request.user, 'buyer_profile', None)
+
+    liked_ids = set()
+    if buyer and rows:
+        liked_ids = set(
+            ProductLike.objects.filter(buyer=buyer, product_id__in=[row['id'] for row in rows])
+            .values_list('product_id', flat=True)
+        )
+    return [{**row, 'is_liked': row['id'] in liked_ids} for row in rows]
@@ -1,30 +1,239 @@
+import asyncio
 import json
+
+from channels.db import database_sync_to_async
 from channels.generic.websocket import AsyncWebsocketConsumer
+from django.utils import timezone
+
+from . import notifications, realtime
+from .locations import LocationThrottle, last_known_location, persist_seller_location, seller_location_group
+from .models import Seller
 
 
 class TrendsyncConsumer(AsyncWebsocketConsumer):
+    """
+    Topic subscriptions on ws/ (see trendsync/realtime.py).
+
+    Authenticated connections join their own "user:<id>" topic on connect.
+    Other topics are requested with
+        {"type": "subscribe", "topic": "seller:7"} / {"type": "unsubscribe", "topic": "seller:7"}
+    and authorized server-side. Clients only receive what is published to
+    their topics: {"topic": "seller:7", "event": "...", "data": {...}}.
+
+    Notification events on the user topic are described in
+    trendsync/notifications.py; the current unread counts are sent right
+    after connect so a reconnecting client can resync without polling.
+    """
+
     async def connect(self):
-        self.room_group_name = "trendsync_updates"
+        self.user = self.scope.get('user')
+        self.topics = set()
+        await self.accept()
+        if self.user is not None and self.user.is_authenticated:
+            await self.join('user', self.user.id)
+            counts = await database_sync_to_async(notifications.unread_counts)(self.user.id)
+            await self.send_json({'topic': f'user:{self.user.id}', 'event': 'notification.unread', 'data': counts})
+
+    async def disconnect(self, code):
+        for kind, object_id in self.topics:
+            await self.channel_layer.group_discard(realtime.group_name(kind, object_id), self.channel_name)
+        self.topics.clear()
+
+    async def receive(self, text_data=None, bytes_data=None):
+        try:
+            data = json.loads(text_data or '')
+            action = data['type']
+        except (json.JSONDecodeError, TypeError, KeyError):
+            await self.send_json({'type': 'error', 'message': 'Expected {"type": ..., "topic": ...}'})
+            return
+
+        if action == 'ping':
+            await self.send_json({'type': 'pong'})
+            return
+        if action not in ('subscribe', 'unsubscribe'):
+            await self.send_json({'type': 'error', 'message': 'Unknown message type'})
+            return
+
+        topic = data.get('topic')
+        try:
+            kind, object_id = realtime.parse_topic(topic)
+        except ValueError as e:
+            await self.send_json({'type': 'error', 'message': str(e)})
+            return
+
+        if action == 'unsubscribe':
+            await self.leave(kind, object_id)
+            await self.send_json({'type': 'unsubscribed', 'topic': topic})
+            return
+
+        if (kind, object_id) not in self.topics:
+            if len(self.topics) >= realtime.MAX_SUBSCRIPTIONS:
+                await self.send_json({'type': 'error', 'message': 'Too many subscriptions', 'topic': topic})
+                return
+            allowed = await database_sync_to_async(realtime.can_subscribe)(self.user, kind, object_id)
+            if not allowed:
+                await self.send_json({'type': 'error', 'message': 'Not allowed', 'topic': topic})
+                return
+            await self.join(kind, object_id)
+        await self.send_json({'type': 'subscribed', 'topic': topic})
+
+    async def join(self, kind, object_id):
+        self.topics.add((kind, object_id))
+        await self.channel_layer.group_add(realtime.group_name(kind, object_id), self.channel_name)
+
+    async def leave(self, kind, object_id):
+        if (kind, object_id) in self.topics:
+            self.topics.discard((kind, object_id))
+            await self.channel_layer.group_discard(realtime.group_name(kind, object_id), self.channel_name)
+
+    async def topic_message(self, event):
+        await self.send_json({'topic': event['topic'], 'event': event['event'], 'data': event['data']})
+
+    async def topic_batch(self, event):
+        for message in event['messages']:
+            await self.topic_message(message)
+
+    async def send_json(self, content):
+        await self.send(text_data=json.dumps(content))
 
-        await self.channel_layer.group_add(self.room_group_name, self.channel_name)
+
+class SellerLocationConsumer(AsyncWebsocketConsumer):
+    """
+    Live seller locations on ws/locations/.
+
+    Sellers (authenticated with ?token=<access>) stream positions:
+        {"type": "location", "lat": 0.31, "lng": 32.58, "accuracy": 12}
+    Anyone may follow a seller:
+        {"type": "subscribe", "seller_id": 7} / {"type": "unsubscribe", "seller_id": 7}
+    and receives {"type": "location", "seller_id": 7, "lat": ..., "lng": ..., ...},
+    at most once per LOCATION_STREAM['BROADCAST_INTERVAL'] per seller.
+    """
+
+    async def connect(self):
+        self.seller_id = await self.get_seller_id(self.scope.get('user'))
+        self.subscriptions = set()
+        self.throttle = LocationThrottle()
+        self.pending_broadcast = None
         await self.accept()
 
     async def disconnect(self, code):
-        await self.channel_layer.group_discard(self.room_group_name, self.channel_name)
+        for group in self.subscriptions:
+            await self.channel_layer.group_discard(group, self.channel_name)
+        if self.pending_broadcast is not None:
+            self.pending_broadcast.cancel()
+            await self.broadcast()
+        if self.seller_id is not None and self.throttle.has_unpersisted:
+            await self.persist()
 
     async def receive(self, text_data=None, bytes_data=None):
-        if text_data:
-            try:
-                data = json.loads(text_data)
-            except json.JSONDecodeError:
-                data = {"text": text_data}
-            await self.channel_layer.group_send(
-                self.room_group_name,
-                {
-                    "type": "websocket_message",
-                    "data": data,
-                },
+        try:
+            data = json.loads(text_data or '')
+        except json.JSONDecodeError:
+            await self.send_error('Invalid JSON')
+            return
+        if not isinstance(data, dict):
+            await self.send_error('Expected a JSON object')
+            return
+
+        handler = {
+            'location': self.handle_location,
+            'subscribe': self.handle_subscribe,
+            'unsubscribe': self.handle_unsubscribe,
+        }.get(data.get('type'))
+        if handler is None:
+            await self.send_error('Unknown message type')
+            return
+        await handler(data)
+
+    async def handle_location(self, data):
+        if self.seller_id is None:
+            await self.send_error('Only sellers can publish locations')
+            return
+        try:
+            lat, lng = float(data['lat']), float(data['lng'])
+            accuracy = float(data['accuracy']) if data.get('accuracy') is not None else None
+        except (KeyError, TypeError, ValueError):
+            await self.send_error('lat and lng are required')
+            return
+        if not (-90 <= lat <= 90 and -180 <= lng <= 180):
+            await self.send_error('Coordinates out of range')
+            return
+
+        self.throttle.update({'lat': lat, 'lng': lng, 'accuracy': accuracy})
+
+        # Coalesce bursts: broadcast now if allowed, otherwise make sure one
+        # trailing broadcast of the latest position is scheduled.
+        delay = self.throttle.broadcast_delay()
+        if delay == 0:
+            await self.broadcast()
+        elif self.pending_broadcast is None:
+            self.pending_broadcast = asyncio.ensure_future(self.broadcast_later(delay))
+
+        if self.throttle.should_persist():
+            await self.persist()
+
+    async def handle_subscribe(self, data):
+        seller_id = data.get('seller_id')
+        if not isinstance(seller_id, int):
+            await self.send_error('seller_id is required')
+            return
+        group = seller_location_group(seller_id)
+        if group not in self.subscriptions:
+            # Same guards as topic subscriptions on ws/: a per-connection cap
+            # and only sellers that exist.
+            if len(self.subscriptions) >= realtime.MAX_SUBSCRIPTIONS:
+                await self.send_error('Too many subscriptions')
+                return
+            allowed = await database_sync_to_async(realtime.can_subscribe)(
+                self.scope.get('user'), 'seller', seller_id
             )
+            if not allowed:
+                await self.send_error('Unknown seller')
+                return
+            self.subscriptions.add(group)
+            await self.channel_layer.group_add(group, self.channel_name)
+        location = await database_sync_to_async(last_known_location)(seller_id)
+        if location is not None:
+            await self.send(text_data=json.dumps({'type': 'location', **location}))
+
+    async def handle_unsubscribe(self, data):
+        group = seller_location_group(data.get('seller_id'))
+        if group in self.subscriptions:
+            self.subscriptions.discard(group)
+            await self.channel_layer.group_discard(group, self.channel_name)
+
+    async def broadcast_later(self, delay):
+        await asyncio.sleep(delay)
+        self.pending_broadcast = None
+        await self.broadcast()
+
+    async def broadcast(self):
+        self.throttle.mark_broadcast()
+        await self.channel_layer.group_send(
+            seller_location_group(self.seller_id),
+            {
+                'type': 'seller.location',
+                'location': {
+                    'seller_id': self.seller_id,
+                    **self.throttle.latest,
+                    'ts': timezone.now().isoformat(),
+                },
+            },
+        )
+
+    async def persist(self):
+        position = self.throttle.latest
+        self.throttle.mark_persisted()
+        await database_sync_to_async(persist_seller_location)(self.seller_id, position['lat'], position['lng'])
+
+    async def seller_location(self, event):
+        await self.send(text_data=json.dumps({'type': 'location', **event['location']}))
+
+    async def send_error(self, message):
+        await self.send(text_data=json.dumps({'type': 'error', 'message': message}))
 
-    async def websocket_message(self, event):
-        await self.send(text_data=json.dumps(event["data"]))
+    @database_sync_to_async
+    def get_seller_id(self, user):
+        if user is None or not user.is_authenticated:
+            return None
+        return Seller.objects.filter(user=user).values_list('id', flat=True).first()
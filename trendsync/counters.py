@@ -0,0 +1,125 @@
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+from django.db import connection
+from django.db.models import F, Value
+from django.db.models.functions import Greatest
+
+logger = logging.getLogger(__name__)
+
+
+def _setting(name, default):
+    return getattr(settings, 'COUNTERS', {}).get(name, default)
+
+
+def apply_delta(model, pk_list, field, amount):
+    """
+    One UPDATE ... SET field = field + amount for every pk in pk_list.
+    Only `field` is written, and decrements are floored at zero so
+    PositiveIntegerField constraints hold under concurrent unlikes.
+    """
+    if amount == 0 or not pk_list:
+        return 0
+    if amount > 0:
+        expression = F(field) + amount
+    else:
+        expression = Greatest(F(field) - (-amount), Value(0))
+    return model._default_manager.filter(pk__in=pk_list).update(**{field: expression})
+
+
+class CounterBuffer:
+    """
+    Coalesces counter deltas in memory and writes them in bulk.
+
+    Deltas are keyed by (model, pk, field); a flush groups keys with the same
+    delta into a single UPDATE, so a burst of N likes on a product becomes
+    one write. Flushes happen every `flush_interval` seconds, once
+    `max_pending` keys accumulate, and at interpreter exit.
+    """
+
+    def __init__(self, flush_interval=5.0, max_pending=1000):
+        self.flush_interval = flush_interval
+        self.max_pending = max_pending
+        self._pending = defaultdict(int)
+        self._lock = threading.Lock()
+        self._timer = None
+        atexit.register(self.flush)
+
+    def add(self, model, pk, field, amount=1):
+        with self._lock:
+            self._pending[(model, pk, field)] += amount
+            size = len(self._pending)
+            if self._timer is None:
+                self._timer = threading.Timer(self.flush_interval, self._flush_from_timer)
+                self._timer.daemon = True
+                self._timer.start()
+        if size >= self.max_pending:
+            self.flush()
+
+    def pending(self, model, pk, field):
+        with self._lock:
+            return self._pending.get((model, pk, field), 0)
+
+    def drain(self):
+        with self._lock:
+            pending, self._pending = self._pending, defaultdict(int)
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        return pending
+
+    def flush(self):
+        pending = self.drain()
+        groups = defaultdict(list)
+        for (model, pk, field), amount in pending.items():
+            groups[(model, field, amount)].append(pk)
+
+        written = 0
+        for (model, field, amount), pk_list in groups.items():
+            try:
+                written += apply_delta(model, pk_list, field, amount)
+            except Exception:
+                logger.exception("Failed to flush %s.%s counters", model.__name__, field)
+                with self._lock:
+                    for pk in pk_list:
+                        self._pending[(model, pk, field)] += amount
+        return written
+
+    def _flush_from_timer(self):
+        try:
+            self.flush()
+        finally:
+            connection.close()
+
+
+buffer = CounterBuffer(
+    flush_interval=_setting('FLUSH_INTERVAL', 5.0),
+    max_pending=_setting('MAX_PENDING', 1000),
+)
+
+
+def increment(instance, field, amount=1, buffered=None):
+    """
+    Atomically add `amount` to instance.<field> without saving the row.
+
+    The in-memory instance is bumped too, so callers can return the new
+    value without re-reading it. With buffering (COUNTERS['BUFFERED']) the
+    write is deferred to the next CounterBuffer flush.
+    """
+    if buffered is None:
+        buffered = _setting('BUFFERED', False)
+
+    model = type(instance)
+    if buffered:
+        buffer.add(model, instance.pk, field, amount)
+        amount = buffer.pending(model, instance.pk, field)
+    else:
+        apply_delta(model, [instance.pk], field, amount)
+    setattr(instance, field, max(getattr(instance, field) + amount, 0))
+
+
+def decrement(instance, field, amount=1, buffered=None):
+    increment(instance, field, -amount, buffered=buffered)
@@ -0,0 +1,140 @@
+"""
+Local stand-in for the DusuPay collections API.
+
+Serves POST /collections/initialize and GET /collections/status/<ref> with
+the response shapes DusuPayClient expects, plus knobs for added latency and
+injected failures, so the client's retries and circuit breaker can be
+exercised without the sandbox:
+
+    server = FakeDusuPayServer(latency=0.05)
+    with server:
+        client = DusuPayClient(base_url=server.url, public_key='pk', secret_key='sk')
+"""
+import json
+import re
+import threading
+import time
+import uuid
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+STATUS_PATH = re.compile(r'^/collections/status/(?P<reference>[^/]+)$')
+
+# fail_next() status that closes the connection without answering.
+DROP_CONNECTION = 0
+
+
+class _Handler(BaseHTTPRequestHandler):
+    server_version = 'FakeDusuPay/1.0'
+    protocol_version = 'HTTP/1.1'  # keep-alive, like the real gateway
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body):
+        payload = json.dumps(body).encode()
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def _read_json(self):
+        length = int(self.headers.get('Content-Length') or 0)
+        return json.loads(self.rfile.read(length) or b'{}')
+
+    def _injected_failure(self):
+        fake = self.server.fake
+        fake.record_request(self.command, self.path)
+        if fake.latency:
+            time.sleep(fake.latency)
+        status = fake.take_failure()
+        if status == DROP_CONNECTION:
+            self.close_connection = True
+            return True
+        if status:
+            self._send(status, {'status': 'error', 'message': 'Injected failure'})
+            return True
+        return False
+
+    def do_POST(self):
+        body = self._read_json()
+        if self._injected_failure():
+            return
+        if self.path != '/collections/initialize':
+            self._send(404, {'status': 'error', 'message': 'Not found'})
+            return
+        reference = f'FAKE-{uuid.uuid4().hex[:12]}'
+        self.server.fake.transactions[reference] = 'PENDING'
+        data = {'internal_reference': reference, 'merchant_reference': body.get('merchant_reference')}
+        if body.get('transaction_method') == 'CARD':
+            data['redirect_url'] = f'{self.server.fake.url}/pay/{reference}'
+        self._send(202, {'status': 'accepted', 'data': data})
+
+    def do_GET(self):
+        if self._injected_failure():
+            return
+        match = STATUS_PATH.match(self.path)
+        if not match:
+            self._send(404, {'status': 'error', 'message': 'Not found'})
+            return
+        reference = match.group('reference')
+        status = self.server.fake.transactions.get(reference)
+        if status is None:
+            self._send(404, {'status': 'error', 'message': 'Transaction not found'})
+            return
+        self._send(200, {'status': 'success', 'transaction_status': status, 'internal_reference': reference})
+
+
+class FakeDusuPayServer:
+    def __init__(self, host='127.0.0.1', port=0, latency=0.0):
+        self.latency = latency
+        self.transactions = {}
+        self.requests = []
+        self._failures = []
+        self._lock = threading.Lock()
+        self._httpd = ThreadingHTTPServer((host, port), _Handler)
+        self._httpd.daemon_threads = True
+        self._httpd.fake = self
+        self._thread = None
+
+    @property
+    def url(self):
+        host, port = self._httpd.server_address[:2]
+        return f'http://{host}:{port}'
+
+    def fail_next(self, count=1, status=503):
+        """
+        Answer the next `count` requests with `status`, or hang up after
+        reading them when status is DROP_CONNECTION.
+        """
+        with self._lock:
+            self._failures.extend([status] * count)
+
+    def take_failure(self):
+        with self._lock:
+            return self._failures.pop(0) if self._failures else None
+
+    def record_request(self, method, path):
+        with self._lock:
+            self.requests.append((method, path))
+
+    def complete(self, reference, status='COMPLETED'):
+        self.transactions[reference] = status
+
+    def serve_forever(self):
+        self._httpd.serve_forever()
+
+    def start(self):
+        self._thread = threading.Thread(target=self._httpd.serve_forever, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc_info):
+        self.stop()
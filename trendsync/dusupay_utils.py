@@ -1,19 +1,157 @@
-import requests
 import logging
+import random
+import threading
+import time
+from collections import defaultdict
+
+import requests
+from asgiref.sync import sync_to_async
+from requests.adapters import HTTPAdapter
+from urllib3.exceptions import NewConnectionError
 from django.conf import settings
 
 logger = logging.getLogger('dusupay')
 
-class DusuPayClient:
+
+def _http_setting(name, default):
+    return getattr(settings, 'DUSUPAY_HTTP', {}).get(name, default)
+
+
+GATEWAY_UNAVAILABLE = 'Payment gateway temporarily unavailable. Please try again shortly.'
+
+# Responses worth retrying: the gateway (or a proxy in front of it) is
+# overloaded or restarting, not rejecting the request.
+RETRY_STATUSES = {429, 502, 503, 504}
+
+
+def nothing_sent(exc):
+    """
+    True when a request failed before any of it reached the gateway: the
+    connect timed out or the connection was refused. Errors after that
+    ("Connection aborted", RemoteDisconnected, read timeouts) may follow a
+    request the gateway already received.
+    """
+    if isinstance(exc, requests.ConnectTimeout):
+        return True
+    reason = exc.args[0] if exc.args else None
+    return isinstance(getattr(reason, 'reason', reason), NewConnectionError)
+
+
+class GatewayUnavailable(Exception):
+    """Raised instead of calling DusuPay while the circuit breaker is open."""
+
+
+class CircuitBreaker:
+    """
+    Fails fast while the gateway is degraded.
+
+    After `failure_threshold` consecutive failures the circuit opens and
+    calls are refused for `reset_timeout` seconds; then a single probe is
+    let through (half-open) and its outcome closes or re-opens the circuit.
+    """
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self._lock = threading.Lock()
+        self._failures = 0
+        self._opened_at = None
+        self._probing = False
+
+    @property
+    def state(self):
+        with self._lock:
+            return self._state()
+
+    def _state(self):
+        if self._opened_at is None:
+            return self.CLOSED
+        if time.monotonic() - self._opened_at >= self.reset_timeout:
+            return self.HALF_OPEN
+        return self.OPEN
+
+    def allow(self):
+        with self._lock:
+            state = self._state()
+            if state == self.CLOSED:
+                return True
+            if state == self.HALF_OPEN and not self._probing:
+                self._probing = True
+                return True
+            return False
+
+    def record_success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._probing = False
+
+    def record_failure(self):
+        with self._lock:
+            self._failures += 1
+            if self._probing or self._failures >= self.failure_threshold:
+                if self._opened_at is None or self._probing:
+                    logger.warning("DusuPay circuit opened after %s failures", self._failures)
+                self._opened_at = time.monotonic()
+            self._probing = False
+
+
+class LatencyMetrics:
+    """Per-endpoint call counts and latency (wall time including retries)."""
+
     def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = defaultdict(lambda: {'calls': 0, 'errors': 0, 'total_ms': 0.0, 'max_ms': 0.0})
+
+    def record(self, endpoint, seconds, ok):
+        elapsed_ms = seconds * 1000
+        with self._lock:
+            entry = self._calls[endpoint]
+            entry['calls'] += 1
+            entry['errors'] += 0 if ok else 1
+            entry['total_ms'] += elapsed_ms
+            entry['max_ms'] = max(entry['max_ms'], elapsed_ms)
+
+    def snapshot(self):
+        with self._lock:
+            return {
+                endpoint: {
+                    'calls': entry['calls'],
+                    'errors': entry['errors'],
+                    'avg_ms': round(entry['total_ms'] / entry['calls'], 1),
+                    'max_ms': round(entry['max_ms'], 1),
+                }
+                for endpoint, entry in self._calls.items()
+            }
+
+    def reset(self):
+        with self._lock:
+            self._calls.clear()
+
+
+class DusuPayClient:
+    """
+    DusuPay API client.
+
+    Requests share one keep-alive Session (connection pool sized by
+    DUSUPAY_HTTP['POOL_SIZE']), use short connect/read timeouts, and are
+    retried with jittered exponential backoff when the gateway is
+    unreachable or overloaded. A CircuitBreaker stops calling the gateway
+    while it keeps failing, and every call is timed in `metrics`.
+    """
+
+    def __init__(self, base_url=None, public_key=None, secret_key=None):
         # Use getattr with defaults to avoid AttributeError
-        self.public_key = getattr(settings, 'DUSUPAY_PUBLIC_KEY', None)
-        self.secret_key = getattr(settings, 'DUSUPAY_SECRET_KEY', None)
-        self.base_url = getattr(settings, 'DUSUPAY_API_BASE_URL', 'https://sandboxapi.dusupay.com')
-        
+        self.public_key = public_key or getattr(settings, 'DUSUPAY_PUBLIC_KEY', None)
+        self.secret_key = secret_key or getattr(settings, 'DUSUPAY_SECRET_KEY', None)
+        self.base_url = base_url or getattr(settings, 'DUSUPAY_API_BASE_URL', 'https://sandboxapi.dusupay.com')
+
         if not self.public_key or not self.secret_key:
             logger.warning("DusuPay API keys not configured. Payment functionality will not work.")
-        
+
         self.headers = {
             'Content-Type': 'application/json',
             'x-api-version': '1',
@@ -21,6 +159,73 @@ class DusuPayClient:
             'secret-key': self.secret_key
         }
 
+        self.timeout = (_http_setting('CONNECT_TIMEOUT', 3.05), _http_setting('READ_TIMEOUT', 15))
+        self.max_retries = _http_setting('MAX_RETRIES', 2)
+        self.backoff = _http_setting('BACKOFF', 0.25)
+        self.backoff_cap = _http_setting('BACKOFF_CAP', 2.0)
+
+        pool_size = _http_setting('POOL_SIZE', 10)
+        self.session = requests.Session()
+        self.session.headers.update({k: v for k, v in self.headers.items() if v is not None})
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+        self.session.mount('http://', adapter)
+
+        self.breaker = CircuitBreaker(
+            failure_threshold=_http_setting('BREAKER_THRESHOLD', 5),
+            reset_timeout=_http_setting('BREAKER_RESET', 30.0),
+        )
+        self.metrics = LatencyMetrics()
+
+    def _sleep_before_retry(self, attempt):
+        # "Full jitter": spreads retries from many workers instead of
+        # having them hit a recovering gateway in lockstep.
+        time.sleep(random.uniform(0, min(self.backoff_cap, self.backoff * 2 ** attempt)))
+
+    def _request(self, endpoint, method, url, idempotent, **kwargs):
+        """
+        Send one logical request, retrying transient failures.
+
+        Non-idempotent calls (initialize) are only retried when the
+        connection could not be established, so a payment is never
+        submitted twice. Raises GatewayUnavailable when the circuit is open
+        and requests.RequestException when every attempt failed.
+        """
+        if not self.breaker.allow():
+            self.metrics.record(endpoint, 0, ok=False)
+            raise GatewayUnavailable(GATEWAY_UNAVAILABLE)
+
+        started = time.monotonic()
+        attempt = 0
+        while True:
+            try:
+                response = self.session.request(method, url, timeout=self.timeout, **kwargs)
+                error = None
+            except requests.RequestException as exc:
+                response, error = None, exc
+                retryable = idempotent or nothing_sent(exc)
+            else:
+                retryable = idempotent and response.status_code in RETRY_STATUSES
+
+            failed = (error is not None or response.status_code >= 500
+                      or response.status_code in RETRY_STATUSES)
+            if not (failed and retryable) or attempt >= self.max_retries:
+                break
+            attempt += 1
+            logger.info("Retrying DusuPay %s (attempt %s): %s", endpoint, attempt + 1,
+                        error or response.status_code)
+            self._sleep_before_retry(attempt)
+
+        if failed:
+            self.breaker.record_failure()
+        else:
+            self.breaker.record_success()
+        self.metrics.record(endpoint, time.monotonic() - started, ok=not failed)
+
+        if error is not None:
+            raise error
+        return response
+
     def initiate_payment(self, merchant_reference, amount, currency, transaction_method,
                          account_number=None, provider_code=None, bank_code=None,
                          customer_name=None, customer_email=None, description=None,
@@ -62,7 +267,7 @@ class DusuPayClient:
             payload["redirect_url"] = redirect_url
 
         try:
-            response = requests.post(url, json=payload, headers=self.headers, timeout=30)
+            response = self._request('initialize', 'POST', url, idempotent=False, json=payload)
             data = response.json()
             logger.info(f"DusuPay initiate_payment response: {data}")
             if response.status_code == 202 and data.get('status') == 'accepted':
@@ -85,7 +290,9 @@ class DusuPayClient:
         
         url = f"{self.base_url}/collections/status/{internal_reference}"
         try:
-            response = requests.get(url, headers=self.headers, timeout=30)
+            response = self._request('status', 'GET', url, idempotent=True)
+            if response.status_code >= 500:
+                return {'success': False, 'error': f'Gateway error {response.status_code}'}
             data = response.json()
             logger.info(f"DusuPay status check: {data}")
             return {'success': True, 'status': data.get('transaction_status'), 'data': data}
@@ -99,4 +306,32 @@ class DusuPayClient:
         if phone.startswith('25678') or phone.startswith('25676') or phone.startswith('078') or phone.startswith('076'):
             return 'mtn_ug'
         else:
-            return 'airtel_ug'
\ No newline at end of file
+            return 'airtel_ug'
+
+    def health(self):
+        return {'circuit': self.breaker.state, 'latency': self.metrics.snapshot()}
+
+
+class AsyncDusuPayClient:
+    """
+    Awaitable facade for ASGI code paths (consumers, async views).
+
+    Calls run on the pooled sync client in a worker thread, so the event
+    loop is never blocked by a gateway round trip and the connection pool,
+    retries and circuit breaker are shared with the sync API.
+    """
+
+    def __init__(self, client=None):
+        self.client = client or DusuPayClient()
+
+    async def initiate_payment(self, *args, **kwargs):
+        return await sync_to_async(self.client.initiate_payment, thread_sensitive=False)(*args, **kwargs)
+
+    async def check_transaction_status(self, internal_reference):
+        return await sync_to_async(self.client.check_transaction_status, thread_sensitive=False)(internal_reference)
+
+    def get_provider_code(self, phone_number):
+        return self.client.get_provider_code(phone_number)
+
+    def health(self):
+        return self.client.health()
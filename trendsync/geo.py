@@ -0,0 +1,91 @@
+"""
+Geohash helpers and great-circle distance.
+
+A geohash names a lat/lng cell, and every prefix of it names the enclosing
+coarser cell. An indexed `location_geohash__startswith` filter over a cell
+and its eight neighbours therefore narrows a radius query to a small set of
+rows before the exact haversine distance is computed.
+"""
+import math
+
+GEOHASH_ALPHABET = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precision stored on Seller.location_geohash (about 4.8 m x 4.8 m cells).
+GEOHASH_PRECISION = 9
+
+EARTH_RADIUS_KM = 6371.0088
+KM_PER_DEGREE = math.pi * EARTH_RADIUS_KM / 180
+
+
+def geohash_encode(lat, lng, precision=GEOHASH_PRECISION):
+    """Standard base32 geohash of (lat, lng)."""
+    lat_range = [-90.0, 90.0]
+    lng_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True
+    while len(chars) < precision:
+        value, bounds = (lng, lng_range) if even else (lat, lat_range)
+        mid = (bounds[0] + bounds[1]) / 2
+        if value >= mid:
+            bits = (bits << 1) | 1
+            bounds[0] = mid
+        else:
+            bits <<= 1
+            bounds[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(GEOHASH_ALPHABET[bits])
+            bits = 0
+            bit_count = 0
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """(height, width) of a cell in degrees of latitude and longitude."""
+    lng_bits = (5 * precision + 1) // 2
+    lat_bits = 5 * precision // 2
+    return 180.0 / 2 ** lat_bits, 360.0 / 2 ** lng_bits
+
+
+def haversine_km(lat1, lng1, lat2, lng2):
+    phi1, phi2 = math.radians(lat1), math.radians(lat2)
+    dphi = phi2 - phi1
+    dlambda = math.radians(lng2 - lng1)
+    a = math.sin(dphi / 2) ** 2 + math.cos(phi1) * math.cos(phi2) * math.sin(dlambda / 2) ** 2
+    return 2 * EARTH_RADIUS_KM * math.asin(min(1.0, math.sqrt(a)))
+
+
+def covering_cells(lat, lng, radius_km, max_precision=GEOHASH_PRECISION):
+    """
+    Geohash prefixes whose cells together contain every point within
+    `radius_km` of (lat, lng): the finest cell at least `radius_km` on each
+    side, plus its eight neighbours. Returns None when the radius is too
+    large to prune usefully (wider than a precision-1 cell).
+    """
+    # Longitude degrees shrink towards the poles; size cells for the
+    # narrowest latitude the circle reaches.
+    edge_lat = min(89.9, abs(lat) + radius_km / KM_PER_DEGREE)
+    lng_km_per_degree = KM_PER_DEGREE * math.cos(math.radians(edge_lat))
+
+    precision = 0
+    for candidate in range(1, max_precision + 1):
+        height, width = cell_size(candidate)
+        if height * KM_PER_DEGREE < radius_km or width * lng_km_per_degree < radius_km:
+            break
+        precision = candidate
+    if precision == 0:
+        return None
+
+    height, width = cell_size(precision)
+    cells = set()
+    for dlat in (-height, 0, height):
+        neighbour_lat = lat + dlat
+        if not -90 <= neighbour_lat <= 90:
+            continue
+        for dlng in (-width, 0, width):
+            neighbour_lng = (lng + dlng + 180) % 360 - 180
+            cells.add(geohash_encode(neighbour_lat, neighbour_lng, precision))
+    return sorted(cells)
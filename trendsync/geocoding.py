@@ -0,0 +1,183 @@
+"""
+Reverse geocoding for seller locations, kept off the request path.
+
+Coordinates are quantized to geohash cells (GEOCODER['PRECISION'], 7 is
+roughly 150 m), and each cell's address is cached in-process with a TTL
+and LRU eviction. A dynamic seller pushing GPS every few seconds therefore
+hits the geocoder about once per block, not once per update. Misses are
+resolved in a small background pool after the location update commits.
+
+The backend is pluggable: GEOCODER['BACKEND'] names a class with a
+`reverse(lat, lng)` method. StubGeocoder needs no network and is meant for
+tests and local development.
+"""
+import logging
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
+
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db import connection, transaction
+from django.utils.module_loading import import_string
+
+from .geo import geohash_encode
+from .utils import reverse_geocode
+
+logger = logging.getLogger(__name__)
+
+class NominatimGeocoder:
+    def reverse(self, lat, lng):
+        return reverse_geocode(lat, lng)
+
+
+class StubGeocoder:
+    """Offline geocoder: returns the coordinates, or a configured address."""
+
+    def __init__(self, addresses=None):
+        self.addresses = addresses or {}
+        self.calls = 0
+
+    def reverse(self, lat, lng):
+        self.calls += 1
+        return self.addresses.get(geohash_encode(lat, lng, 7), f"{lat:.4f}, {lng:.4f}")
+
+
+class GeocodeCache:
+    """Thread-safe LRU of cell -> (address, expires_at)."""
+
+    def __init__(self, max_entries=10000, ttl=86400):
+        self.max_entries = max_entries
+        self.ttl = ttl
+        self._entries = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, cell):
+        with self._lock:
+            entry = self._entries.get(cell)
+            if entry is None:
+                return None
+            address, expires_at = entry
+            if expires_at < time.monotonic():
+                del self._entries[cell]
+                return None
+            self._entries.move_to_end(cell)
+            return address
+
+    def set(self, cell, address):
+        with self._lock:
+            self._entries[cell] = (address, time.monotonic() + self.ttl)
+            self._entries.move_to_end(cell)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
+
+
+def _setting(name, default):
+    return getattr(settings, 'GEOCODER', {}).get(name, default)
+
+
+_geocoder = None
+_cache = None
+_executor = None
+_in_flight = set()
+_in_flight_lock = threading.Lock()
+
+
+def get_geocoder():
+    global _geocoder
+    if _geocoder is None:
+        _geocoder = import_string(_setting('BACKEND', 'trendsync.geocoding.NominatimGeocoder'))()
+    return _geocoder
+
+
+def get_cache():
+    global _cache
+    if _cache is None:
+        _cache = GeocodeCache(max_entries=_setting('MAX_ENTRIES', 10000), ttl=_setting('TTL', 86400))
+    return _cache
+
+
+def _get_executor():
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=_setting('WORKERS', 1), thread_name_prefix='geocode')
+    return _executor
+
+
+def _reset(**kwargs):
+    global _geocoder, _cache
+    if kwargs.get('setting') == 'GEOCODER':
+        _geocoder = None
+        _cache = None
+
+
+setting_changed.connect(_reset)
+
+
+def cell_for(lat, lng):
+    return geohash_encode(lat, lng, _setting('PRECISION', 7))
+
+
+def cached_address(lat, lng):
+    """The cached address for the cell containing (lat, lng), or None."""
+    return get_cache().get(cell_for(lat, lng))
+
+
+def lookup(lat, lng):
+    """Blocking, cached reverse geocode."""
+    cell = cell_for(lat, lng)
+    address = get_cache().get(cell)
+    if address is None:
+        address = get_geocoder().reverse(lat, lng)
+        if address:
+            get_cache().set(cell, address)
+    return address or ''
+
+
+def _fill_seller_address(seller_id, lat, lng):
+    from .models import Seller
+    key = (seller_id, cell_for(lat, lng))
+    with _in_flight_lock:
+        if key in _in_flight:
+            return
+        _in_flight.add(key)
+    try:
+        address = lookup(lat, lng)
+        if address:
+            # Skip the write if the seller has moved on since.
+            Seller.objects.filter(id=seller_id, location_lat=lat, location_lng=lng).update(
+                location_address=address
+            )
+    except Exception:
+        logger.exception("Reverse geocoding failed for seller %s", seller_id)
+    finally:
+        with _in_flight_lock:
+            _in_flight.discard(key)
+
+
+def _run_in_background(seller_id, lat, lng):
+    try:
+        _fill_seller_address(seller_id, lat, lng)
+    finally:
+        connection.close()
+
+
+def schedule_seller_address(seller_id, lat, lng):
+    """
+    Fill in Seller.location_address for (lat, lng) once the current
+    transaction commits. A seller who keeps reporting from the same cell
+    has at most one lookup in flight. With GEOCODER['ASYNC'] off the lookup
+    runs inline on commit.
+    """
+    if _setting('ASYNC', True):
+        transaction.on_commit(lambda: _get_executor().submit(_run_in_background, seller_id, lat, lng))
+    else:
+        transaction.on_commit(lambda: _fill_seller_address(seller_id, lat, lng))
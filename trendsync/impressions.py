@@ -0,0 +1,144 @@
+"""
+Write-behind buffer for QuickDeal impressions.
+
+`/quick-deals/<id>/view/` is the hottest write path in the API, so views
+are aggregated per deal and written back in bulk instead of updating the
+row on every impression. Two backends are available:
+
+- 'local': per-process CounterBuffer, flushed on an interval, once enough
+  deals are dirty and at interpreter exit (including SIGTERM in servers).
+- 'redis': a shared Redis hash, drained atomically by any process, e.g.
+  `manage.py flush_quickdeal_views --loop 10`.
+"""
+import logging
+import os
+import signal
+import sys
+import threading
+from collections import defaultdict
+
+from django.conf import settings
+
+from .counters import CounterBuffer, apply_delta
+from .models import QuickDeal
+
+logger = logging.getLogger(__name__)
+
+# Processes that serve requests and so can hold unflushed local views.
+SERVER_PROGRAMS = {'runserver', 'daphne', 'gunicorn', 'uvicorn'}
+
+
+def _setting(name, default):
+    return getattr(settings, 'QUICKDEAL_VIEWS', {}).get(name, default)
+
+
+class LocalImpressionBuffer:
+    def __init__(self, flush_interval, max_pending):
+        self.counters = CounterBuffer(flush_interval=flush_interval, max_pending=max_pending)
+
+    def add(self, deal_id, amount=1):
+        self.counters.add(QuickDeal, deal_id, 'views', amount)
+
+    def pending(self, deal_id):
+        return self.counters.pending(QuickDeal, deal_id, 'views')
+
+    def flush(self):
+        return self.counters.flush()
+
+
+class RedisImpressionBuffer:
+    PENDING_KEY = 'trendsync:quickdeal_views'
+    DRAINING_KEY = 'trendsync:quickdeal_views:draining'
+
+    def __init__(self, url):
+        import redis
+        self.client = redis.Redis.from_url(url)
+        self.response_error = redis.exceptions.ResponseError
+
+    def add(self, deal_id, amount=1):
+        self.client.hincrby(self.PENDING_KEY, deal_id, amount)
+
+    def pending(self, deal_id):
+        return int(self.client.hget(self.PENDING_KEY, deal_id) or 0)
+
+    def flush(self):
+        # RENAME is atomic, so views recorded while we write land in a fresh
+        # PENDING_KEY. A drain that died mid-way leaves DRAINING_KEY behind;
+        # finish that batch before taking a new one.
+        if not self.client.exists(self.DRAINING_KEY):
+            try:
+                self.client.rename(self.PENDING_KEY, self.DRAINING_KEY)
+            except self.response_error:
+                return 0  # nothing pending
+
+        groups = defaultdict(list)
+        for deal_id, amount in self.client.hgetall(self.DRAINING_KEY).items():
+            groups[int(amount)].append(int(deal_id))
+
+        written = 0
+        for amount, deal_ids in groups.items():
+            written += apply_delta(QuickDeal, deal_ids, 'views', amount)
+            # Drop each group as soon as it is written so a retry never
+            # applies it twice.
+            self.client.hdel(self.DRAINING_KEY, *deal_ids)
+        return written
+
+
+def _build_buffer():
+    backend = _setting('BACKEND', 'local')
+    if backend == 'redis':
+        return RedisImpressionBuffer(_setting('REDIS_URL', getattr(settings, 'REDIS_URL', None)))
+    return LocalImpressionBuffer(
+        flush_interval=_setting('FLUSH_INTERVAL', 10.0),
+        max_pending=_setting('MAX_PENDING', 500),
+    )
+
+
+buffer = _build_buffer()
+
+
+def record_view(deal, amount=1):
+    """Buffer an impression and bump deal.views to include unflushed views."""
+    buffer.add(deal.pk, amount)
+    deal.views += buffer.pending(deal.pk)
+
+
+def flush():
+    written = buffer.flush()
+    if written:
+        logger.info("Flushed quick deal views for %s deals", written)
+    return written
+
+
+def is_server_process(argv=None):
+    argv = sys.argv if argv is None else argv
+    if not argv:
+        return False
+    # `gunicorn ...`, `python -m daphne ...`, `manage.py runserver`
+    names = {os.path.basename(argv[0]), os.path.basename(os.path.dirname(argv[0]))}
+    names.update(argv[1:2])
+    return bool(SERVER_PROGRAMS & names)
+
+
+def install_shutdown_handler():
+    """
+    Make SIGTERM exit the interpreter normally in server processes using the
+    local buffer, so the CounterBuffer's atexit flush runs; atexit is skipped
+    when SIGTERM is left at SIG_DFL. The flush itself never runs in the
+    signal handler, where it could interleave with a query or transaction
+    open on the main thread's connection. A handler installed before (the
+    server's graceful shutdown) is chained to instead.
+    """
+    if not isinstance(buffer, LocalImpressionBuffer) or not is_server_process():
+        return
+    if threading.current_thread() is not threading.main_thread():
+        return
+    previous = signal.getsignal(signal.SIGTERM)
+
+    def handle_sigterm(signum, frame):
+        if callable(previous):
+            previous(signum, frame)
+        elif previous != signal.SIG_IGN:
+            raise SystemExit(0)
+
+    signal.signal(signal.SIGTERM, handle_sigterm)
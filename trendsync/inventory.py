@@ -0,0 +1,46 @@
+from django.db import models, transaction
+from django.db.models import Case, F, Q, When
+
+from . import cache as product_cache
+from .models import Product
+
+
+def adjust_stock(quantities):
+    """
+    Apply {product_id: delta} to stock_quantity in one conditional UPDATE.
+    Returns False (and changes nothing) if any product would go below zero:
+    the UPDATE runs in a savepoint that is rolled back when it misses a row.
+    """
+    if not quantities:
+        return True
+    enough_stock = Q()
+    for product_id, delta in quantities.items():
+        if delta < 0:
+            enough_stock |= Q(id=product_id, stock_quantity__gte=-delta)
+        else:
+            enough_stock |= Q(id=product_id)
+    with transaction.atomic():
+        updated = Product.objects.filter(enough_stock).update(
+            stock_quantity=Case(
+                *[When(id=product_id, then=F('stock_quantity') + delta) for product_id, delta in quantities.items()],
+                default=F('stock_quantity'),
+                output_field=models.PositiveIntegerField(),
+            )
+        )
+        if updated != len(quantities):
+            transaction.set_rollback(True)
+            return False
+    return True
+
+
+def restore_order_stock(order):
+    """Give a cancelled order's reserved units back to stock."""
+    quantities = {}
+    for product_id, quantity in order.items.values_list('product_id', 'quantity'):
+        quantities[product_id] = quantities.get(product_id, 0) + quantity
+    if not quantities:
+        return
+    adjust_stock(quantities)
+    # Cached payloads carry stock_quantity.
+    products = list(Product.objects.filter(id__in=quantities).only('id', 'seller_id', 'category_id'))
+    transaction.on_commit(lambda: product_cache.invalidate_products(products))
@@ -0,0 +1,102 @@
+"""
+Live seller locations streamed over WebSocket (see SellerLocationConsumer).
+
+Sellers may report GPS several times a second. Buyers get at most one
+update per BROADCAST_INTERVAL per seller, always the latest position. The
+database row is written only after the seller has moved PERSIST_DISTANCE_M
+metres or PERSIST_INTERVAL seconds have passed since the last write, and
+once more when the stream closes.
+"""
+import time
+
+from django.conf import settings
+
+from . import geocoding
+from .geo import geohash_encode, haversine_km
+from .models import Seller
+
+
+def _setting(name, default):
+    return getattr(settings, 'LOCATION_STREAM', {}).get(name, default)
+
+
+def seller_location_group(seller_id):
+    return f'seller_location_{seller_id}'
+
+
+class LocationThrottle:
+    """Decides when a stream of positions should be broadcast and persisted."""
+
+    def __init__(self, broadcast_interval=None, persist_interval=None, persist_distance_m=None):
+        self.broadcast_interval = broadcast_interval if broadcast_interval is not None else _setting('BROADCAST_INTERVAL', 1.0)
+        self.persist_interval = persist_interval if persist_interval is not None else _setting('PERSIST_INTERVAL', 30.0)
+        self.persist_distance_m = persist_distance_m if persist_distance_m is not None else _setting('PERSIST_DISTANCE_M', 100)
+        self.last_broadcast_at = None
+        self.last_persisted_at = None
+        self.last_persisted = None
+        self.latest = None
+
+    def update(self, position):
+        self.latest = position
+
+    def broadcast_delay(self, now=None):
+        """Seconds until the latest position may be broadcast (0 = now)."""
+        now = now if now is not None else time.monotonic()
+        if self.last_broadcast_at is None:
+            return 0
+        return max(0.0, self.last_broadcast_at + self.broadcast_interval - now)
+
+    def mark_broadcast(self, now=None):
+        self.last_broadcast_at = now if now is not None else time.monotonic()
+
+    def should_persist(self, now=None):
+        now = now if now is not None else time.monotonic()
+        if self.latest is None:
+            return False
+        if self.last_persisted is None:
+            return True
+        if now - self.last_persisted_at >= self.persist_interval:
+            return self.latest != self.last_persisted
+        moved_m = 1000 * haversine_km(
+            self.last_persisted['lat'], self.last_persisted['lng'], self.latest['lat'], self.latest['lng']
+        )
+        return moved_m >= self.persist_distance_m
+
+    def mark_persisted(self, now=None):
+        self.last_persisted_at = now if now is not None else time.monotonic()
+        self.last_persisted = self.latest
+
+    @property
+    def has_unpersisted(self):
+        return self.latest is not None and self.latest != self.last_persisted
+
+
+def persist_seller_location(seller_id, lat, lng):
+    """
+    Write a streamed position with one UPDATE, without signals. If the
+    address for this cell is not cached, the previous address is kept until
+    the background geocoder fills in the new one.
+    """
+    address = geocoding.cached_address(lat, lng)
+    fields = {'location_lat': lat, 'location_lng': lng, 'location_geohash': geohash_encode(lat, lng)}
+    if address is not None:
+        fields['location_address'] = address
+    Seller.objects.filter(id=seller_id).update(**fields)
+    if address is None:
+        geocoding.schedule_seller_address(seller_id, lat, lng)
+
+
+def last_known_location(seller_id):
+    row = (
+        Seller.objects.filter(id=seller_id, location_lat__isnull=False)
+        .values('location_lat', 'location_lng', 'location_address')
+        .first()
+    )
+    if row is None:
+        return None
+    return {
+        'seller_id': seller_id,
+        'lat': row['location_lat'],
+        'lng': row['location_lng'],
+        'address': row['location_address'],
+    }
@@ -0,0 +1,89 @@
+import re
+from collections import defaultdict
+from datetime import timedelta
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from trendsync.models import Buyer, Seller, SellerRating, SimpleNotification
+from trendsync.ratings import refresh_seller_totals
+
+REVIEW_RE = re.compile(r'rated your service (\d+)/5\.? ?(.*)', re.DOTALL)
+CONFIRMATION_RE = re.compile(r'^You rated (.*) (\d+)/5\. Thank you for your feedback!$', re.DOTALL)
+
+# rate_seller wrote the seller's review and the buyer's confirmation back to back.
+PAIR_WINDOW = timedelta(seconds=5)
+
+
+class Command(BaseCommand):
+    help = (
+        "Migrate ratings that were only stored as 'review' SimpleNotifications "
+        "into SellerRating and recompute seller rating totals and trust"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--dry-run', action='store_true', help="Report what would be imported without writing")
+
+    def handle(self, *args, **options):
+        sellers = {row['user_id']: row for row in Seller.objects.values('id', 'user_id', 'name')}
+        buyers_by_user = {row['user_id']: row for row in Buyer.objects.values('id', 'user_id', 'name')}
+        buyers_by_name = defaultdict(list)
+        for buyer in buyers_by_user.values():
+            buyers_by_name[buyer['name']].append(buyer['id'])
+
+        # (seller name, rating) -> [(created_at, buyer user id)] from the buyers' confirmations
+        confirmations = defaultdict(list)
+        for row in SimpleNotification.objects.filter(type='review_confirmation').values(
+            'recipient_id', 'message', 'created_at'
+        ).iterator():
+            match = CONFIRMATION_RE.match(row['message'])
+            if match:
+                confirmations[(match.group(1), int(match.group(2)))].append([row['created_at'], row['recipient_id']])
+
+        ratings = {}
+        parsed = skipped = 0
+        reviews = SimpleNotification.objects.filter(type='review').order_by('created_at', 'id').values(
+            'recipient_id', 'sender_name', 'message', 'created_at'
+        )
+        for row in reviews.iterator():
+            match = REVIEW_RE.search(row['message'])
+            seller = sellers.get(row['recipient_id'])
+            if not match or seller is None or not 1 <= int(match.group(1)) <= 5:
+                skipped += 1
+                continue
+            parsed += 1
+            rating = int(match.group(1))
+            buyer_id = self.pair_buyer(
+                confirmations[(seller['name'], rating)], row, buyers_by_user
+            ) or self.unique_buyer(buyers_by_name, row['sender_name'])
+            if buyer_id is None:
+                skipped += 1
+                continue
+            # Later ratings replace earlier ones, as they do in rate_seller.
+            ratings[(buyer_id, seller['id'])] = SellerRating(
+                buyer_id=buyer_id, seller_id=seller['id'], rating=rating, comment=match.group(2).strip()
+            )
+
+        self.stdout.write(f"Parsed {parsed} review notifications; {len(ratings)} ratings to import, {skipped} skipped.")
+        if options['dry_run']:
+            return
+
+        with transaction.atomic():
+            # Ratings already stored in SellerRating are newer and win.
+            SellerRating.objects.bulk_create(list(ratings.values()), ignore_conflicts=True, batch_size=500)
+            refreshed = refresh_seller_totals({seller_id for _, seller_id in ratings})
+        self.stdout.write(self.style.SUCCESS(f"Imported ratings and refreshed totals for {refreshed} sellers."))
+
+    def pair_buyer(self, candidates, review, buyers_by_user):
+        for candidate in candidates:
+            created_at, buyer_user_id = candidate
+            buyer = buyers_by_user.get(buyer_user_id)
+            if (buyer_user_id is not None and buyer is not None and buyer['name'] == review['sender_name']
+                    and abs(created_at - review['created_at']) <= PAIR_WINDOW):
+                candidate[1] = None  # each confirmation pairs with one review
+                return buyer['id']
+        return None
+
+    def unique_buyer(self, buyers_by_name, name):
+        matches = buyers_by_name.get(name, [])
+        return matches[0] if len(matches) == 1 else None
@@ -0,0 +1,102 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.core.management.base import BaseCommand
+
+from trendsync import realtime
+
+# The pre-topic global group, addressed as a topic so both rows are timed
+# through realtime.publish with the same message.
+LEGACY_TOPIC = ('trendsync', 'updates')
+LEGACY_GROUP = realtime.group_name(*LEGACY_TOPIC)
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare WebSocket fan-out cost: one global group of every connection "
+        "versus topic groups sized by their subscribers"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=5000,
+                            help="Total open connections (all in the legacy global group)")
+        parser.add_argument('--subscribers', default='10,100,1000',
+                            help="Comma-separated topic sizes to measure")
+        parser.add_argument('--messages', type=int, default=200, help="Messages published per run")
+        parser.add_argument('--layer', choices=['memory', 'configured'], default='memory',
+                            help="Use a fresh InMemoryChannelLayer or CHANNEL_LAYERS['default']")
+
+    def handle(self, *args, **options):
+        async_to_sync(self.run)(options)
+
+    async def run(self, options):
+        connections = options['connections']
+        messages = options['messages']
+        sizes = [int(size) for size in options['subscribers'].split(',') if size]
+        if options['layer'] == 'memory':
+            # Room for every message so ChannelFull never short-circuits a send.
+            layer = InMemoryChannelLayer(capacity=messages + 10, expiry=600)
+        else:
+            layer = get_channel_layer()
+
+        channels = [await layer.new_channel() for _ in range(connections)]
+        for channel in channels:
+            await layer.group_add(LEGACY_GROUP, channel)
+        for topic_id, size in enumerate(sizes):
+            for channel in channels[:size]:
+                await layer.group_add(realtime.group_name('seller', topic_id), channel)
+
+        self.stdout.write(f"{connections} connections, {messages} messages per run\n")
+        self.stdout.write(f"{'target':<28}{'deliveries/msg':>16}{'us/msg':>12}{'vs global':>12}")
+
+        legacy = await self.time_sends(layer, messages, lambda: realtime.publish(
+            *LEGACY_TOPIC, 'bench', {}, channel_layer=layer
+        ))
+        await self.drain(layer, channels)
+        self.stdout.write(f"{'global group (before)':<28}{connections:>16}{legacy:>12.1f}{1:>11.1f}x")
+
+        slower = []
+        for topic_id, size in enumerate(sizes):
+            elapsed = await self.time_sends(layer, messages, lambda: realtime.publish(
+                'seller', topic_id, 'bench', {}, channel_layer=layer
+            ))
+            await self.drain(layer, channels[:size])
+            speedup = legacy / elapsed if elapsed else float('inf')
+            self.stdout.write(f"{f'topic, {size} subscribers':<28}{size:>16}{elapsed:>12.1f}{speedup:>11.1f}x")
+            if size < connections and elapsed >= legacy:
+                slower.append(size)
+
+        for channel in channels:
+            await layer.group_discard(LEGACY_GROUP, channel)
+        for topic_id, size in enumerate(sizes):
+            for channel in channels[:size]:
+                await layer.group_discard(realtime.group_name('seller', topic_id), channel)
+        if slower:
+            self.stdout.write(self.style.WARNING(
+                f"Topics with {', '.join(map(str, slower))} subscribers were no cheaper than the global group."
+            ))
+        else:
+            self.stdout.write(self.style.SUCCESS(
+                f"Every topic smaller than {connections} connections was cheaper than the global group."
+            ))
+
+    async def time_sends(self, layer, messages, send):
+        started = time.perf_counter()
+        for _ in range(messages):
+            await send()
+        return (time.perf_counter() - started) / messages * 1e6
+
+    async def drain(self, layer, channels):
+        if isinstance(layer, InMemoryChannelLayer):
+            # Drop queued messages without timing receives.
+            for channel in channels:
+                layer.channels.pop(channel, None)
+            return
+        for channel in channels:
+            try:
+                while True:
+                    await asyncio.wait_for(layer.receive(channel), timeout=0.01)
+            except asyncio.TimeoutError:
+                pass
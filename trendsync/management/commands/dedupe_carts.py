@@ -0,0 +1,61 @@
+from collections import defaultdict
+
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from django.db.models import Count
+
+from trendsync.models import Cart, CartItem
+
+
+class Command(BaseCommand):
+    help = "Merge legacy duplicate carts (same buyer or session) into one cart each"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Looking for duplicate carts...")
+        with transaction.atomic():
+            merged = self.merge_duplicates('buyer_id') + self.merge_duplicates('session_key')
+        self.stdout.write(self.style.SUCCESS(f"Merged {merged} duplicate carts."))
+
+    def merge_duplicates(self, owner_field):
+        owners = (
+            Cart.objects.exclude(**{f'{owner_field}__isnull': True})
+            .values(owner_field)
+            .annotate(total=Count('id'))
+            .filter(total__gt=1)
+            .values_list(owner_field, flat=True)
+        )
+        carts = Cart.objects.filter(**{f'{owner_field}__in': list(owners)}).order_by('id')
+
+        # The oldest cart per owner survives, matching the old get_cart merge.
+        primary_of = {}
+        for cart_id, owner in carts.values_list('id', owner_field):
+            primary_of.setdefault(owner, cart_id)
+        extra_cart_ids = [
+            cart_id for cart_id, owner in carts.values_list('id', owner_field)
+            if primary_of[owner] != cart_id
+        ]
+        if not extra_cart_ids:
+            return 0
+
+        items = CartItem.objects.filter(cart__in=carts).select_related('cart').order_by('cart_id')
+        kept = {}
+        to_update = []
+        to_move = []
+        for item in items:
+            primary_id = primary_of[getattr(item.cart, owner_field)]
+            key = (primary_id, item.product_id)
+            if item.cart_id == primary_id or key not in kept:
+                if item.cart_id != primary_id:
+                    item.cart_id = primary_id
+                    to_move.append(item)
+                kept[key] = item
+            else:
+                kept[key].quantity += item.quantity
+                to_update.append(kept[key])
+
+        # Move unique lines over first; lines that collided are summed into
+        # the surviving line and go away with their cart.
+        CartItem.objects.bulk_update(to_move, ['cart'])
+        CartItem.objects.bulk_update(list({item.id: item for item in to_update}.values()), ['quantity'])
+        Cart.objects.filter(id__in=extra_cart_ids).delete()
+        return len(extra_cart_ids)
@@ -0,0 +1,22 @@
+from django.core.management.base import BaseCommand
+
+from trendsync.dusupay_fake import FakeDusuPayServer
+
+
+class Command(BaseCommand):
+    help = "Run a local fake DusuPay API (point DUSUPAY_API_BASE_URL at it)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--port', type=int, default=8099)
+        parser.add_argument('--latency', type=float, default=0.0,
+                            help="Seconds to sleep before every response")
+
+    def handle(self, *args, **options):
+        server = FakeDusuPayServer(port=options['port'], latency=options['latency'])
+        self.stdout.write(self.style.SUCCESS(f"Fake DusuPay listening on {server.url}"))
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.stop()
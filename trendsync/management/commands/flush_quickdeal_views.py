@@ -0,0 +1,24 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from trendsync import impressions
+
+
+class Command(BaseCommand):
+    help = "Write buffered QuickDeal impressions back to the database"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=float, metavar='SECONDS',
+            help="Keep draining every SECONDS instead of exiting after one pass",
+        )
+
+    def handle(self, *args, **options):
+        interval = options['loop']
+        while True:
+            total = impressions.flush()
+            self.stdout.write(self.style.SUCCESS(f"Flushed views for {total} quick deals."))
+            if not interval:
+                break
+            time.sleep(interval)
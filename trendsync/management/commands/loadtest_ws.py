@@ -0,0 +1,126 @@
+import asyncio
+import time
+
+from asgiref.sync import async_to_sync
+from channels.layers import DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer, channel_layers, get_channel_layer
+from channels.testing import WebsocketCommunicator
+from django.core.management.base import BaseCommand, CommandError
+
+from trendsync import realtime
+from trendsync.models import Seller
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    index = min(len(sorted_values) - 1, int(round(pct / 100 * (len(sorted_values) - 1))))
+    return sorted_values[index]
+
+
+class Command(BaseCommand):
+    """
+    Connections are opened in this process with WebsocketCommunicator, not
+    over ws:// to a running server, so every subscriber and the publisher
+    share one process. With --layer configured the messages still make the
+    round trip through Redis (and the batcher), which measures the channel
+    layer; delivery across Daphne workers is not exercised.
+    """
+    help = (
+        "Open many in-process WebSocket connections against config.asgi.application, "
+        "subscribe them to seller topics and report delivery latency percentiles "
+        "(measures the channel layer, not delivery across Daphne workers)"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--connections', type=int, default=2000, help="WebSocket connections to open")
+        parser.add_argument('--topics', type=int, default=10,
+                            help="Seller topics to spread connections over (uses existing sellers)")
+        parser.add_argument('--messages', type=int, default=50, help="Messages published to each topic")
+        parser.add_argument('--rate', type=float, default=200.0, help="Total publishes per second")
+        parser.add_argument('--timeout', type=float, default=30.0, help="Seconds to wait for deliveries")
+        parser.add_argument('--layer', choices=['memory', 'configured'], default='configured',
+                            help="Swap in a fresh InMemoryChannelLayer or use CHANNEL_LAYERS['default']")
+
+    def handle(self, *args, **options):
+        seller_ids = list(Seller.objects.order_by('id').values_list('id', flat=True)[:options['topics']])
+        if not seller_ids:
+            raise CommandError("No sellers to subscribe to; create at least one Seller first.")
+
+        previous = None
+        if options['layer'] == 'memory':
+            previous = channel_layers.set(DEFAULT_CHANNEL_LAYER, InMemoryChannelLayer(capacity=10000))
+        try:
+            async_to_sync(self.run)(options, seller_ids)
+        finally:
+            if previous is not None:
+                channel_layers.set(DEFAULT_CHANNEL_LAYER, previous)
+
+    async def run(self, options, seller_ids):
+        from config.asgi import application
+
+        layer = get_channel_layer()
+        batcher = realtime.get_batcher()
+        self.stdout.write(
+            f"{options['connections']} connections over {len(seller_ids)} topics, "
+            f"{options['messages']} messages per topic via {type(layer).__name__}"
+            f"{' (batched)' if batcher else ''}"
+        )
+
+        started = time.perf_counter()
+        communicators = []
+        for index in range(options['connections']):
+            seller_id = seller_ids[index % len(seller_ids)]
+            communicator = WebsocketCommunicator(application, '/ws/')
+            connected, _ = await communicator.connect()
+            if not connected:
+                raise CommandError(f"Connection {index} was rejected")
+            await communicator.send_json_to({'type': 'subscribe', 'topic': f'seller:{seller_id}'})
+            reply = await communicator.receive_json_from(timeout=options['timeout'])
+            if reply.get('type') != 'subscribed':
+                raise CommandError(f"Subscribe failed: {reply}")
+            communicators.append((communicator, seller_id))
+        setup = time.perf_counter() - started
+        self.stdout.write(f"connected and subscribed in {setup:.2f}s")
+
+        subscribers = {seller_id: 0 for seller_id in seller_ids}
+        for _, seller_id in communicators:
+            subscribers[seller_id] += 1
+        expected = sum(subscribers.values()) * options['messages']
+
+        latencies = []
+        deadline = time.perf_counter() + options['timeout']
+
+        async def collect(communicator):
+            for _ in range(options['messages']):
+                remaining = deadline - time.perf_counter()
+                if remaining <= 0:
+                    return
+                try:
+                    frame = await communicator.receive_json_from(timeout=remaining)
+                except asyncio.TimeoutError:
+                    return
+                latencies.append(time.perf_counter() - frame['data']['sent_at'])
+
+        collectors = [asyncio.create_task(collect(communicator)) for communicator, _ in communicators]
+
+        interval = 1.0 / options['rate'] if options['rate'] > 0 else 0
+        publish_started = time.perf_counter()
+        for seq in range(options['messages']):
+            for seller_id in seller_ids:
+                await realtime.publish('seller', seller_id, 'loadtest', {'seq': seq, 'sent_at': time.perf_counter()})
+                if interval:
+                    await asyncio.sleep(interval)
+        await asyncio.gather(*collectors)
+        elapsed = time.perf_counter() - publish_started
+
+        for communicator, _ in communicators:
+            await communicator.disconnect()
+
+        latencies.sort()
+        delivered = len(latencies)
+        self.stdout.write(f"delivered {delivered}/{expected} in {elapsed:.2f}s ({delivered / elapsed:.0f}/s)")
+        self.stdout.write(f"{'p50':>8}{'p90':>8}{'p99':>8}{'max':>8}  (ms)")
+        self.stdout.write(''.join(f"{percentile(latencies, pct) * 1000:>8.1f}" for pct in (50, 90, 99, 100)))
+        if delivered < expected:
+            raise CommandError(f"{expected - delivered} deliveries missing after {options['timeout']}s")
+        self.stdout.write(self.style.SUCCESS("All messages delivered."))
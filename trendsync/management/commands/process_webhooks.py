@@ -0,0 +1,32 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from trendsync.webhooks import WEBHOOK_BATCH_SIZE, process_webhook_inbox
+
+
+class Command(BaseCommand):
+    help = "Apply queued DusuPay webhook deliveries to orders in batches"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=float, metavar='SECONDS',
+            help="Keep polling the inbox every SECONDS instead of exiting once it is empty",
+        )
+        parser.add_argument('--batch-size', type=int, default=WEBHOOK_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        interval = options['loop']
+        while True:
+            # Drain everything that is queued before sleeping. Events that
+            # fail are rescheduled, so stop once a batch applies nothing.
+            while True:
+                summary = process_webhook_inbox(options['batch_size'])
+                if any(summary.values()):
+                    message = "Processed {processed} webhooks ({failed} failed, {orphaned} without an order yet)."
+                    self.stdout.write(self.style.SUCCESS(message.format(**summary)))
+                if not summary['processed']:
+                    break
+            if not interval:
+                break
+            time.sleep(interval)
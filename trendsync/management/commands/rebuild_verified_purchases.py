@@ -0,0 +1,12 @@
+from django.core.management.base import BaseCommand
+
+from trendsync.purchases import rebuild_verified_purchases
+
+
+class Command(BaseCommand):
+    help = "Rebuild the verified-purchase table from delivered orders"
+
+    def handle(self, *args, **options):
+        self.stdout.write("Rebuilding verified purchases...")
+        total = rebuild_verified_purchases()
+        self.stdout.write(self.style.SUCCESS(f"Wrote {total} verified purchases."))
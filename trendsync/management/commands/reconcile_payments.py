@@ -0,0 +1,38 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from trendsync.dusupay_utils import DusuPayClient
+from trendsync.reconciliation import expire_unpaid_orders, reconcile_pending_orders
+
+
+class Command(BaseCommand):
+    help = (
+        "Settle pending DusuPay orders by polling the gateway in batches, and "
+        "cancel stale pending orders that never started a payment"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--loop', type=float, metavar='SECONDS',
+            help="Keep reconciling every SECONDS instead of exiting after one pass",
+        )
+        parser.add_argument('--batch-size', type=int)
+        parser.add_argument('--concurrency', type=int)
+
+    def handle(self, *args, **options):
+        client = DusuPayClient()
+        interval = options['loop']
+        while True:
+            summary = reconcile_pending_orders(
+                client, batch_size=options['batch_size'], concurrency=options['concurrency'],
+            )
+            self.stdout.write(self.style.SUCCESS(
+                "Checked {checked} orders: {paid} paid, {cancelled} cancelled, {pending} still pending.".format(**summary)
+            ))
+            expired = expire_unpaid_orders(batch_size=options['batch_size'])
+            if expired:
+                self.stdout.write(self.style.SUCCESS(f"Expired {expired} unpaid orders and restored their stock."))
+            if not interval:
+                break
+            time.sleep(interval)
@@ -0,0 +1,27 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:09
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0009_alter_quickdeal_options_remove_quickdeal_priority_and_more'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='order',
+            name='next_reconcile_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='order',
+            name='reconcile_attempts',
+            field=models.PositiveSmallIntegerField(default=0),
+        ),
+        migrations.AddIndex(
+            model_name='order',
+            index=models.Index(fields=['status', 'next_reconcile_at'], name='order_reconcile_idx'),
+        ),
+    ]
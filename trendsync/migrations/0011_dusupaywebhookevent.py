@@ -0,0 +1,31 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:11
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0010_order_next_reconcile_at_order_reconcile_attempts_and_more'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='DusuPayWebhookEvent',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('internal_reference', models.CharField(max_length=100)),
+                ('event', models.CharField(max_length=50)),
+                ('merchant_reference', models.CharField(blank=True, max_length=100)),
+                ('payload', models.JSONField(default=dict)),
+                ('received_at', models.DateTimeField(auto_now_add=True)),
+                ('processed_at', models.DateTimeField(blank=True, null=True)),
+                ('attempts', models.PositiveSmallIntegerField(default=0)),
+                ('last_error', models.TextField(blank=True)),
+            ],
+            options={
+                'indexes': [models.Index(condition=models.Q(('processed_at__isnull', True)), fields=['id'], name='webhook_inbox_pending_idx')],
+                'constraints': [models.UniqueConstraint(fields=('internal_reference', 'event'), name='webhook_event_unique')],
+            },
+        ),
+    ]
@@ -0,0 +1,32 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:13
+
+from django.db import migrations, models
+
+from trendsync.geo import geohash_encode
+
+
+def backfill_geohash(apps, schema_editor):
+    Seller = apps.get_model('trendsync', 'Seller')
+    sellers = list(
+        Seller.objects.filter(location_lat__isnull=False, location_lng__isnull=False)
+        .only('id', 'location_lat', 'location_lng')
+    )
+    for seller in sellers:
+        seller.location_geohash = geohash_encode(seller.location_lat, seller.location_lng)
+    Seller.objects.bulk_update(sellers, ['location_geohash'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0011_dusupaywebhookevent'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seller',
+            name='location_geohash',
+            field=models.CharField(blank=True, db_index=True, editable=False, max_length=12),
+        ),
+        migrations.RunPython(backfill_geohash, migrations.RunPython.noop),
+    ]
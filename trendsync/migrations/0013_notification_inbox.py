@@ -0,0 +1,33 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:30
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('auth', '0012_alter_user_first_name_max_length'),
+        ('trendsync', '0012_seller_location_geohash'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='NotificationCounter',
+            fields=[
+                ('user', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, primary_key=True, related_name='notification_counter', serialize=False, to=settings.AUTH_USER_MODEL)),
+                ('unread', models.PositiveIntegerField(default=0)),
+                ('simple_unread', models.PositiveIntegerField(default=0)),
+            ],
+        ),
+        migrations.AddIndex(
+            model_name='notification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='notification_inbox_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='simplenotification',
+            index=models.Index(fields=['recipient', '-created_at', '-id'], name='simple_notification_inbox_idx'),
+        ),
+    ]
@@ -0,0 +1,23 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:32
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0013_notification_inbox'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='seller',
+            name='rating_count',
+            field=models.PositiveIntegerField(default=0),
+        ),
+        migrations.AddField(
+            model_name='seller',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:34
+
+from decimal import ROUND_HALF_UP, Decimal
+
+from django.db import migrations, models
+from django.db.models import Count, Sum
+
+
+def backfill_ratings(apps, schema_editor):
+    Product = apps.get_model('trendsync', 'Product')
+    products = list(
+        Product.objects.order_by().annotate(total=Sum('comments__rating'), count=Count('comments'))
+        .only('id', 'rating_sum', 'rating_number', 'rating_magnitude')
+    )
+    for product in products:
+        product.rating_sum = product.total or 0
+        product.rating_number = product.count
+        product.rating_magnitude = (
+            (Decimal(product.rating_sum) / product.count).quantize(Decimal('0.01'), rounding=ROUND_HALF_UP)
+            if product.count else Decimal('0.00')
+        )
+    Product.objects.bulk_update(products, ['rating_sum', 'rating_number', 'rating_magnitude'], batch_size=500)
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0014_seller_rating_totals'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='product',
+            name='rating_sum',
+            field=models.PositiveIntegerField(default=0, editable=False),
+        ),
+        migrations.RunPython(backfill_ratings, migrations.RunPython.noop),
+    ]
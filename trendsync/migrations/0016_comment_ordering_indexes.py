@@ -0,0 +1,21 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:35
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0015_product_rating_sum'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='productcomment',
+            index=models.Index(fields=['product', '-created_at', '-id'], name='comment_newest_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='productcomment',
+            index=models.Index(fields=['product', '-helpful_votes', '-id'], name='comment_helpful_idx'),
+        ),
+    ]
@@ -0,0 +1,40 @@
+# Generated by Django 6.1.2 on 2026-10-17 00:37
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+def backfill_verified_purchases(apps, schema_editor):
+    OrderItem = apps.get_model('trendsync', 'OrderItem')
+    VerifiedPurchase = apps.get_model('trendsync', 'VerifiedPurchase')
+    pairs = (
+        OrderItem.objects.filter(order__status='delivered')
+        .values_list('order__buyer_id', 'product_id').distinct()
+    )
+    VerifiedPurchase.objects.bulk_create(
+        [VerifiedPurchase(buyer_id=buyer_id, product_id=product_id) for buyer_id, product_id in pairs],
+        batch_size=1000,
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0016_comment_ordering_indexes'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='VerifiedPurchase',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('verified_at', models.DateTimeField(auto_now_add=True)),
+                ('buyer', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verified_purchases', to='trendsync.buyer')),
+                ('product', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='verified_purchases', to='trendsync.product')),
+            ],
+            options={
+                'constraints': [models.UniqueConstraint(fields=('buyer', 'product'), name='verified_purchase_unique')],
+            },
+        ),
+        migrations.RunPython(backfill_verified_purchases, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 6.1.2 on 2026-10-17 01:02
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('trendsync', '0017_verified_purchase'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='dusupaywebhookevent',
+            name='next_attempt_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+    ]
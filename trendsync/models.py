@@ -4,6 +4,7 @@ from django.core.validators import MinValueValidator, MaxValueValidator
 from decimal import Decimal
 from django.utils import timezone
 from datetime import timedelta
+from .geo import geohash_encode
 
 class Category(models.Model):
     name = models.CharField(max_length=200)
@@ -31,6 +32,9 @@ class Seller(models.Model):
         validators=[MinValueValidator(0), MaxValueValidator(100)]
     )
     followers = models.PositiveIntegerField(default=0)
+    # Running SellerRating totals; trust is derived from them (see trendsync/ratings.py).
+    rating_sum = models.PositiveIntegerField(default=0)
+    rating_count = models.PositiveIntegerField(default=0)
     about = models.TextField(blank=True)
     profile_photo = models.ImageField(upload_to='sellers/', blank=True, null=True)
     passport_photo = models.ImageField(upload_to='sellers/id/', blank=True, null=True)
@@ -39,6 +43,8 @@ class Seller(models.Model):
     location_lat = models.FloatField(null=True, blank=True)
     location_lng = models.FloatField(null=True, blank=True)
     location_address = models.TextField(blank=True)  
+    # Maintained from location_lat/lng on save; indexed for proximity queries.
+    location_geohash = models.CharField(max_length=12, blank=True, db_index=True, editable=False)
 
     # New payment fields
     PAYMENT_METHOD_CHOICES = (
@@ -56,6 +62,17 @@ class Seller(models.Model):
     def __str__(self):
         return self.name
 
+    def save(self, *args, **kwargs):
+        geohash = ''
+        if self.location_lat is not None and self.location_lng is not None:
+            geohash = geohash_encode(self.location_lat, self.location_lng)
+        if geohash != self.location_geohash:
+            self.location_geohash = geohash
+            update_fields = kwargs.get('update_fields')
+            if update_fields is not None:
+                kwargs['update_fields'] = {*update_fields, 'location_geohash'}
+        super().save(*args, **kwargs)
+
 
 
 class Buyer(models.Model):
@@ -82,8 +99,10 @@ class Product(models.Model):
     description = models.TextField(blank=True)
     min_order = models.PositiveIntegerField(default=1)
     max_order = models.PositiveIntegerField(default=1000)
+    # Comment rating count / mean, kept by products/services/ratings.py.
     rating_number = models.PositiveIntegerField(default=0)
     rating_magnitude = models.DecimalField(max_digits=4, decimal_places=2, default=0.00)
+    rating_sum = models.PositiveIntegerField(default=0, editable=False)
     sales_count = models.PositiveIntegerField(default=0)
     like_count = models.PositiveIntegerField(default=0)
 
@@ -113,6 +132,12 @@ class ProductComment(models.Model):
     created_at = models.DateTimeField(auto_now_add=True)
     updated_at = models.DateTimeField(auto_now=True)
 
+    class Meta:
+        indexes = [
+            models.Index(fields=['product', '-created_at', '-id'], name='comment_newest_idx'),
+            models.Index(fields=['product', '-helpful_votes', '-id'], name='comment_helpful_idx'),
+        ]
+
     def __str__(self):
         return f"Comment by {self.buyer} on {self.product}"
 
@@ -201,6 +226,14 @@ class Order(models.Model):
     currency = models.CharField(max_length=3, default='UGX')   
     dusupay_internal_reference = models.CharField(max_length=100, blank=True, null=True)
     dusupay_merchant_reference = models.CharField(max_length=100, blank=True, null=True)
+    # Payment reconciliation schedule (see trendsync/reconciliation.py)
+    reconcile_attempts = models.PositiveSmallIntegerField(default=0)
+    next_reconcile_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['status', 'next_reconcile_at'], name='order_reconcile_idx'),
+        ]
 
 class OrderItem(models.Model):
     order = models.ForeignKey(Order, on_delete=models.CASCADE, related_name='items')
@@ -210,6 +243,21 @@ class OrderItem(models.Model):
     subtotal = models.DecimalField(max_digits=12, decimal_places=0)
 
 
+class VerifiedPurchase(models.Model):
+    """(buyer, product) pairs with a delivered order, kept by trendsync/purchases.py"""
+    buyer = models.ForeignKey(Buyer, on_delete=models.CASCADE, related_name='verified_purchases')
+    product = models.ForeignKey(Product, on_delete=models.CASCADE, related_name='verified_purchases')
+    verified_at = models.DateTimeField(auto_now_add=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['buyer', 'product'], name='verified_purchase_unique'),
+        ]
+
+    def __str__(self):
+        return f"{self.buyer_id} bought {self.product_id}"
+
+
 class Payment(models.Model):
     STATUS_CHOICES = (
         ('pending', 'Pending'),
@@ -293,8 +341,8 @@ class QuickDeal(models.Model):
         return f"{self.caption}"
     
     def increment_views(self):
-        self.views += 1
-        self.save()
+        from .impressions import record_view
+        record_view(self)
     
     def is_expired(self):
         return timezone.now() > self.expires_at
@@ -363,6 +411,9 @@ class Notification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='notification_inbox_idx'),
+        ]
     
     def __str__(self):
         return f"{self.notification_type} for {self.recipient.username}"
@@ -377,10 +428,22 @@ class SimpleNotification(models.Model):
     
     class Meta:
         ordering = ['-created_at']
+        indexes = [
+            models.Index(fields=['recipient', '-created_at', '-id'], name='simple_notification_inbox_idx'),
+        ]
     
     def __str__(self):
         return f"Notification for {self.recipient.username}: {self.message}"
 
+class NotificationCounter(models.Model):
+    """Denormalized unread counts per user, kept by trendsync/notifications.py"""
+    user = models.OneToOneField(User, on_delete=models.CASCADE, primary_key=True, related_name='notification_counter')
+    unread = models.PositiveIntegerField(default=0)
+    simple_unread = models.PositiveIntegerField(default=0)
+
+    def __str__(self):
+        return f"Unread counts for {self.user_id}"
+
 class SellerRating(models.Model):
     buyer = models.ForeignKey(Buyer, on_delete=models.CASCADE, related_name='seller_ratings')
     seller = models.ForeignKey(Seller, on_delete=models.CASCADE, related_name='ratings')
@@ -405,4 +468,33 @@ class DusuPayConfig(models.Model):
 
     class Meta:
         verbose_name = "DusuPay Configuration"
-        verbose_name_plural = "DusuPay Configuration"
\ No newline at end of file
+        verbose_name_plural = "DusuPay Configuration"
+
+class DusuPayWebhookEvent(models.Model):
+    """
+    Append-only inbox of DusuPay webhook deliveries.
+
+    The webhook view only inserts here (duplicates of a gateway retry hit the
+    unique constraint and are dropped); `manage.py process_webhooks` applies
+    the events to orders in batches.
+    """
+    internal_reference = models.CharField(max_length=100)
+    event = models.CharField(max_length=50)
+    merchant_reference = models.CharField(max_length=100, blank=True)
+    payload = models.JSONField(default=dict)
+    received_at = models.DateTimeField(auto_now_add=True)
+    processed_at = models.DateTimeField(null=True, blank=True)
+    attempts = models.PositiveSmallIntegerField(default=0)
+    next_attempt_at = models.DateTimeField(null=True, blank=True)
+    last_error = models.TextField(blank=True)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['internal_reference', 'event'], name='webhook_event_unique'),
+        ]
+        indexes = [
+            models.Index(fields=['id'], condition=models.Q(processed_at__isnull=True), name='webhook_inbox_pending_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.event} {self.internal_reference}"
@@ -0,0 +1,133 @@
+"""
+Unread counters and real-time delivery for Notification and
+SimpleNotification changes.
+
+Unread counts live on one NotificationCounter row per user, adjusted by the
+exact delta of every create / read / delete below, so the notification bell
+is a single-row read. A missing row is rebuilt from COUNT queries the first
+time it is needed.
+
+Every change is published to the recipient's "user:<id>" topic, which
+TrendsyncConsumer joins on connect (see realtime.py):
+
+    notification.created  {"source", "notification": {...}, "unread_delta": 1}
+    notification.read     {"source", "ids": [...] or null for all, "unread_delta": -n}
+    notification.deleted  {"source", "ids": [...] or null for all, "unread_delta": -n}
+    notification.unread   {"notifications": n, "simple": m}   (sent on connect)
+
+"source" is "notifications" for Notification rows and "simple" for
+SimpleNotification rows, matching get_notifications and
+get_simple_notifications. Clients keep their list and unread count in sync
+from these events instead of polling. Sends happen after the surrounding
+transaction commits, and a channel-layer failure never fails the write.
+"""
+from django.db import IntegrityError, transaction
+
+from . import realtime
+from .counters import apply_delta
+from .models import Notification, NotificationCounter, SimpleNotification
+
+NOTIFICATIONS = 'notifications'
+SIMPLE = 'simple'
+
+COUNTER_FIELDS = {
+    NOTIFICATIONS: 'unread',
+    SIMPLE: 'simple_unread',
+}
+
+SIMPLE_NOTIFICATION_TITLES = {
+    'follow': 'New Follower',
+    'follow_confirmation': 'Follow Confirmation',
+}
+
+
+def simple_notification_payload(note):
+    return {
+        'id': note.id,
+        'notification_type': note.type,
+        'title': SIMPLE_NOTIFICATION_TITLES.get(note.type, 'Notification'),
+        'message': note.message,
+        'read': note.read,
+        'created_at': note.created_at.isoformat(),
+        'data': {
+            'sender_name': note.sender_name
+        }
+    }
+
+
+def notification_payload(notification):
+    from .serializers import NotificationSerializer
+    return dict(NotificationSerializer(notification).data)
+
+
+def _recount(user_id):
+    return {
+        'unread': Notification.objects.filter(recipient_id=user_id, read=False).count(),
+        'simple_unread': SimpleNotification.objects.filter(recipient_id=user_id, read=False).count(),
+    }
+
+
+def _create_counter(user_id):
+    """(counter, created); the recount already reflects this transaction's writes."""
+    try:
+        with transaction.atomic():
+            return NotificationCounter.objects.create(user_id=user_id, **_recount(user_id)), True
+    except IntegrityError:
+        return NotificationCounter.objects.get(user_id=user_id), False
+
+
+def _adjust_unread(source, user_id, amount):
+    field = COUNTER_FIELDS[source]
+    if apply_delta(NotificationCounter, [user_id], field, amount):
+        return
+    _, created = _create_counter(user_id)
+    if not created:
+        apply_delta(NotificationCounter, [user_id], field, amount)
+
+
+def unread_counts(user_id):
+    row = NotificationCounter.objects.filter(user_id=user_id).values('unread', 'simple_unread').first()
+    if row is None:
+        counter, _ = _create_counter(user_id)
+        row = {'unread': counter.unread, 'simple_unread': counter.simple_unread}
+    return {source: row[field] for source, field in COUNTER_FIELDS.items()}
+
+
+def _publish(recipient_id, event, data):
+    realtime.publish_on_commit('user', recipient_id, event, data)
+
+
+def notification_created(instance):
+    if isinstance(instance, SimpleNotification):
+        source, payload = SIMPLE, simple_notification_payload(instance)
+    else:
+        source, payload = NOTIFICATIONS, notification_payload(instance)
+    if not instance.read:
+        _adjust_unread(source, instance.recipient_id, 1)
+    _publish(instance.recipient_id, 'notification.created', {
+        'source': source,
+        'notification': payload,
+        'unread_delta': 0 if instance.read else 1,
+    })
+
+
+def notifications_read(source, recipient_id, ids, count):
+    """`count` rows of `recipient_id` went from unread to read; ids=None means all."""
+    if count:
+        _adjust_unread(source, recipient_id, -count)
+        _publish(recipient_id, 'notification.read', {
+            'source': source,
+            'ids': ids,
+            'unread_delta': -count,
+        })
+
+
+def notifications_deleted(source, recipient_id, ids, unread):
+    """Rows were deleted, `unread` of them unread; ids=None means all."""
+    if unread:
+        _adjust_unread(source, recipient_id, -unread)
+    _publish(recipient_id, 'notification.deleted', {
+        'source': source,
+        'ids': ids,
+        'unread_delta': -unread,
+    })
@@ -0,0 +1,192 @@
+import json
+from base64 import b64decode, b64encode
+from datetime import date, datetime
+from decimal import Decimal
+
+from django.core.exceptions import ValidationError
+from django.db.models import Q
+from rest_framework.exceptions import NotFound
+from rest_framework.pagination import BasePagination
+from rest_framework.response import Response
+from rest_framework.utils.urls import remove_query_param, replace_query_param
+
+
+class KeysetPagination(BasePagination):
+    """
+    Cursor pagination keyed on the full ordering tuple.
+
+    Each page is fetched with a composite "row comparison" filter
+    (a < x) OR (a = x AND b < y) OR ... against the last row seen, so the
+    cost of a page does not grow with how deep the client has scrolled.
+    The last ordering column must be unique (usually the primary key).
+
+    Like DRF's PageNumberPagination with page_size = None, pagination is
+    opt-in: clients that send neither `page_size` nor `cursor` keep getting
+    the plain list response.
+    """
+    ordering = ('-id',)
+    page_size = None
+    default_page_size = 20
+    page_size_query_param = 'page_size'
+    max_page_size = 100
+    cursor_query_param = 'cursor'
+    invalid_cursor_message = 'Invalid cursor'
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.page_size = self.get_page_size(request)
+        if not self.page_size:
+            return None
+
+        self.request = request
+        self.base_url = request.build_absolute_uri()
+        self.fields = [(field.lstrip('-'), field.startswith('-')) for field in self.ordering]
+
+        position, reverse = self.decode_cursor(request)
+        self.has_cursor = position is not None
+        self.reverse = reverse
+
+        if reverse:
+            queryset = queryset.order_by(*self._inverted_ordering())
+        else:
+            queryset = queryset.order_by(*self.ordering)
+
+        if position is not None:
+            position = self._coerce(queryset, position)
+            queryset = queryset.filter(self._after(position, reverse))
+
+        results = list(queryset[:self.page_size + 1])
+        self.has_more = len(results) > self.page_size
+        self.page = results[:self.page_size]
+        if reverse:
+            self.page.reverse()
+        return self.page
+
+    def get_page_size(self, request):
+        raw = request.query_params.get(self.page_size_query_param)
+        if raw is not None:
+            try:
+                size = int(raw)
+            except (TypeError, ValueError):
+                size = 0
+            if size > 0:
+                return min(size, self.max_page_size)
+        if self.cursor_query_param in request.query_params:
+            return self.default_page_size
+        return self.page_size
+
+    def get_paginated_response(self, data):
+        return Response({
+            'next': self.get_next_link(),
+            'previous': self.get_previous_link(),
+            'results': data,
+        })
+
+    def get_next_link(self):
+        has_next = self.has_cursor if self.reverse else self.has_more
+        if not has_next or not self.page:
+            return None
+        return self.encode_cursor(self._position(self.page[-1]), reverse=False)
+
+    def get_previous_link(self):
+        has_previous = self.has_more if self.reverse else self.has_cursor
+        if not has_previous:
+            return None
+        if not self.page:
+            return remove_query_param(self.base_url, self.cursor_query_param)
+        return self.encode_cursor(self._position(self.page[0]), reverse=True)
+
+    def encode_cursor(self, position, reverse):
+        payload = {'p': [self._dump(value) for value in position]}
+        if reverse:
+            payload['r'] = 1
+        encoded = b64encode(json.dumps(payload).encode('ascii')).decode('ascii')
+        return replace_query_param(self.base_url, self.cursor_query_param, encoded)
+
+    def decode_cursor(self, request):
+        encoded = request.query_params.get(self.cursor_query_param)
+        if not encoded:
+            return None, False
+        try:
+            payload = json.loads(b64decode(encoded.encode('ascii')).decode('ascii'))
+            position = payload['p']
+            reverse = bool(payload.get('r'))
+        except (TypeError, ValueError, KeyError):
+            raise NotFound(self.invalid_cursor_message)
+        if not isinstance(position, list) or len(position) != len(self.ordering):
+            raise NotFound(self.invalid_cursor_message)
+        return position, reverse
+
+    def _coerce(self, queryset, position):
+        """
+        Cursor values converted by their ordering field, so a well-formed
+        cursor with values of the wrong type is a 404 rather than a 500.
+        """
+        values = []
+        for (name, _), value in zip(self.fields, position):
+            annotation = queryset.query.annotations.get(name)
+            field = annotation.output_field if annotation is not None else queryset.model._meta.get_field(name)
+            if not isinstance(value, (str, int, float)):
+                raise NotFound(self.invalid_cursor_message)
+            try:
+                values.append(field.to_python(value))
+            except (TypeError, ValueError, ValidationError):
+                raise NotFound(self.invalid_cursor_message)
+        return values
+
+    def _inverted_ordering(self):
+        return [field[1:] if field.startswith('-') else f'-{field}' for field in self.ordering]
+
+    def _after(self, position, reverse):
+        condition = Q()
+        for index, (field, descending) in enumerate(self.fields):
+            lookup = 'lt' if descending != reverse else 'gt'
+            clause = Q(**{f'{field}__{lookup}': position[index]})
+            for prev_index in range(index):
+                clause &= Q(**{self.fields[prev_index][0]: position[prev_index]})
+            condition |= clause
+        return condition
+
+    def _position(self, instance):
+        return [getattr(instance, field) for field, _ in self.fields]
+
+    @staticmethod
+    def _dump(value):
+        if isinstance(value, (datetime, date)):
+            return value.isoformat()
+        if isinstance(value, Decimal):
+            return str(value)
+        return value
+
+
+class ProductKeysetPagination(KeysetPagination):
+    ordering = ('-date_of_post', '-id')
+
+
+class FeedKeysetPagination(KeysetPagination):
+    ordering = ('-final_score', '-date_of_post', '-id')
+
+
+class TrendingKeysetPagination(KeysetPagination):
+    ordering = ('-units_sold', '-purchase_count', '-id')
+
+
+class OrderKeysetPagination(KeysetPagination):
+    ordering = ('-order_date', '-id')
+
+
+class DecayedTrendingKeysetPagination(KeysetPagination):
+    ordering = ('-trend_score', '-id')
+
+
+class NotificationKeysetPagination(KeysetPagination):
+    """Always on: the inbox is served newest first, a page at a time."""
+    ordering = ('-created_at', '-id')
+    page_size = 50
+
+
+class CommentKeysetPagination(KeysetPagination):
+    ordering = ('-created_at', '-id')
+
+
+class HelpfulCommentKeysetPagination(KeysetPagination):
+    ordering = ('-helpful_votes', '-id')
@@ -0,0 +1,73 @@
+"""
+Verified purchases.
+
+VerifiedPurchase holds one row per (buyer, product) pair covered by at
+least one delivered order. Rows are added when an order becomes delivered
+and removed when it leaves that state (refund, correction) unless another
+delivered order still covers the pair. Badge checks are then a probe on the
+unique (buyer, product) index, and a whole page is checked with one query.
+"""
+from django.db import transaction
+
+from .models import OrderItem, VerifiedPurchase
+
+VERIFIED_STATUS = 'delivered'
+
+
+def record_order_delivery(order, previous_status):
+    was_delivered = previous_status == VERIFIED_STATUS
+    is_delivered = order.status == VERIFIED_STATUS
+    if was_delivered == is_delivered:
+        return
+    product_ids = set(order.items.values_list('product_id', flat=True))
+    if is_delivered:
+        add_verified(order.buyer_id, product_ids)
+    else:
+        revoke_verified(order.buyer_id, product_ids, exclude_order_id=order.id)
+
+
+def add_verified(buyer_id, product_ids):
+    VerifiedPurchase.objects.bulk_create(
+        [VerifiedPurchase(buyer_id=buyer_id, product_id=product_id) for product_id in product_ids],
+        ignore_conflicts=True,
+    )
+
+
+def revoke_verified(buyer_id, product_ids, exclude_order_id=None):
+    still_delivered = set(
+        OrderItem.objects.filter(
+            order__buyer_id=buyer_id, product_id__in=product_ids, order__status=VERIFIED_STATUS
+        ).exclude(order_id=exclude_order_id).values_list('product_id', flat=True)
+    )
+    VerifiedPurchase.objects.filter(
+        buyer_id=buyer_id, product_id__in=set(product_ids) - still_delivered
+    ).delete()
+
+
+def verified_pairs(pairs):
+    """The subset of (buyer_id, product_id) pairs that are verified purchases."""
+    pairs = set(pairs)
+    if not pairs:
+        return set()
+    found = VerifiedPurchase.objects.filter(
+        buyer_id__in={buyer_id for buyer_id, _ in pairs},
+        product_id__in={product_id for _, product_id in pairs},
+    ).values_list('buyer_id', 'product_id')
+    return pairs.intersection(found)
+
+
+def is_verified_purchase(buyer_id, product_id):
+    return VerifiedPurchase.objects.filter(buyer_id=buyer_id, product_id=product_id).exists()
+
+
+def rebuild_verified_purchases():
+    """Recompute the table from order history, e.g. after manual data fixes."""
+    pairs = (
+        OrderItem.objects.filter(order__status=VERIFIED_STATUS)
+        .values_list('order__buyer_id', 'product_id').distinct()
+    )
+    rows = [VerifiedPurchase(buyer_id=buyer_id, product_id=product_id) for buyer_id, product_id in pairs]
+    with transaction.atomic():
+        VerifiedPurchase.objects.all().delete()
+        VerifiedPurchase.objects.bulk_create(rows, batch_size=1000)
+    return len(rows)
@@ -0,0 +1,62 @@
+"""
+Seller ratings.
+
+One SellerRating per (buyer, seller); rating again replaces the earlier
+score. Seller.rating_sum / rating_count are adjusted by the difference under
+a lock on the seller row, so trust is recomputed in O(1) instead of from
+every review.
+"""
+from django.db import transaction
+from django.db.models import Count, Sum
+
+from .models import Seller, SellerRating
+
+
+def trust_from(rating_sum, rating_count):
+    """Average rating on a 0-100 scale (5 stars = 100)."""
+    if not rating_count:
+        return 0
+    return round(rating_sum / rating_count * 20)
+
+
+def submit_rating(buyer, seller_id, rating, comment='', order_id=None):
+    """
+    Create or update `buyer`'s rating of the seller and return
+    (seller, created). The returned seller carries the new totals and trust.
+    """
+    with transaction.atomic():
+        seller = Seller.objects.select_for_update().get(id=seller_id)
+        existing = SellerRating.objects.filter(buyer=buyer, seller=seller).first()
+        if existing is None:
+            SellerRating.objects.create(
+                buyer=buyer, seller=seller, rating=rating, comment=comment, order_id=order_id
+            )
+            seller.rating_sum += rating
+            seller.rating_count += 1
+        else:
+            seller.rating_sum += rating - existing.rating
+            existing.rating = rating
+            existing.comment = comment
+            if order_id is not None:
+                existing.order_id = order_id
+            existing.save(update_fields=['rating', 'comment', 'order_id', 'updated_at'])
+        seller.trust = trust_from(seller.rating_sum, seller.rating_count)
+        seller.save(update_fields=['rating_sum', 'rating_count', 'trust'])
+    return seller, existing is None
+
+
+def refresh_seller_totals(seller_ids):
+    """Recompute rating_sum / rating_count / trust from SellerRating rows."""
+    totals = {
+        row['seller_id']: row
+        for row in SellerRating.objects.filter(seller_id__in=seller_ids)
+        .values('seller_id').annotate(total=Sum('rating'), count=Count('id'))
+    }
+    sellers = list(Seller.objects.filter(id__in=seller_ids).only('id', 'rating_sum', 'rating_count', 'trust'))
+    for seller in sellers:
+        row = totals.get(seller.id, {'total': 0, 'count': 0})
+        seller.rating_sum = row['total'] or 0
+        seller.rating_count = row['count']
+        seller.trust = trust_from(seller.rating_sum, seller.rating_count)
+    Seller.objects.bulk_update(sellers, ['rating_sum', 'rating_count', 'trust'], batch_size=500)
+    return len(sellers)
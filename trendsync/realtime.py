@@ -0,0 +1,227 @@
+"""
+Topic-scoped WebSocket groups.
+
+Connections on ws/ subscribe to topics ("user:3", "seller:7", "product:12")
+and each topic maps to its own channel-layer group. Publishing to a topic
+therefore costs O(subscribers of that topic), not O(all connections). A
+user's own topic is joined automatically on connect, and every other
+subscription is authorized on the server by `can_subscribe`.
+
+Events (published after commit from trendsync/signals.py and
+trendsync/notifications.py):
+
+    user:<id>      notification.*   (see notifications.py)
+    seller:<id>    product.created  seller.updated
+    product:<id>   product.updated  comment.created
+
+With a network channel layer (Redis), publishes are batched: messages for a
+group are held for REALTIME['BATCH_WINDOW'] seconds and delivered as one
+"topic.batch" group_send, which the consumer unpacks into the usual frames.
+The in-memory layer is process-local and cheap, so it is always sent to
+directly.
+"""
+import asyncio
+import atexit
+import logging
+import threading
+from collections import defaultdict
+
+from asgiref.sync import async_to_sync
+from channels.layers import InMemoryChannelLayer, get_channel_layer
+from django.conf import settings
+from django.db import transaction
+
+from .models import Product, Seller
+
+logger = logging.getLogger(__name__)
+
+TOPIC_KINDS = ('user', 'seller', 'product')
+
+# Per-connection cap so one client cannot join thousands of groups.
+MAX_SUBSCRIPTIONS = 100
+
+
+def group_name(kind, object_id):
+    return f'{kind}_{object_id}'
+
+
+def parse_topic(topic):
+    """'seller:7' -> ('seller', 7); raises ValueError for anything else."""
+    kind, _, object_id = str(topic).partition(':')
+    if kind not in TOPIC_KINDS or not object_id.isdigit():
+        raise ValueError(f'Unknown topic {topic!r}')
+    return kind, int(object_id)
+
+
+def can_subscribe(user, kind, object_id):
+    """
+    user:<id> is private to that user; seller and product topics carry
+    public updates and only need the object to exist.
+    """
+    if kind == 'user':
+        return bool(user and user.is_authenticated and user.id == object_id)
+    if kind == 'seller':
+        return Seller.objects.filter(id=object_id).exists()
+    if kind == 'product':
+        return Product.objects.filter(id=object_id).exists()
+    return False
+
+
+def _setting(name, default):
+    return getattr(settings, 'REALTIME', {}).get(name, default)
+
+
+class GroupSendBatcher:
+    """
+    Coalesces messages per group and sends each batch as a single
+    group_send from a background event loop. A burst of N events to one
+    topic then costs one channel-layer round trip instead of N, and callers
+    (including sync signal handlers) never wait on the network.
+    """
+
+    def __init__(self, window, max_batch, channel_layer=None):
+        self.window = window
+        self.max_batch = max_batch
+        self.channel_layer = channel_layer
+        self._pending = defaultdict(list)
+        self._scheduled = set()
+        self._loop = None
+        self._lock = threading.Lock()
+
+    def _ensure_loop(self):
+        with self._lock:
+            if self._loop is None:
+                self._loop = asyncio.new_event_loop()
+                threading.Thread(target=self._loop.run_forever, name='realtime-batcher', daemon=True).start()
+        return self._loop
+
+    def add(self, group, message):
+        """Thread-safe; returns immediately."""
+        loop = self._ensure_loop()
+        loop.call_soon_threadsafe(self._add, group, message)
+
+    def _add(self, group, message):
+        batch = self._pending[group]
+        batch.append(message)
+        if len(batch) >= self.max_batch:
+            self._dispatch(group)
+        elif group not in self._scheduled:
+            self._scheduled.add(group)
+            self._loop.call_later(self.window, self._dispatch, group)
+
+    def _dispatch(self, group):
+        self._scheduled.discard(group)
+        messages = self._pending.pop(group, None)
+        if messages:
+            self._loop.create_task(self._send(group, messages))
+
+    async def _send(self, group, messages):
+        layer = self.channel_layer or get_channel_layer()
+        try:
+            if len(messages) == 1:
+                await layer.group_send(group, messages[0])
+            else:
+                await layer.group_send(group, {'type': 'topic.batch', 'messages': messages})
+        except Exception:
+            logger.exception("Failed to send %s messages to %s", len(messages), group)
+
+    async def _send_all(self):
+        sends = []
+        for group in list(self._pending):
+            self._scheduled.discard(group)
+            sends.append(self._send(group, self._pending.pop(group)))
+        await asyncio.gather(*sends)
+
+    def flush(self, timeout=5):
+        """Send everything pending now; blocks until sent (used at shutdown)."""
+        if self._loop is None:
+            return
+        asyncio.run_coroutine_threadsafe(self._send_all(), self._loop).result(timeout)
+
+
+_batcher = None
+
+
+def get_batcher():
+    """The process batcher, or None when publishes should go out directly."""
+    global _batcher
+    window = _setting('BATCH_WINDOW', 0)
+    if window <= 0 or isinstance(get_channel_layer(), InMemoryChannelLayer):
+        return None
+    if _batcher is None:
+        _batcher = GroupSendBatcher(window, _setting('BATCH_MAX', 100))
+        atexit.register(_batcher.flush)
+    return _batcher
+
+
+def _message(kind, object_id, event, data):
+    return {
+        'type': 'topic.message',
+        'topic': f'{kind}:{object_id}',
+        'event': event,
+        'data': data,
+    }
+
+
+async def publish(kind, object_id, event, data, channel_layer=None):
+    message = _message(kind, object_id, event, data)
+    batcher = get_batcher() if channel_layer is None else None
+    if batcher is not None:
+        batcher.add(group_name(kind, object_id), message)
+        return
+    channel_layer = channel_layer or get_channel_layer()
+    await channel_layer.group_send(group_name(kind, object_id), message)
+
+
+def publish_sync(kind, object_id, event, data):
+    batcher = get_batcher()
+    if batcher is not None:
+        batcher.add(group_name(kind, object_id), _message(kind, object_id, event, data))
+        return
+    async_to_sync(publish)(kind, object_id, event, data)
+
+
+def publish_on_commit(kind, object_id, event, data):
+    """
+    publish_sync once the surrounding transaction commits, so a rolled back
+    write is never announced. A channel-layer failure is logged and never
+    fails the write that triggered it.
+    """
+    def send():
+        try:
+            publish_sync(kind, object_id, event, data)
+        except Exception:
+            logger.exception("Failed to publish %s to %s:%s", event, kind, object_id)
+
+    transaction.on_commit(send)
+
+
+def product_event(product):
+    return {
+        'id': product.id,
+        'seller_id': product.seller_id,
+        'category_id': product.category_id,
+        'name': product.name,
+        'unit_price': str(product.unit_price),
+        'stock_quantity': product.stock_quantity,
+    }
+
+
+def seller_event(seller):
+    return {
+        'id': seller.id,
+        'name': seller.name,
+        'location': seller.location,
+        'trust': seller.trust,
+        'followers': seller.followers,
+    }
+
+
+def comment_event(comment):
+    return {
+        'id': comment.id,
+        'product_id': comment.product_id,
+        'rating': comment.rating,
+        'comment': comment.comment_text,
+        'user_name': comment.buyer.name,
+    }
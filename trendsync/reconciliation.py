@@ -0,0 +1,162 @@
+"""
+Settle pending DusuPay payments without polling the gateway per request.
+
+Webhooks settle most orders. The ones whose webhook is late or lost are
+picked up by `reconcile_pending_orders` (run by `manage.py
+reconcile_payments --loop N`). It checks every due pending order with
+bounded concurrency and moves it to paid or cancelled. Orders the gateway
+still reports as pending are retried with jittered exponential backoff.
+Checkout reserves stock up front, so pending orders that never started a
+payment are cancelled by `expire_unpaid_orders` after UNPAID_EXPIRY
+seconds and their units returned to stock.
+"""
+import json
+import logging
+import random
+from concurrent.futures import ThreadPoolExecutor
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import F, Q
+from django.utils import timezone
+
+from .inventory import restore_order_stock
+from .models import Order, Payment
+
+logger = logging.getLogger('dusupay')
+
+
+def _setting(name, default):
+    return getattr(settings, 'DUSUPAY_RECONCILE', {}).get(name, default)
+
+
+def _payment_method(payload):
+    return payload.get('provider_code', payload.get('bank_code', 'card'))
+
+
+def _record_payment(order, payload, payment_status):
+    Payment.objects.update_or_create(
+        order=order,
+        defaults={
+            'amount': payload.get('request_amount', order.total_amount),
+            'payment_method': _payment_method(payload),
+            'payment_status': payment_status,
+            'transaction_reference': payload.get('internal_reference') or order.dusupay_internal_reference or '',
+            'gateway_response': json.dumps(payload),
+            'payment_date': timezone.now()
+        }
+    )
+
+
+def mark_order_paid(order, payload):
+    order.status = 'paid'
+    order.payment_method = _payment_method(payload)
+    order.save()
+    _record_payment(order, payload, 'successful')
+    logger.info(f"Order {order.id} marked as paid via DusuPay")
+
+
+def mark_order_failed(order, payload):
+    if order.status == 'pending':
+        restore_order_stock(order)
+    order.status = 'cancelled'
+    order.save()
+    _record_payment(order, payload, 'failed')
+    logger.info(f"Order {order.id} payment failed")
+
+
+def next_check_delay(attempts):
+    base = _setting('BACKOFF', 30)
+    cap = _setting('BACKOFF_CAP', 3600)
+    delay = min(cap, base * 2 ** attempts)
+    return timedelta(seconds=random.uniform(delay / 2, delay))
+
+
+def due_orders(now=None, limit=None):
+    now = now or timezone.now()
+    queryset = (
+        Order.objects.filter(status='pending', dusupay_internal_reference__isnull=False)
+        .exclude(dusupay_internal_reference='')
+        .filter(Q(next_reconcile_at__isnull=True) | Q(next_reconcile_at__lte=now))
+        .order_by(F('next_reconcile_at').asc(nulls_first=True), 'id')
+    )
+    return queryset[:limit] if limit else queryset
+
+
+def expired_unpaid_orders(now=None):
+    now = now or timezone.now()
+    return (
+        Order.objects.filter(status='pending', order_date__lt=now - timedelta(seconds=_setting('UNPAID_EXPIRY', 3600)))
+        .filter(Q(dusupay_internal_reference__isnull=True) | Q(dusupay_internal_reference=''))
+        .order_by('id')
+    )
+
+
+def expire_unpaid_orders(batch_size=None):
+    """Cancel one batch of stale pending orders without a payment and restore their stock."""
+    batch_size = batch_size or _setting('BATCH_SIZE', 100)
+    expired = 0
+    for order_id in list(expired_unpaid_orders().values_list('id', flat=True)[:batch_size]):
+        with transaction.atomic():
+            order = Order.objects.select_for_update().get(id=order_id)
+            # The buyer may have started paying since the order was listed.
+            if order.status != 'pending' or order.dusupay_internal_reference:
+                continue
+            restore_order_stock(order)
+            order.status = 'cancelled'
+            order.save()
+            expired += 1
+    if expired:
+        logger.info(f"Expired {expired} unpaid pending orders")
+    return expired
+
+
+def _settle(order_id, transaction_status, payload):
+    # The webhook may have settled the order while we were polling.
+    with transaction.atomic():
+        order = Order.objects.select_for_update().get(id=order_id)
+        if order.status != 'pending':
+            return False
+        if transaction_status == 'COMPLETED':
+            mark_order_paid(order, payload)
+        else:
+            mark_order_failed(order, payload)
+        return True
+
+
+def reconcile_pending_orders(client, batch_size=None, concurrency=None):
+    """
+    Check one batch of due pending orders against the gateway.
+
+    Only the HTTP calls run in the thread pool. All database writes happen
+    on the calling thread: settled orders are updated one by one, and the
+    retry schedule for the rest is written with a single bulk_update.
+    """
+    batch_size = batch_size or _setting('BATCH_SIZE', 100)
+    concurrency = concurrency or _setting('CONCURRENCY', 4)
+    now = timezone.now()
+    orders = list(due_orders(now, batch_size))
+    summary = {'checked': len(orders), 'paid': 0, 'cancelled': 0, 'pending': 0}
+    if not orders:
+        return summary
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        results = list(pool.map(
+            lambda order: client.check_transaction_status(order.dusupay_internal_reference), orders
+        ))
+
+    retry = []
+    for order, result in zip(orders, results):
+        transaction_status = (result.get('status') or '').upper() if result['success'] else None
+        if transaction_status in ('COMPLETED', 'FAILED'):
+            if _settle(order.id, transaction_status, result.get('data') or {}):
+                summary['paid' if transaction_status == 'COMPLETED' else 'cancelled'] += 1
+            continue
+        order.reconcile_attempts += 1
+        order.next_reconcile_at = now + next_check_delay(order.reconcile_attempts)
+        retry.append(order)
+
+    Order.objects.bulk_update(retry, ['reconcile_attempts', 'next_reconcile_at'])
+    summary['pending'] = len(retry)
+    return summary
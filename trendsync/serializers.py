@@ -1,5 +1,7 @@
 import json
 from rest_framework import serializers
+from django.db.models import prefetch_related_objects
+from django.db.models.manager import BaseManager
 from django.contrib.auth import get_user_model
 from django.contrib.auth.models import User
 from .models import CommentHelpful  
@@ -8,6 +10,7 @@ from .models import (
     Wishlist, Cart, CartItem, Address, Order, OrderItem, QuickDeal, WishlistItem,
     ProductQuestion, QuestionOption, ProductImage, SellerFollow
 )
+from .purchases import is_verified_purchase, verified_pairs
 
 from .models import Notification
 User = get_user_model()
@@ -146,6 +149,38 @@ class ProductQuestionSerializer(serializers.ModelSerializer):
         fields = ['id', 'question_text', 'question_type', 'required', 'order', 'options']
 
 
+class ProductListSerializer(serializers.ListSerializer):
+    """
+    Resolves the per-product lookups ProductSerializer needs in bulk:
+    seller, images and questions/options are prefetched for the whole
+    page, and the requesting buyer's likes are loaded with one query.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        products = list(iterable)
+        prefetch_related_objects(products, 'seller', 'images', 'questions__options')
+        self.resolve_likes(products)
+        return [self.child.to_representation(item) for item in products]
+
+    def resolve_likes(self, products):
+        request = self.context.get('request')
+        buyer = None
+        if request and request.user.is_authenticated:
+            buyer = getattr(request.user, 'buyer_profile', None)
+
+        product_ids = [product.id for product in products]
+        liked_ids = set()
+        if buyer and product_ids:
+            liked_ids = set(
+                ProductLike.objects.filter(buyer=buyer, product_id__in=product_ids)
+                .values_list('product_id', flat=True)
+            )
+
+        liked = self.context.setdefault('liked_product_ids', {})
+        for product_id in product_ids:
+            liked[product_id] = product_id in liked_ids
+
+
 class ProductSerializer(serializers.ModelSerializer):
     product_photo = serializers.SerializerMethodField()
     is_liked = serializers.SerializerMethodField()
@@ -163,13 +198,15 @@ class ProductSerializer(serializers.ModelSerializer):
             'is_liked', 'questions_input', 'images', 'questions'
         ]
         read_only_fields = ('seller', 'sales_count', 'like_count', 'rating_number', 'rating_magnitude')
+        list_serializer_class = ProductListSerializer
 
     def get_product_photo(self, obj):
         request = self.context.get('request')
         if obj.product_photo:
             url = obj.product_photo.url
         else:
-            first_image = obj.images.first()
+            images = obj.images.all()
+            first_image = images[0] if images else None
             if first_image:
                 url = first_image.image.url
             else:
@@ -179,6 +216,10 @@ class ProductSerializer(serializers.ModelSerializer):
         return url
 
     def get_is_liked(self, obj):
+        liked = self.context.get('liked_product_ids')
+        if liked is not None and obj.id in liked:
+            return liked[obj.id]
+
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             try:
@@ -190,7 +231,8 @@ class ProductSerializer(serializers.ModelSerializer):
 
     def get_images(self, obj):
         request = self.context.get('request')
-        images_qs = obj.images.all().order_by('order')
+        # ProductImage is ordered by 'order', so .all() keeps prefetched rows in place.
+        images_qs = obj.images.all()
         return [
             request.build_absolute_uri(img.image.url) if request else img.image.url
             for img in images_qs
@@ -274,6 +316,34 @@ class ProductSerializer(serializers.ModelSerializer):
         return instance
 
 
+class ProductCommentListSerializer(serializers.ListSerializer):
+    """
+    Resolves the per-comment lookups ProductCommentSerializer needs in bulk:
+    buyers are prefetched, and the requester's helpful votes and the
+    VerifiedPurchase rows for the page are loaded with one query each.
+    """
+    def to_representation(self, data):
+        iterable = data.all() if isinstance(data, BaseManager) else data
+        comments = list(iterable)
+        prefetch_related_objects(comments, 'buyer')
+        self.resolve_helpful(comments)
+        self.resolve_verified(comments)
+        return [self.child.to_representation(item) for item in comments]
+
+    def resolve_helpful(self, comments):
+        request = self.context.get('request')
+        voted = set()
+        if request and request.user.is_authenticated and comments:
+            voted = set(
+                CommentHelpful.objects.filter(user=request.user, comment_id__in=[c.id for c in comments])
+                .values_list('comment_id', flat=True)
+            )
+        self.context['helpful_comment_ids'] = voted
+
+    def resolve_verified(self, comments):
+        self.context['verified_purchases'] = verified_pairs((c.buyer_id, c.product_id) for c in comments)
+
+
 class ProductCommentSerializer(serializers.ModelSerializer):
     comment = serializers.CharField(source='comment_text')
     user_name = serializers.CharField(source='buyer.name', read_only=True)
@@ -291,25 +361,30 @@ class ProductCommentSerializer(serializers.ModelSerializer):
             'is_own_comment', 'user_voted_helpful', 'verified_purchase', 'time_ago'
         ]
         read_only_fields = ['product', 'buyer', 'helpful_votes', 'created_at', 'updated_at']
+        list_serializer_class = ProductCommentListSerializer
 
     def get_is_own_comment(self, obj):
         request = self.context.get('request')
         if request and request.user.is_authenticated:
-            return obj.buyer.user == request.user
+            return obj.buyer.user_id == request.user.id
         return False
 
     def get_user_voted_helpful(self, obj):
+        voted = self.context.get('helpful_comment_ids')
+        if voted is not None:
+            return obj.id in voted
+
         request = self.context.get('request')
         if request and request.user.is_authenticated:
             return CommentHelpful.objects.filter(comment=obj, user=request.user).exists()
         return False
 
     def get_verified_purchase(self, obj):
-        return OrderItem.objects.filter(
-            order__buyer=obj.buyer,
-            product=obj.product,
-            order__status='delivered'
-        ).exists()
+        verified = self.context.get('verified_purchases')
+        if verified is not None:
+            return (obj.buyer_id, obj.product_id) in verified
+
+        return is_verified_purchase(obj.buyer_id, obj.product_id)
 
     def get_time_ago(self, obj):
         from django.utils import timezone
@@ -346,6 +421,21 @@ class SellerSerializer(serializers.ModelSerializer):
         return False
 
 
+class NearbySellerSerializer(serializers.ModelSerializer):
+    """Lightweight seller card for proximity results (no nested products)."""
+    distance_km = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Seller
+        fields = [
+            'id', 'name', 'location', 'location_type', 'location_lat', 'location_lng',
+            'location_address', 'profile_photo', 'trust', 'followers', 'sales', 'distance_km',
+        ]
+
+    def get_distance_km(self, obj):
+        return round(obj.distance_km, 3)
+
+
 class CartItemSerializer(serializers.ModelSerializer):
     product = ProductSerializer(read_only=True)
     product_id = serializers.PrimaryKeyRelatedField(
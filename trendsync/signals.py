@@ -1,7 +1,13 @@
-from django.db.models.signals import post_save
+from django.db.models.signals import post_init, post_save, post_delete
 from django.dispatch import receiver
 from django.contrib.auth.models import User
-from .models import SellerFollow, Notification, Seller
+from .models import (
+    SellerFollow, Notification, SimpleNotification, Seller, Product, ProductImage, ProductQuestion,
+    QuestionOption, Order, OrderItem, ProductComment,
+)
+from . import notifications, realtime
+from .purchases import VERIFIED_STATUS, add_verified, record_order_delivery, revoke_verified
+from .cache import invalidate_product, invalidate_seller_products
 
 @receiver(post_save, sender=SellerFollow)
 def create_follow_notification(sender, instance, created, **kwargs):
@@ -22,4 +28,126 @@ def create_follow_notification(sender, instance, created, **kwargs):
                 'seller_id': instance.seller.id,
                 'follower_count': instance.seller.followers
             }
-        )
\ No newline at end of file
+        )
+
+
+@receiver(post_init, sender=Product)
+def remember_product_lists(sender, instance, **kwargs):
+    # The seller/category lists the product is cached in; read from __dict__
+    # so deferred loads don't trigger a query.
+    instance._cached_seller_id = instance.__dict__.get('seller_id')
+    instance._cached_category_id = instance.__dict__.get('category_id')
+
+
+@receiver(post_save, sender=Product)
+@receiver(post_delete, sender=Product)
+def clear_product_cache(sender, instance, **kwargs):
+    """Clear cache when product is created, updated or deleted"""
+    invalidate_product(instance)
+    instance._cached_seller_id = instance.seller_id
+    instance._cached_category_id = instance.category_id
+
+
+@receiver(post_save, sender=ProductImage)
+@receiver(post_delete, sender=ProductImage)
+@receiver(post_save, sender=ProductQuestion)
+@receiver(post_delete, sender=ProductQuestion)
+def clear_product_cache_on_related_change(sender, instance, **kwargs):
+    """Images and questions are embedded in the cached product payloads"""
+    product = Product.objects.filter(id=instance.product_id).only('id', 'seller_id', 'category_id').first()
+    if product:
+        invalidate_product(product)
+
+
+@receiver(post_save, sender=QuestionOption)
+@receiver(post_delete, sender=QuestionOption)
+def clear_product_cache_on_option_change(sender, instance, **kwargs):
+    """Question options are embedded in the cached product payloads too"""
+    product = Product.objects.filter(questions__id=instance.question_id).only('id', 'seller_id', 'category_id').first()
+    if product:
+        invalidate_product(product)
+
+
+@receiver(post_init, sender=Seller)
+def remember_seller_name(sender, instance, **kwargs):
+    instance._cached_name = instance.__dict__.get('name')
+
+
+@receiver(post_save, sender=Seller)
+def clear_product_cache_on_seller_rename(sender, instance, created, update_fields=None, **kwargs):
+    """seller_name is embedded in the cached product payloads"""
+    # Frequent writes such as live location pings never touch the name.
+    if created or (update_fields is not None and 'name' not in update_fields):
+        return
+    if instance.name != instance._cached_name:
+        invalidate_seller_products(instance.id)
+    instance._cached_name = instance.name
+
+
+@receiver(post_save, sender=Notification)
+@receiver(post_save, sender=SimpleNotification)
+def push_new_notification(sender, instance, created, **kwargs):
+    """Deliver new notifications to the recipient's open WebSockets"""
+    if created:
+        notifications.notification_created(instance)
+
+
+# Fields carried by the product.* and seller.updated topic events.
+PRODUCT_EVENT_FIELDS = {'name', 'unit_price', 'stock_quantity', 'category'}
+SELLER_EVENT_FIELDS = {'name', 'location', 'trust', 'followers'}
+
+
+@receiver(post_save, sender=Product)
+def publish_product_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    """New products go to the seller's topic, changes to the product's own"""
+    if raw or (update_fields is not None and not PRODUCT_EVENT_FIELDS.intersection(update_fields)):
+        return
+    if created:
+        realtime.publish_on_commit('seller', instance.seller_id, 'product.created', realtime.product_event(instance))
+    else:
+        realtime.publish_on_commit('product', instance.id, 'product.updated', realtime.product_event(instance))
+
+
+@receiver(post_save, sender=Seller)
+def publish_seller_change(sender, instance, created, raw=False, update_fields=None, **kwargs):
+    # Location pings (lat/lng) are streamed on ws/locations/ instead.
+    if created or raw or (update_fields is not None and not SELLER_EVENT_FIELDS.intersection(update_fields)):
+        return
+    realtime.publish_on_commit('seller', instance.id, 'seller.updated', realtime.seller_event(instance))
+
+
+@receiver(post_save, sender=ProductComment)
+def publish_new_comment(sender, instance, created, raw=False, **kwargs):
+    if created and not raw:
+        realtime.publish_on_commit('product', instance.product_id, 'comment.created', realtime.comment_event(instance))
+
+
+@receiver(post_init, sender=Order)
+def remember_order_delivery_status(sender, instance, **kwargs):
+    # Read from __dict__ so deferred loads don't trigger a query.
+    instance._verified_status = instance.__dict__.get('status')
+
+
+@receiver(post_save, sender=Order)
+def update_verified_purchases(sender, instance, created, raw=False, **kwargs):
+    if raw:
+        return
+    previous = None if created else instance._verified_status
+    record_order_delivery(instance, previous)
+    instance._verified_status = instance.status
+
+
+@receiver(post_save, sender=OrderItem)
+def verify_item_on_delivered_order(sender, instance, created, raw=False, **kwargs):
+    # Lines added to an order that is already delivered (e.g. seed data or admin).
+    if created and not raw and instance.order.status == VERIFIED_STATUS:
+        add_verified(instance.order.buyer_id, [instance.product_id])
+
+
+@receiver(post_delete, sender=OrderItem)
+def unverify_item_removed_from_delivered_order(sender, instance, **kwargs):
+    # Lines removed from a delivered order (admin or data fixes); another
+    # delivered line for the same product keeps the pair verified.
+    order = Order.objects.filter(id=instance.order_id).only('buyer_id', 'status').first()
+    if order is not None and order.status == VERIFIED_STATUS:
+        revoke_verified(order.buyer_id, [instance.product_id])
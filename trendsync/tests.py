@@ -1,3 +1,1288 @@
-from django.test import TestCase
+import json
+import signal
+import socket
+from base64 import b64encode
+from datetime import timedelta
+from io import StringIO
+from unittest import mock
 
-# Create your tests here.
+import requests
+
+from asgiref.sync import async_to_sync
+from channels.db import database_sync_to_async
+from channels.testing import WebsocketCommunicator
+from django.contrib.auth.models import User
+from django.core.cache import cache
+from django.core.management import call_command
+from django.db import connection, models
+from django.db.models.signals import post_save
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import isolate_apps
+from django.utils import timezone
+from rest_framework.request import Request
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from config.asgi import application
+from products.models import ProductFeedScore, ProductTrendScore, TrendingRollup
+from products.services import search
+from products.services.nearby import products_within
+from products.services.ratings import apply_rating_change
+from products.services.trending import decayed_score
+
+from . import geocoding, impressions, realtime, reconciliation, webhooks
+from .cache import stats as cache_stats
+from .dusupay_fake import DROP_CONNECTION, FakeDusuPayServer
+from .dusupay_utils import CircuitBreaker, DusuPayClient, nothing_sent
+from .inventory import adjust_stock, restore_order_stock
+from .locations import persist_seller_location
+from .ratings import trust_from
+from .views import get_cart
+
+from .models import (
+    Seller, Buyer, Product, ProductLike, ProductComment, ProductImage, ProductQuestion, QuestionOption, Order, OrderItem,
+    DusuPayWebhookEvent, Category, Cart, CartItem, VerifiedPurchase, CommentHelpful, Notification,
+    NotificationCounter, SimpleNotification, SellerRating, Payment,
+)
+
+
+class ProductListQueryBudgetTests(TestCase):
+    # seller-profile check in get_queryset, products, sellers, images,
+    # questions, options, buyer profile, liked ids, personalized liked ids
+    QUERY_BUDGET = 9
+
+    def setUp(self):
+        cache.clear()
+        seller_user = User.objects.create_user(username='seller', password='password')
+        self.seller = Seller.objects.create(user=seller_user, name='Seller')
+        buyer_user = User.objects.create_user(username='buyer', password='password')
+        self.buyer = Buyer.objects.create(user=buyer_user, name='Buyer')
+        self.client = APIClient()
+
+    def authenticate(self):
+        # A fresh user instance so the profile lookups are counted every time.
+        self.client.force_authenticate(user=User.objects.get(username='buyer'))
+
+    def create_products(self, count):
+        for i in range(count):
+            product = Product.objects.create(seller=self.seller, name=f'Product {i}', unit_price=100)
+            ProductImage.objects.create(product=product, image=f'products/{i}-b.jpg', order=1)
+            ProductImage.objects.create(product=product, image=f'products/{i}-a.jpg', order=0)
+            question = ProductQuestion.objects.create(
+                product=product, question_text='Size?', question_type='multi-select'
+            )
+            QuestionOption.objects.create(question=question, option_text='S')
+            QuestionOption.objects.create(question=question, option_text='M')
+            if i % 2 == 0:
+                ProductLike.objects.create(product=product, buyer=self.buyer)
+
+    def test_list_query_count_is_independent_of_size(self):
+        self.create_products(5)
+        self.authenticate()
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.client.get('/api/products/')
+
+        self.create_products(45)
+        self.authenticate()
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get('/api/products/')
+        self.assertEqual(len(response.data), 50)
+
+    def test_list_serves_likes_images_and_questions_from_batch(self):
+        self.create_products(4)
+        self.authenticate()
+        response = self.client.get('/api/products/?page_size=10')
+        rows = response.data['results']
+
+        liked = {row['id']: row['is_liked'] for row in rows}
+        expected = set(ProductLike.objects.filter(buyer=self.buyer).values_list('product_id', flat=True))
+        self.assertEqual({pid for pid, is_liked in liked.items() if is_liked}, expected)
+
+        for row in rows:
+            self.assertTrue(row['images'][0].endswith('-a.jpg'))
+            self.assertTrue(row['product_photo'].endswith('-a.jpg'))
+            self.assertEqual([o['option_text'] for o in row['questions'][0]['options']], ['S', 'M'])
+
+    def test_cached_list_only_resolves_likes(self):
+        self.create_products(5)
+        self.authenticate()
+        self.assertEqual(self.client.get('/api/products/')['X-Cache'], 'MISS')
+
+        self.authenticate()
+        with self.assertNumQueries(2):
+            response = self.client.get('/api/products/')
+        self.assertEqual(response['X-Cache'], 'HIT')
+        self.assertEqual(sum(row['is_liked'] for row in response.data), 3)
+
+    def test_product_save_invalidates_cached_detail(self):
+        self.create_products(1)
+        product = Product.objects.get()
+        self.client.get(f'/api/products/{product.id}/')
+
+        product.name = 'Renamed'
+        product.save()
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['name'], 'Renamed')
+
+    def test_like_invalidates_cached_detail(self):
+        product = Product.objects.create(seller=self.seller, name='Product', unit_price=100)
+        self.client.get(f'/api/products/{product.id}/')
+        self.authenticate()
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/products/{product.id}/like/')
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['like_count'], 1)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.post(f'/api/products/{product.id}/toggle-like/')
+        response = self.client.get(f'/api/products/{product.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['like_count'], 0)
+
+
+class KeysetPaginationTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.products = [Product.objects.create(seller=seller, name=f'Product {i}', unit_price=100)
+                         for i in range(5)]
+        # Three products posted at the same instant: ties are broken by id.
+        Product.objects.filter(id__in=[p.id for p in self.products[1:4]]).update(
+            date_of_post=self.products[0].date_of_post + timedelta(minutes=1)
+        )
+        Product.objects.filter(id=self.products[4].id).update(
+            date_of_post=self.products[0].date_of_post + timedelta(minutes=2)
+        )
+        self.expected = [self.products[i].id for i in (4, 3, 2, 1, 0)]
+        self.client = APIClient()
+
+    def get(self, url, **params):
+        response = self.client.get(url, params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def cursor(self, position):
+        return b64encode(json.dumps({'p': position}).encode()).decode()
+
+    def test_next_and_previous_traverse_every_row_once(self):
+        pages = [self.get('/api/products/', page_size=2)]
+        while pages[-1]['next']:
+            pages.append(self.get(pages[-1]['next']))
+        self.assertEqual([[p['id'] for p in page['results']] for page in pages],
+                         [self.expected[0:2], self.expected[2:4], self.expected[4:]])
+        self.assertIsNone(pages[0]['previous'])
+
+        back = self.get(pages[2]['previous'])
+        self.assertEqual([p['id'] for p in back['results']], self.expected[2:4])
+        back = self.get(back['previous'])
+        self.assertEqual([p['id'] for p in back['results']], self.expected[0:2])
+        self.assertIsNotNone(back['next'])
+
+    def test_malformed_cursors_are_not_found(self):
+        date = self.products[0].date_of_post.isoformat()
+        for cursor in ['not-base64!', self.cursor([date]), self.cursor([12, 1]),
+                       self.cursor(['yesterday', 1]), self.cursor([date, 'x']), self.cursor([date, [1]])]:
+            with self.subTest(cursor=cursor):
+                response = self.client.get('/api/products/', {'page_size': 2, 'cursor': cursor})
+                self.assertEqual(response.status_code, 404)
+
+
+class ProductCacheInvalidationTests(TestCase):
+    def setUp(self):
+        cache.clear()
+        self.seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.shoes = Category.objects.create(name='Shoes')
+        self.bags = Category.objects.create(name='Bags')
+        self.product = Product.objects.create(seller=self.seller, category=self.shoes, name='Boot', unit_price=100)
+        self.client = APIClient()
+
+    def category_ids(self, category):
+        response = self.client.get(f'/api/products/?category={category.id}')
+        return response['X-Cache'], [row['id'] for row in response.data]
+
+    def test_category_move_drops_product_from_old_list(self):
+        self.assertEqual(self.category_ids(self.shoes), ('MISS', [self.product.id]))
+        self.assertEqual(self.category_ids(self.bags), ('MISS', []))
+
+        product = Product.objects.get(id=self.product.id)
+        product.category = self.bags
+        product.save()
+        self.assertEqual(self.category_ids(self.shoes), ('MISS', []))
+        self.assertEqual(self.category_ids(self.bags), ('MISS', [self.product.id]))
+
+    def test_option_change_invalidates_cached_detail(self):
+        question = ProductQuestion.objects.create(product=self.product, question_text='Size?',
+                                                  question_type='multi-select')
+        self.client.get(f'/api/products/{self.product.id}/')
+        QuestionOption.objects.create(question=question, option_text='L')
+        response = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['questions'][0]['options'][0]['option_text'], 'L')
+
+    def test_seller_rename_invalidates_cached_products(self):
+        self.client.get(f'/api/products/{self.product.id}/')
+        seller = Seller.objects.get(id=self.seller.id)
+        seller.save(update_fields=['location_lat'])
+        self.assertEqual(self.client.get(f'/api/products/{self.product.id}/')['X-Cache'], 'HIT')
+
+        seller.name = 'Renamed'
+        seller.save()
+        response = self.client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['seller_name'], 'Renamed')
+
+
+    def test_stats_endpoint_reports_this_process_counters(self):
+        cache_stats.reset()
+        self.client.get(f'/api/products/{self.product.id}/')
+        self.client.get(f'/api/products/{self.product.id}/')
+        self.assertEqual(self.client.get('/api/cache/stats/').status_code, 401)
+
+        self.client.force_authenticate(User.objects.create_user(username='staff', is_staff=True))
+        response = self.client.get('/api/cache/stats/')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['hits'], response.data['misses'], response.data['hit_rate']), (1, 1, 0.5))
+
+
+class FeedScoreTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller',
+                                            location='Kampala')
+        self.buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer',
+                                          location='Gulu')
+        with self.captureOnCommitCallbacks(execute=True):
+            self.product = Product.objects.create(seller=self.seller, name='Boot', unit_price=100)
+            self.other = Product.objects.create(seller=self.seller, name='Shoe', unit_price=100)
+
+    def score(self):
+        return ProductFeedScore.objects.get(product=self.product)
+
+    def feed_ids(self):
+        client = APIClient()
+        client.force_authenticate(self.buyer.user)
+        return [row['id'] for row in client.get('/api/feed/home/').data]
+
+    def test_like_and_comment_refresh_the_score(self):
+        before = self.score()
+        with self.captureOnCommitCallbacks(execute=True):
+            ProductLike.objects.create(product=self.product, buyer=self.buyer)
+        liked = self.score()
+        self.assertEqual(liked.recent_likes, 1)
+        self.assertGreater(liked.final_score, before.final_score)
+
+        # The comment view keeps the rating columns the score is built from.
+        client = APIClient()
+        client.force_authenticate(self.buyer.user)
+        with self.captureOnCommitCallbacks(execute=True):
+            response = client.post(f'/api/products/{self.product.id}/comments/',
+                                   {'comment': 'Nice', 'rating': 5}, format='json')
+        self.assertEqual(response.status_code, 201)
+        commented = self.score()
+        self.assertEqual((commented.recent_comments, commented.avg_rating), (1, 5))
+        self.assertGreater(commented.final_score, liked.final_score)
+        self.assertEqual(ProductFeedScore.objects.get(product=self.other).recent_likes, 0)
+
+    def test_seller_move_refreshes_location(self):
+        self.assertEqual(self.feed_ids(), [])
+        with self.captureOnCommitCallbacks(execute=True):
+            self.seller.location = 'Gulu'
+            self.seller.save(update_fields=['location'])
+        self.assertEqual(self.score().seller_location, 'gulu')
+        self.assertCountEqual(self.feed_ids(), [self.product.id, self.other.id])
+
+    def test_refresh_waits_for_commit(self):
+        with self.captureOnCommitCallbacks() as callbacks:
+            ProductLike.objects.create(product=self.product, buyer=self.buyer)
+        self.assertEqual(self.score().recent_likes, 0)
+        for callback in callbacks:
+            callback()
+        self.assertEqual(self.score().recent_likes, 1)
+
+class TrendingRollupTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer')
+        self.product = Product.objects.create(seller=seller, name='Product', unit_price=100)
+
+    def paid_order(self, quantity):
+        order = Order.objects.create(buyer=self.buyer, total_amount=100 * quantity)
+        OrderItem.objects.create(order=order, product=self.product, quantity=quantity, unit_price=100,
+                                 subtotal=100 * quantity)
+        order.status = 'paid'
+        order.save()
+        return order
+
+    def test_rollups_follow_category_changes(self):
+        shoes = Category.objects.create(name='Shoes')
+        food = Category.objects.create(name='Food')
+        self.product.category = shoes
+        self.product.save()
+        self.paid_order(2)
+
+        self.product.category = food
+        self.product.save()
+        client = APIClient()
+        ids = lambda category: [p['id'] for p in client.get('/api/feed/trending/window/', {'category': category.id}).data]
+        self.assertEqual(ids(food), [self.product.id])
+        self.assertEqual(ids(shoes), [])
+
+    def test_rollups_follow_seller_moves(self):
+        self.paid_order(2)
+        seller = self.product.seller
+        seller.location = 'Gulu'
+        seller.save()
+        self.assertEqual(list(TrendingRollup.objects.values_list('location', flat=True)), ['gulu'])
+
+        seller.location_lat = 2.77
+        seller.save(update_fields=['location_lat'])
+        self.assertEqual(list(TrendingRollup.objects.values_list('location', flat=True)), ['gulu'])
+
+    def test_refund_takes_units_back_out(self):
+        self.paid_order(3)
+        order = self.paid_order(2)
+        order.status = 'refunded'
+        order.save()
+        rollup = TrendingRollup.objects.get(product=self.product)
+        self.assertEqual((rollup.units_sold, rollup.purchase_count), (3, 1))
+
+    def test_refund_larger_than_bucket_is_floored(self):
+        # e.g. paid before the rollup table was backfilled
+        order = self.paid_order(5)
+        TrendingRollup.objects.update(units_sold=2, purchase_count=0)
+        order.status = 'refunded'
+        order.save()
+
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'refunded')
+        rollup = TrendingRollup.objects.get(product=self.product)
+        self.assertEqual((rollup.units_sold, rollup.purchase_count), (0, 0))
+
+
+class DecayedTrendingTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer')
+        self.client = APIClient()
+
+    def product(self, name, **fields):
+        return Product.objects.create(seller=self.seller, name=name, unit_price=100, **fields)
+
+    def order(self, product, quantity, status='paid', age=timedelta(0)):
+        order = Order.objects.create(buyer=self.buyer, total_amount=100 * quantity)
+        OrderItem.objects.create(order=order, product=product, quantity=quantity, unit_price=100,
+                                 subtotal=100 * quantity)
+        Order.objects.filter(id=order.id).update(order_date=timezone.now() - age)
+        order = Order.objects.get(id=order.id)
+        order.status = status
+        order.save()
+        return order
+
+    def trending(self, **params):
+        return [p['id'] for p in self.client.get('/api/feed/trending/', params).data]
+
+    def score(self, product):
+        return decayed_score(ProductTrendScore.objects.get(product=product).log_score)
+
+    def test_recent_sales_outrank_older_larger_ones(self):
+        old, recent, newest = self.product('Old'), self.product('Recent'), self.product('Newest')
+        self.order(old, 10, age=timedelta(days=10))  # ~3.3 half-lives: worth about 1 unit now
+        self.order(recent, 2)
+        self.order(newest, 3)
+        self.assertEqual(self.trending(), [newest.id, recent.id, old.id])
+        self.assertAlmostEqual(self.score(old), 10 * 2 ** (-240 / 72), places=2)
+
+    def test_sale_counts_once_through_paid_shipped_delivered(self):
+        product = self.product('Product')
+        order = self.order(product, 4)
+        for status in ('shipped', 'delivered'):
+            order.status = status
+            order.save()
+        self.assertAlmostEqual(self.score(product), 4, places=2)
+
+        order.status = 'refunded'
+        order.save()
+        self.assertFalse(ProductTrendScore.objects.filter(product=product).exists())
+
+    def test_orders_first_seen_as_shipped_count(self):
+        product = self.product('Product')
+        self.order(product, 1)
+        order = self.order(product, 2, status='shipped')
+        self.assertAlmostEqual(self.score(product), 3, places=2)
+        order.status = 'cancelled'
+        order.save()
+        self.assertAlmostEqual(self.score(product), 1, places=2)
+
+    def test_scores_follow_category_and_seller_moves(self):
+        shoes, food = Category.objects.create(name='Shoes'), Category.objects.create(name='Food')
+        product = self.product('Product', category=shoes)
+        self.order(product, 1)
+        product.category = food
+        product.save()
+        self.assertEqual(self.trending(category=food.id), [product.id])
+        self.assertEqual(self.trending(category=shoes.id), [])
+
+        self.seller.location = 'Gulu'
+        self.seller.save()
+        self.assertEqual(ProductTrendScore.objects.get(product=product).location, 'gulu')
+
+
+class ProductRatingTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.product = Product.objects.create(seller=seller, name='Product', unit_price=100)
+        self.user = User.objects.create_user(username='buyer')
+        self.buyer = Buyer.objects.create(user=self.user, name='Buyer')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def comment(self, rating):
+        response = self.client.post(f'/api/products/{self.product.id}/comments/',
+                                    {'comment': 'Nice', 'rating': rating}, format='json')
+        self.assertEqual(response.status_code, 201)
+        return response.data['id']
+
+    def totals(self):
+        self.product.refresh_from_db()
+        return self.product.rating_sum, self.product.rating_number, str(self.product.rating_magnitude)
+
+    def reconcile(self):
+        out = StringIO()
+        call_command('reconcile_product_ratings', '--check', stdout=out)
+        return out.getvalue()
+
+    def test_create_edit_and_delete_keep_the_totals(self):
+        first = self.comment(5)
+        second = self.comment(2)
+        self.assertEqual(self.totals(), (7, 2, '3.50'))
+
+        self.client.put(f'/api/comments/{second}/', {'rating': 4}, format='json')
+        self.assertEqual(self.totals(), (9, 2, '4.50'))
+
+        self.client.delete(f'/api/comments/{first}/')
+        self.assertEqual(self.totals(), (4, 1, '4.00'))
+        self.assertIn('No drift found.', self.reconcile())
+
+    def test_half_way_means_are_not_reported_as_drift(self):
+        # 107 / 40 = 2.675 sits on a rounding boundary.
+        for rating in [3] * 27 + [2] * 13:
+            ProductComment.objects.create(product=self.product, buyer=self.buyer, comment_text='x', rating=rating)
+            apply_rating_change(self.product.id, rating, 1)
+        self.assertEqual(self.totals()[:2], (107, 40))
+        self.assertIn('No drift found.', self.reconcile())
+
+    def test_reconcile_fixes_drift(self):
+        self.comment(4)
+        Product.objects.filter(id=self.product.id).update(rating_sum=0, rating_number=0, rating_magnitude=0)
+        self.assertIn('1 products drifted', self.reconcile())
+        call_command('reconcile_product_ratings', stdout=StringIO())
+        self.assertEqual(self.totals(), (4, 1, '4.00'))
+
+
+class ProductCommentListTests(TestCase):
+    # seller-profile check, product, comments with buyers, the reader's
+    # helpful votes, verified purchases
+    QUERY_BUDGET = 5
+
+    def setUp(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.product = Product.objects.create(seller=seller, name='Product', unit_price=100)
+        self.user = User.objects.create_user(username='reader')
+        self.client = APIClient()
+        self.comments = []
+
+    def add_comments(self, count, helpful_votes=0):
+        for _ in range(count):
+            index = len(self.comments)
+            buyer = Buyer.objects.create(user=User.objects.create_user(username=f'buyer{index}'), name=f'Buyer {index}')
+            comment = ProductComment.objects.create(product=self.product, buyer=buyer, comment_text='x',
+                                                    helpful_votes=helpful_votes)
+            if index % 2:
+                CommentHelpful.objects.create(comment=comment, user=self.user)
+                VerifiedPurchase.objects.create(buyer=buyer, product=self.product)
+            self.comments.append(comment)
+
+    def list_comments(self, **params):
+        # A fresh user instance so the seller-profile lookup is counted every time.
+        self.client.force_authenticate(User.objects.get(id=self.user.id))
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            response = self.client.get(f'/api/products/{self.product.id}/comments/', params)
+        self.assertEqual(response.status_code, 200)
+        return response.data
+
+    def test_query_count_does_not_grow_with_the_page(self):
+        self.add_comments(2)
+        self.list_comments(page_size=50)
+        self.add_comments(18)
+        page = self.list_comments(page_size=50)
+        self.assertEqual(len(page['results']), 20)
+        self.assertEqual(len(self.list_comments()), 20)
+
+        flags = {row['id']: (row['user_voted_helpful'], row['verified_purchase']) for row in page['results']}
+        self.assertEqual(flags, {c.id: (i % 2 == 1, i % 2 == 1) for i, c in enumerate(self.comments)})
+
+    def test_helpful_first_and_cursor_continuation(self):
+        self.add_comments(2, helpful_votes=1)
+        self.add_comments(3, helpful_votes=5)
+        self.add_comments(1, helpful_votes=0)
+        expected = [c.id for c in sorted(self.comments, key=lambda c: (-c.helpful_votes, -c.id))]
+
+        seen = []
+        page = self.list_comments(ordering='helpful', page_size=2)
+        seen += [row['id'] for row in page['results']]
+        while page['next']:
+            response = self.client.get(page['next'])
+            page = response.data
+            seen += [row['id'] for row in page['results']]
+        self.assertEqual(seen, expected)
+
+    def test_newest_first_by_default(self):
+        self.add_comments(3)
+        page = self.list_comments(page_size=2)
+        self.assertEqual([row['id'] for row in page['results']], [self.comments[2].id, self.comments[1].id])
+        self.assertEqual([row['id'] for row in self.client.get(page['next']).data['results']], [self.comments[0].id])
+
+
+class VerifiedPurchaseTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer')
+        self.shoes = Product.objects.create(seller=seller, name='Shoes', unit_price=100)
+        self.hat = Product.objects.create(seller=seller, name='Hat', unit_price=100)
+
+    def delivered_order(self, *products):
+        order = Order.objects.create(buyer=self.buyer, total_amount=100 * len(products))
+        for product in products:
+            OrderItem.objects.create(order=order, product=product, quantity=1, unit_price=100, subtotal=100)
+        order.status = 'delivered'
+        order.save()
+        return order
+
+    def verified(self):
+        return set(VerifiedPurchase.objects.filter(buyer=self.buyer).values_list('product_id', flat=True))
+
+    def test_refund_revokes_the_pair(self):
+        order = self.delivered_order(self.shoes, self.hat)
+        self.assertEqual(self.verified(), {self.shoes.id, self.hat.id})
+        order.status = 'refunded'
+        order.save()
+        self.assertEqual(self.verified(), set())
+
+    def test_pair_covered_by_another_delivered_order_is_kept(self):
+        self.delivered_order(self.shoes)
+        order = self.delivered_order(self.shoes, self.hat)
+        order.status = 'refunded'
+        order.save()
+        self.assertEqual(self.verified(), {self.shoes.id})
+
+    def test_deleting_a_line_from_a_delivered_order_revokes_it(self):
+        order = self.delivered_order(self.shoes, self.hat)
+        order.items.get(product=self.hat).delete()
+        self.assertEqual(self.verified(), {self.shoes.id})
+
+        self.delivered_order(self.shoes)
+        order.items.all().delete()
+        self.assertEqual(self.verified(), {self.shoes.id})
+
+
+class CheckoutTests(TestCase):
+    # buyer profile, cart, savepoint, locked cart lines, stock UPDATE in its
+    # own savepoint (+2), default address (+ INSERT the first time), order,
+    # order items, cart DELETE, release savepoint
+    QUERY_BUDGET = 13
+
+    def setUp(self):
+        cache.clear()
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.products = [
+            Product.objects.create(seller=seller, name=f'Product {i}', unit_price=100, stock_quantity=5)
+            for i in range(3)
+        ]
+        self.user = User.objects.create_user(username='buyer')
+        self.buyer = Buyer.objects.create(user=self.user, name='Buyer')
+        self.cart = Cart.objects.create(buyer=self.buyer)
+        self.client = APIClient()
+
+    def authenticate(self):
+        # A fresh user instance so the buyer profile lookup is counted every time.
+        self.client.force_authenticate(user=User.objects.get(id=self.user.id))
+
+    def checkout(self):
+        return self.client.post('/api/orders/create-from-cart/')
+
+    def stock(self):
+        return list(Product.objects.order_by('id').values_list('stock_quantity', flat=True))
+
+    def test_checkout_query_count_is_independent_of_cart_size(self):
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=1)
+        self.authenticate()
+        with self.assertNumQueries(self.QUERY_BUDGET):
+            self.assertEqual(self.checkout().status_code, 201)
+
+        for product in self.products:
+            CartItem.objects.create(cart=self.cart, product=product, quantity=2)
+        self.authenticate()
+        with self.assertNumQueries(self.QUERY_BUDGET - 1):  # the address now exists
+            response = self.checkout()
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(self.stock(), [2, 3, 3])
+        self.assertEqual(Order.objects.get(id=response.data['order_id']).items.count(), 3)
+        self.assertFalse(self.cart.items.exists())
+
+    def test_short_stock_rolls_back(self):
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=2)
+        CartItem.objects.create(cart=self.cart, product=self.products[1], quantity=6)
+        self.authenticate()
+        response = self.checkout()
+        self.assertEqual(response.status_code, 400)
+        self.assertEqual(response.data['product_ids'], [self.products[1].id])
+        self.assertEqual(self.stock(), [5, 5, 5])
+        self.assertEqual(self.cart.items.count(), 2)
+        self.assertFalse(Order.objects.exists())
+
+    def test_adjust_stock_changes_nothing_when_one_product_is_short(self):
+        ids = [product.id for product in self.products]
+        self.assertFalse(adjust_stock({ids[0]: -2, ids[1]: -6, ids[2]: 1}))
+        self.assertEqual(self.stock(), [5, 5, 5])
+        self.assertTrue(adjust_stock({ids[0]: -2, ids[2]: 1}))
+        self.assertEqual(self.stock(), [3, 5, 6])
+
+    def test_restoring_stock_invalidates_cached_product(self):
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=3)
+        self.authenticate()
+        order = Order.objects.get(id=self.checkout().data['order_id'])
+        client = APIClient()
+        self.assertEqual(client.get(f'/api/products/{self.products[0].id}/').data['stock_quantity'], 2)
+
+        with self.captureOnCommitCallbacks(execute=True):
+            restore_order_stock(order)
+        response = client.get(f'/api/products/{self.products[0].id}/')
+        self.assertEqual(response['X-Cache'], 'MISS')
+        self.assertEqual(response.data['stock_quantity'], 5)
+
+    def test_stale_unpaid_orders_release_their_stock(self):
+        CartItem.objects.create(cart=self.cart, product=self.products[0], quantity=3)
+        self.authenticate()
+        order_id = self.checkout().data['order_id']
+        paying = Order.objects.create(buyer=self.buyer, total_amount=100, dusupay_internal_reference='ref')
+        self.assertEqual(reconciliation.expire_unpaid_orders(), 0)
+
+        Order.objects.update(order_date=timezone.now() - timedelta(hours=2))
+        self.assertEqual(reconciliation.expire_unpaid_orders(), 1)
+        self.assertEqual(Order.objects.get(id=order_id).status, 'cancelled')
+        self.assertEqual(Order.objects.get(id=paying.id).status, 'pending')
+        self.assertEqual(self.stock(), [5, 5, 5])
+
+
+
+
+class ReconcilePendingOrdersTests(TestCase):
+    STATUSES = {'ref-paid': 'COMPLETED', 'ref-failed': 'failed', 'ref-pending': 'PENDING'}
+
+    def setUp(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.product = Product.objects.create(seller=seller, name='Product', unit_price=100, stock_quantity=3)
+        buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer')
+        self.orders = {}
+        for reference in [*self.STATUSES, 'ref-down', 'ref-later']:
+            order = Order.objects.create(buyer=buyer, total_amount=200, dusupay_internal_reference=reference)
+            OrderItem.objects.create(order=order, product=self.product, quantity=2, unit_price=100, subtotal=200)
+            self.orders[reference] = order
+        Order.objects.filter(id=self.orders['ref-later'].id).update(
+            next_reconcile_at=timezone.now() + timedelta(minutes=5))
+        self.client = mock.Mock()
+        self.client.check_transaction_status.side_effect = self.status_of
+
+    def status_of(self, reference):
+        if reference not in self.STATUSES:
+            return {'success': False, 'error': 'Gateway error 503'}
+        data = {'internal_reference': reference, 'transaction_status': self.STATUSES[reference],
+                'provider_code': 'mtn_ug'}
+        return {'success': True, 'status': self.STATUSES[reference], 'data': data}
+
+    def status(self, reference):
+        order = Order.objects.get(id=self.orders[reference].id)
+        return order.status, order.reconcile_attempts
+
+    def test_stale_orders_settle_from_the_gateway_status(self):
+        summary = reconciliation.reconcile_pending_orders(self.client)
+        self.assertEqual(summary, {'checked': 4, 'paid': 1, 'cancelled': 1, 'pending': 2})
+        self.assertCountEqual([call.args[0] for call in self.client.check_transaction_status.call_args_list],
+                              ['ref-paid', 'ref-failed', 'ref-pending', 'ref-down'])
+
+        self.assertEqual(self.status('ref-paid'), ('paid', 0))
+        self.assertEqual(Payment.objects.get(order=self.orders['ref-paid']).payment_status, 'successful')
+        self.assertEqual(self.status('ref-failed'), ('cancelled', 0))
+        self.assertEqual(Payment.objects.get(order=self.orders['ref-failed']).payment_status, 'failed')
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 5)
+
+        # Still pending or unreachable: backed off, not settled.
+        for reference in ['ref-pending', 'ref-down']:
+            self.assertEqual(self.status(reference), ('pending', 1))
+            self.assertGreater(Order.objects.get(id=self.orders[reference].id).next_reconcile_at, timezone.now())
+        self.assertEqual(self.status('ref-later'), ('pending', 0))
+        self.assertEqual(reconciliation.reconcile_pending_orders(self.client)['checked'], 0)
+
+    def test_orders_settled_by_the_webhook_are_not_checked(self):
+        Order.objects.filter(id=self.orders['ref-failed'].id).update(status='paid')
+        summary = reconciliation.reconcile_pending_orders(self.client)
+        self.assertEqual((summary['paid'], summary['cancelled']), (1, 0))
+        self.assertEqual(self.status('ref-failed'), ('paid', 0))
+        self.product.refresh_from_db()
+        self.assertEqual(self.product.stock_quantity, 3)
+
+class CartLookupTests(TestCase):
+    def test_cart_is_memoized_per_request(self):
+        buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer')
+        request = RequestFactory().get('/')
+        request.user = User.objects.select_related('buyer_profile').get(id=buyer.user_id)
+        with self.assertNumQueries(4):  # get_or_create: SELECT, then INSERT in a savepoint
+            cart = get_cart(request)
+        with self.assertNumQueries(0):
+            self.assertIs(get_cart(request), cart)
+            self.assertIs(get_cart(Request(request)), cart)
+
+        request = RequestFactory().get('/')
+        request.user = User.objects.select_related('buyer_profile').get(id=buyer.user_id)
+        with self.assertNumQueries(1):
+            self.assertEqual(get_cart(request), cart)
+
+
+class DedupeCartsTests(TransactionTestCase):
+    """Duplicates predate the unique columns, so the test swaps in the legacy table."""
+
+    def setUp(self):
+        with isolate_apps('trendsync'):
+            class LegacyCart(models.Model):
+                buyer_id = models.IntegerField(null=True)
+                session_key = models.CharField(max_length=40, null=True)
+                created_at = models.DateTimeField()
+
+                class Meta:
+                    app_label = 'trendsync'
+                    db_table = Cart._meta.db_table
+
+        self.legacy_cart = LegacyCart
+        with connection.schema_editor() as editor:
+            editor.delete_model(Cart)
+            editor.create_model(LegacyCart)
+
+    def tearDown(self):
+        CartItem.objects.all().delete()
+        with connection.schema_editor() as editor:
+            editor.delete_model(self.legacy_cart)
+            editor.create_model(Cart)
+
+    def test_duplicates_merge_into_the_oldest_cart(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        boot, shoe = [Product.objects.create(seller=seller, name=name, unit_price=100) for name in ['Boot', 'Shoe']]
+        buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer')
+        oldest, duplicate = Cart.objects.create(buyer=buyer), Cart.objects.create(buyer=buyer)
+        CartItem.objects.create(cart=oldest, product=boot, quantity=1)
+        CartItem.objects.create(cart=duplicate, product=boot, quantity=2)
+        CartItem.objects.create(cart=duplicate, product=shoe, quantity=1)
+        session_carts = [Cart.objects.create(session_key='abc') for _ in range(3)]
+        CartItem.objects.create(cart=session_carts[2], product=shoe, quantity=4)
+        single = Cart.objects.create(session_key='xyz')
+
+        out = StringIO()
+        call_command('dedupe_carts', stdout=out)
+        self.assertIn('Merged 3 duplicate carts.', out.getvalue())
+        self.assertCountEqual(Cart.objects.values_list('id', flat=True), [oldest.id, session_carts[0].id, single.id])
+        self.assertEqual(dict(oldest.items.values_list('product_id', 'quantity')), {boot.id: 3, shoe.id: 1})
+        self.assertEqual(dict(session_carts[0].items.values_list('product_id', 'quantity')), {shoe.id: 4})
+
+class SellerRatingTests(TestCase):
+    def setUp(self):
+        self.seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Mama Shop')
+        self.buyers = [Buyer.objects.create(user=User.objects.create_user(username=f'buyer{i}'), name=name)
+                       for i, name in enumerate(['Alice', 'Bob'])]
+        self.client = APIClient()
+
+    def rate(self, buyer, rating, seller_id=None):
+        self.client.force_authenticate(buyer.user)
+        return self.client.post('/api/sellers/rate/', {'seller_id': seller_id or self.seller.id, 'rating': rating},
+                                format='json')
+
+    def totals(self):
+        self.seller.refresh_from_db()
+        return self.seller.rating_sum, self.seller.rating_count, self.seller.trust
+
+    def test_rating_again_replaces_the_earlier_score(self):
+        alice, bob = self.buyers
+        self.assertEqual(self.rate(alice, 5).data['seller_trust'], 100)
+        response = self.rate(alice, 2)
+        self.assertEqual((response.data['seller_trust'], response.data['ratings_count']), (40, 1))
+        self.rate(bob, 4)
+        self.assertEqual(self.totals(), (6, 2, 60))
+        self.assertEqual(SellerRating.objects.count(), 2)
+
+    def test_trust_is_the_mean_on_a_0_to_100_scale(self):
+        self.assertEqual(trust_from(0, 0), 0)
+        self.assertEqual(trust_from(7, 2), 70)
+        self.assertEqual(trust_from(13, 3), 87)
+
+    def test_unknown_seller_is_not_found(self):
+        self.assertEqual(self.rate(self.buyers[0], 4, seller_id=999).status_code, 404)
+        self.assertEqual(self.rate(self.buyers[0], 4, seller_id='abc').status_code, 404)
+        self.assertEqual(self.rate(self.buyers[0], 9).status_code, 400)
+
+    def test_backfill_rebuilds_totals_from_review_notifications(self):
+        alice, bob = self.buyers
+        for buyer, rating in [(alice, 3), (alice, 5), (bob, 2)]:
+            SimpleNotification.objects.create(recipient=self.seller.user, sender_name=buyer.name, type='review',
+                                              message=f'{buyer.name} rated your service {rating}/5. Nice')
+            SimpleNotification.objects.create(recipient=buyer.user, sender_name='System', type='review_confirmation',
+                                              message=f'You rated Mama Shop {rating}/5. Thank you for your feedback!')
+        # Ratings already in SellerRating are newer and win.
+        SellerRating.objects.create(buyer=bob, seller=self.seller, rating=4)
+
+        call_command('backfill_seller_ratings', stdout=StringIO())
+        ratings = dict(SellerRating.objects.values_list('buyer__name', 'rating'))
+        self.assertEqual(ratings, {'Alice': 5, 'Bob': 4})
+        self.assertEqual(self.totals(), (9, 2, 90))
+
+
+class NotificationInboxTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def notify(self, count=1):
+        return [Notification.objects.create(recipient=self.user, notification_type='system', title='Hi', message='x')
+                for _ in range(count)]
+
+    def unread(self):
+        # The stored counter, not a recount.
+        counter = NotificationCounter.objects.get(user=self.user)
+        self.assertEqual(counter.unread, Notification.objects.filter(recipient=self.user, read=False).count())
+        self.assertEqual(self.client.get('/api/notifications/').data['unread_count'], counter.unread)
+        return counter.unread
+
+    def test_counter_follows_every_change(self):
+        first, second, third, *_ = self.notify(5)
+        self.assertEqual(self.unread(), 5)
+
+        self.client.post(f'/api/notifications/{first.id}/read/')
+        self.client.post(f'/api/notifications/{first.id}/read/')
+        self.assertEqual(self.unread(), 4)
+
+        self.client.delete(f'/api/notifications/{first.id}/delete/')
+        self.assertEqual(self.unread(), 4)
+        self.client.delete(f'/api/notifications/{second.id}/delete/')
+        self.assertEqual(self.unread(), 3)
+
+        self.client.post('/api/notifications/read-all/')
+        self.assertEqual(self.unread(), 0)
+
+        self.notify(2)
+        self.assertEqual(self.unread(), 2)
+        self.client.delete('/api/notifications/clear-all/')
+        self.assertEqual(self.unread(), 0)
+        self.assertFalse(Notification.objects.filter(recipient=self.user).exists())
+
+    def test_simple_notification_counter(self):
+        notes = [SimpleNotification.objects.create(recipient=self.user, sender_name='Seller', message='x')
+                 for _ in range(3)]
+        unread = lambda: self.client.get('/api/simple-notifications/').data['unread_count']
+        self.assertEqual(unread(), 3)
+        self.client.post(f'/api/simple-notifications/{notes[0].id}/read/')
+        self.client.delete(f'/api/simple-notifications/{notes[1].id}/delete/')
+        self.assertEqual(unread(), 1)
+        self.client.delete('/api/simple-notifications/clear-all/')
+        self.assertEqual(unread(), 0)
+
+    def test_inbox_pages_newest_first(self):
+        notifications = self.notify(60)
+        page = self.client.get('/api/notifications/').data
+        self.assertEqual(len(page['data']), 50)
+        self.assertIsNone(page['previous'])
+        rest = self.client.get(page['next']).data
+        self.assertEqual([row['id'] for row in page['data'] + rest['data']],
+                         [n.id for n in reversed(notifications)])
+        self.assertIsNone(rest['next'])
+        self.assertEqual(rest['unread_count'], 60)
+
+
+class WebhookInboxTests(TestCase):
+    def setUp(self):
+        self.buyer = Buyer.objects.create(user=User.objects.create_user(username='buyer'), name='Buyer')
+        webhooks.enqueue('transaction.completed', {'internal_reference': 'ref-1', 'transaction_status': 'COMPLETED'})
+        self.event = DusuPayWebhookEvent.objects.get()
+
+    def make_due(self):
+        DusuPayWebhookEvent.objects.update(next_attempt_at=timezone.now() - timedelta(seconds=1))
+
+    def test_event_before_its_order_is_retried(self):
+        summary = webhooks.process_webhook_inbox()
+        self.assertEqual(summary, {'processed': 0, 'failed': 0, 'orphaned': 1})
+        self.event.refresh_from_db()
+        self.assertIsNone(self.event.processed_at)
+
+        order = Order.objects.create(buyer=self.buyer, total_amount=100, dusupay_internal_reference='ref-1')
+        self.assertFalse(any(webhooks.process_webhook_inbox().values()))
+        self.make_due()
+        self.assertEqual(webhooks.process_webhook_inbox()['processed'], 1)
+        order.refresh_from_db()
+        self.assertEqual(order.status, 'paid')
+
+    def test_failing_event_backs_off(self):
+        Order.objects.create(buyer=self.buyer, total_amount=100, dusupay_internal_reference='ref-1')
+        with mock.patch('trendsync.webhooks.apply_event', side_effect=RuntimeError('boom')), \
+                self.assertLogs('dusupay', 'ERROR'):
+            call_command('process_webhooks', stdout=StringIO())
+            self.event.refresh_from_db()
+            self.assertEqual(self.event.attempts, 1)
+            self.assertGreater(self.event.next_attempt_at, timezone.now() + timedelta(seconds=5))
+
+            self.make_due()
+            webhooks.process_webhook_inbox()
+            self.event.refresh_from_db()
+            self.assertEqual((self.event.attempts, self.event.last_error), (2, 'boom'))
+            self.assertGreater(self.event.next_attempt_at, timezone.now() + timedelta(seconds=15))
+        self.assertIsNone(self.event.processed_at)
+
+
+class ImpressionShutdownHandlerTests(SimpleTestCase):
+    def test_only_server_processes_hook_sigterm(self):
+        self.assertTrue(impressions.is_server_process(['manage.py', 'runserver']))
+        self.assertTrue(impressions.is_server_process(['/venv/bin/gunicorn', 'config.wsgi']))
+        self.assertFalse(impressions.is_server_process(['manage.py', 'migrate']))
+        # The test runner is not a server, so app loading left SIGTERM alone.
+        self.assertEqual(signal.getsignal(signal.SIGTERM), signal.SIG_DFL)
+
+
+@override_settings(DUSUPAY_HTTP={'MAX_RETRIES': 2, 'BACKOFF': 0, 'BREAKER_THRESHOLD': 2, 'BREAKER_RESET': 60})
+class DusuPayClientTests(SimpleTestCase):
+    def setUp(self):
+        self.server = FakeDusuPayServer().start()
+        self.addCleanup(self.server.stop)
+        self.client = DusuPayClient(base_url=self.server.url, public_key='pk', secret_key='sk')
+
+    def initiate(self):
+        return self.client.initiate_payment(
+            merchant_reference='1', amount=1000, currency='UGX',
+            transaction_method='MOBILE_MONEY', provider_code='mtn_ug', account_number='256780000000',
+        )
+
+    def test_status_check_retries_transient_errors(self):
+        reference = self.initiate()['internal_reference']
+        self.server.complete(reference)
+        self.server.fail_next(2)
+
+        response = self.client.check_transaction_status(reference)
+        self.assertEqual(response['status'], 'COMPLETED')
+        self.assertEqual(self.client.metrics.snapshot()['status']['calls'], 1)
+
+    def test_initiate_is_not_resent_after_a_gateway_error(self):
+        self.server.fail_next(1)
+        self.assertFalse(self.initiate()['success'])
+        self.assertEqual(len(self.server.requests), 1)
+
+    def test_initiate_is_not_resent_after_the_connection_drops(self):
+        # The gateway read the payment before hanging up, so it may have been taken.
+        self.server.fail_next(1, status=DROP_CONNECTION)
+        self.assertFalse(self.initiate()['success'])
+        self.assertEqual(self.server.requests, [('POST', '/collections/initialize')])
+
+    def test_only_unsent_requests_count_as_nothing_sent(self):
+        self.server.fail_next(1, status=DROP_CONNECTION)
+        with self.assertRaises(requests.ConnectionError) as dropped:
+            requests.post(f'{self.server.url}/collections/initialize', json={})
+        self.assertFalse(nothing_sent(dropped.exception))
+
+        with socket.socket() as closed:
+            closed.bind(('127.0.0.1', 0))
+            port = closed.getsockname()[1]
+        with self.assertRaises(requests.ConnectionError) as refused:
+            requests.post(f'http://127.0.0.1:{port}/collections/initialize', json={})
+        self.assertTrue(nothing_sent(refused.exception))
+
+    def test_open_circuit_fails_fast(self):
+        self.server.fail_next(6)
+        self.client.check_transaction_status('x')
+        self.client.check_transaction_status('x')
+        self.assertEqual(self.client.breaker.state, CircuitBreaker.OPEN)
+
+        requests_sent = len(self.server.requests)
+        self.assertFalse(self.client.check_transaction_status('x')['success'])
+        self.assertEqual(len(self.server.requests), requests_sent)
+
+
+class NearbyProductsTests(TestCase):
+    def seller(self, name, lat, products=0):
+        seller = Seller.objects.create(user=User.objects.create_user(username=name), name=name,
+                                       location_lat=lat, location_lng=32.5811)
+        return seller, [Product.objects.create(seller=seller, name=f'{name} {i}', unit_price=100)
+                        for i in range(products)]
+
+    def test_nearest_seller_first_and_newest_first_within_a_seller(self):
+        _, near = self.seller('near', 0.3140, products=2)
+        self.seller('empty', 0.3150)
+        _, middle = self.seller('middle', 0.3200, products=3)
+        self.seller('far', 0.3300, products=2)
+        for i in range(20):
+            self.seller(f'other{i}', 0.3250, products=1)
+
+        # sellers, per-seller counts, the whole sellers, the last seller's slice
+        with self.assertNumQueries(4):
+            products = products_within(0.3136, 32.5811, radius_km=5, limit=4)
+        self.assertEqual([p.id for p in products], [near[1].id, near[0].id, middle[2].id, middle[1].id])
+        self.assertLess(products[0].distance_km, products[2].distance_km)
+
+    def test_no_products_in_range(self):
+        self.seller('empty', 0.3140)
+        self.assertEqual(products_within(0.3136, 32.5811, radius_km=5), [])
+
+
+class ProductSearchTests(TestCase):
+    def setUp(self):
+        seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.shoes = Category.objects.create(name='Shoes')
+        self.food = Category.objects.create(name='Food')
+        self.boots = Product.objects.create(seller=seller, category=self.shoes, name='Red leather shoes',
+                                            description='Comfortable', unit_price=40000)
+        self.sandals = Product.objects.create(seller=seller, category=self.shoes, name='Blue sandals',
+                                              description='Pairs well with red shoes', unit_price=8000)
+        self.beans = Product.objects.create(seller=seller, category=self.food, name='Red beans',
+                                            description='Café quality', unit_price=3000)
+        self.client = APIClient()
+
+    def search(self, **params):
+        return self.client.get('/api/products/search/', params)
+
+    def test_search_ranks_name_matches_first_and_counts_facets(self):
+        response = self.search(q='red sho')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.boots.id, self.sandals.id])
+        self.assertEqual(response.data['count'], 2)
+        self.assertEqual(response.data['facets']['category'], [{'id': self.shoes.id, 'name': 'Shoes', 'count': 2}])
+        self.assertEqual([bucket['count'] for bucket in response.data['facets']['price']], [1, 1, 0, 0, 0])
+
+    def test_category_facet_ignores_the_selected_category(self):
+        response = self.search(q='red', category=self.food.id)
+        self.assertEqual([p['id'] for p in response.data['results']], [self.beans.id])
+        counts = {row['id']: row['count'] for row in response.data['facets']['category']}
+        self.assertEqual(counts, {self.shoes.id: 2, self.food.id: 1})
+
+    def test_price_filter_and_accents(self):
+        response = self.search(q='red', max_price=10000)
+        self.assertEqual({p['id'] for p in response.data['results']}, {self.sandals.id, self.beans.id})
+        self.assertEqual(self.search(q='cafe').data['count'], 1)
+
+    def test_bad_queries(self):
+        self.assertEqual(self.search().status_code, 400)
+        self.assertEqual(self.search(q='red', limit='x').status_code, 400)
+        self.assertEqual(self.search(q='"OR *').status_code, 200)
+
+    def test_suggest_matches_name_prefixes(self):
+        response = self.client.get('/api/products/suggest/', {'q': 're'})
+        self.assertEqual({row['id'] for row in response.data}, {self.boots.id, self.beans.id})
+
+    def test_product_list_search_uses_the_index(self):
+        response = self.client.get('/api/products/', {'search': 'sandals'})
+        self.assertEqual([p['id'] for p in response.data], [self.sandals.id])
+
+    def test_index_follows_saves_and_deletes(self):
+        self.boots.name = 'Green boots'
+        self.boots.save()
+        self.beans.delete()
+        self.assertEqual(search.search_products('boots')[1], 1)
+        self.assertEqual(search.search_products('leather')[1], 0)
+        self.assertEqual(search.search_products('beans')[1], 0)
+
+    def test_fixture_loads_are_not_indexed(self):
+        search.remove_products([self.boots.id])
+        post_save.send(Product, instance=self.boots, created=False, raw=True, update_fields=None)
+        self.assertEqual(search.search_products('leather')[1], 0)
+        self.assertEqual(search.rebuild_index(), 3)
+        self.assertEqual(search.search_products('leather')[1], 1)
+
+
+@override_settings(GEOCODER={'BACKEND': 'trendsync.geocoding.StubGeocoder', 'ASYNC': False})
+class SellerLocationGeocodingTests(TestCase):
+    def setUp(self):
+        user = User.objects.create_user(username='seller', password='password')
+        self.seller = Seller.objects.create(user=user, name='Seller')
+        self.client = APIClient()
+        self.client.force_authenticate(user)
+
+    def update_location(self, lat, lng):
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.post('/api/seller/location/update/', {'latitude': lat, 'longitude': lng}, format='json')
+
+    def test_address_is_filled_after_the_response(self):
+        response = self.update_location(0.3136, 32.5811)
+        self.assertTrue(response.data['address_pending'])
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.location_address, '0.3136, 32.5811')
+
+    def test_nearby_updates_reuse_the_cached_cell(self):
+        self.update_location(0.3136, 32.5811)
+        response = self.update_location(0.31361, 32.58111)
+        self.assertFalse(response.data['address_pending'])
+        self.assertEqual(response.data['address'], '0.3136, 32.5811')
+        self.assertEqual(geocoding.get_geocoder().calls, 1)
+
+    def test_previous_address_is_kept_while_the_new_one_is_looked_up(self):
+        self.update_location(0.3136, 32.5811)
+        with self.captureOnCommitCallbacks() as callbacks:
+            response = self.client.post('/api/seller/location/update/', {'latitude': 0.35, 'longitude': 32.6},
+                                        format='json')
+        self.assertTrue(response.data['address_pending'])
+        self.assertEqual(response.data['address'], '0.3136, 32.5811')
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.location_address, '0.3136, 32.5811')
+
+        for callback in callbacks:
+            callback()
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.location_address, '0.3500, 32.6000')
+
+    def test_streamed_position_keeps_the_previous_address(self):
+        self.update_location(0.3136, 32.5811)
+        with self.captureOnCommitCallbacks(execute=True):
+            persist_seller_location(self.seller.id, 0.36, 32.61)
+            self.seller.refresh_from_db()
+            self.assertEqual(self.seller.location_address, '0.3136, 32.5811')
+        self.seller.refresh_from_db()
+        self.assertEqual(self.seller.location_address, '0.3600, 32.6100')
+
+
+class LocationSubscriptionTests(TransactionTestCase):
+    def subscribe_all(self, seller_ids):
+        async def run():
+            communicator = WebsocketCommunicator(application, '/ws/locations/')
+            connected, _ = await communicator.connect()
+            self.assertTrue(connected)
+            replies = []
+            for seller_id in seller_ids:
+                await communicator.send_json_to({'type': 'subscribe', 'seller_id': seller_id})
+                silent = await communicator.receive_nothing(0.1)
+                replies.append(None if silent else await communicator.receive_json_from())
+            await communicator.disconnect()
+            return replies
+        return async_to_sync(run)()
+
+    def test_unknown_sellers_and_excess_subscriptions_are_rejected(self):
+        sellers = [
+            Seller.objects.create(user=User.objects.create_user(username=f'seller{i}'), name=f'Seller {i}')
+            for i in range(3)
+        ]
+        with mock.patch.object(realtime, 'MAX_SUBSCRIPTIONS', 2):
+            replies = self.subscribe_all([sellers[0].id, 999, sellers[1].id, sellers[2].id])
+        self.assertIsNone(replies[0])
+        self.assertEqual(replies[1], {'type': 'error', 'message': 'Unknown seller'})
+        self.assertIsNone(replies[2])
+        self.assertEqual(replies[3], {'type': 'error', 'message': 'Too many subscriptions'})
+
+
+class TopicSubscriptionTests(TransactionTestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(username='reader')
+        self.other = User.objects.create_user(username='other')
+        self.seller = Seller.objects.create(user=User.objects.create_user(username='seller'), name='Seller')
+        self.product = Product.objects.create(seller=self.seller, name='Product', unit_price=100)
+
+    async def connect(self):
+        communicator = WebsocketCommunicator(application, f'/ws/?token={AccessToken.for_user(self.user)}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['event'], 'notification.unread')
+        return communicator
+
+    async def subscribe(self, communicator, topic):
+        await communicator.send_json_to({'type': 'subscribe', 'topic': topic})
+        return await communicator.receive_json_from()
+
+    def test_user_topics_are_private_and_unknown_ids_rejected(self):
+        async def run():
+            communicator = await self.connect()
+            replies = [await self.subscribe(communicator, topic) for topic in [
+                f'user:{self.other.id}', f'user:{self.user.id}', 'seller:999', 'product:999',
+                f'seller:{self.seller.id}', f'product:{self.product.id}',
+            ]]
+            await communicator.disconnect()
+            return [reply.get('message') or reply['type'] for reply in replies]
+
+        self.assertEqual(async_to_sync(run)(), [
+            'Not allowed', 'subscribed', 'Not allowed', 'Not allowed', 'subscribed', 'subscribed',
+        ])
+
+    def test_subscription_cap(self):
+        async def run():
+            communicator = await self.connect()  # the user topic counts
+            replies = [await self.subscribe(communicator, f'seller:{self.seller.id}'),
+                       await self.subscribe(communicator, f'product:{self.product.id}')]
+            await communicator.disconnect()
+            return replies
+
+        with mock.patch.object(realtime, 'MAX_SUBSCRIPTIONS', 2):
+            replies = async_to_sync(run)()
+        self.assertEqual(replies[0]['type'], 'subscribed')
+        self.assertEqual(replies[1]['message'], 'Too many subscriptions')
+
+    def test_seller_and_product_topics_receive_changes(self):
+        buyer = Buyer.objects.create(user=self.other, name='Buyer')
+
+        def change():
+            self.product.unit_price = 150
+            self.product.save()
+            Product.objects.create(seller=self.seller, name='New', unit_price=10)
+            ProductComment.objects.create(product=self.product, buyer=buyer, comment_text='Nice', rating=4)
+            self.seller.location = 'Gulu'
+            self.seller.save()
+            self.seller.location_lat = 2.77
+            self.seller.save(update_fields=['location_lat'])
+
+        async def run():
+            communicator = await self.connect()
+            await self.subscribe(communicator, f'seller:{self.seller.id}')
+            await self.subscribe(communicator, f'product:{self.product.id}')
+            await database_sync_to_async(change)()
+            frames = []
+            while not await communicator.receive_nothing(0.2):
+                frames.append(await communicator.receive_json_from())
+            await communicator.disconnect()
+            return frames
+
+        frames = async_to_sync(run)()
+        self.assertEqual([(f['topic'], f['event']) for f in frames], [
+            (f'product:{self.product.id}', 'product.updated'),
+            (f'seller:{self.seller.id}', 'product.created'),
+            (f'product:{self.product.id}', 'comment.created'),
+            (f'seller:{self.seller.id}', 'seller.updated'),
+        ])
+        self.assertEqual(frames[0]['data']['unit_price'], '150')
+        self.assertEqual(frames[2]['data']['user_name'], 'Buyer')
+
+
+class NotificationPushTests(TransactionTestCase):
+    async def connect(self, user):
+        communicator = WebsocketCommunicator(application, f'/ws/?token={AccessToken.for_user(user)}')
+        connected, _ = await communicator.connect()
+        self.assertTrue(connected)
+        self.assertEqual((await communicator.receive_json_from())['event'], 'notification.unread')
+        return communicator
+
+    def test_push_reaches_only_the_recipient(self):
+        owner = User.objects.create_user(username='owner')
+        other = User.objects.create_user(username='other')
+
+        async def run():
+            owner_socket, other_socket = await self.connect(owner), await self.connect(other)
+            await database_sync_to_async(Notification.objects.create)(
+                recipient=owner, notification_type='system', title='Hi', message='x')
+            frame = await owner_socket.receive_json_from()
+            other_silent = await other_socket.receive_nothing(0.2)
+            for communicator in (owner_socket, other_socket):
+                await communicator.disconnect()
+            return frame, other_silent
+
+        frame, other_silent = async_to_sync(run)()
+        self.assertEqual((frame['topic'], frame['event']), (f'user:{owner.id}', 'notification.created'))
+        self.assertEqual(frame['data']['notification']['title'], 'Hi')
+        self.assertTrue(other_silent)
@@ -1,12 +1,14 @@
 from django.urls import path, include
 from rest_framework.routers import DefaultRouter
 from . import views
+from products.views.feeds import ProductFeedViewSet
 
 router = DefaultRouter()
 router.register(r'products', views.ProductViewSet)
 router.register(r'wishlist', views.WishlistViewSet, basename='wishlist')
 router.register(r'sellers', views.SellerViewSet)
 router.register(r'categories', views.CategoryViewSet, basename='category')
+router.register(r'feed', ProductFeedViewSet, basename='feed')
 
 urlpatterns = [
     path('sellers/rate/', views.rate_seller, name='rate-seller'),
@@ -57,6 +59,7 @@ urlpatterns = [
     path('payments/webhook/', views.dusupay_webhook, name='dusupay-webhook'),
     path('payments/status/<int:order_id>/', views.order_status, name='order-status'),
     path('payments/health/', views.dusupay_health, name='dusupay-health'),
+    path('cache/stats/', views.product_cache_stats, name='product-cache-stats'),
 
     path('sellers/<int:seller_id>/follow/', views.toggle_follow_seller, name='toggle-follow-seller'),    
     # Notification URLs 
@@ -8,7 +8,7 @@ from .serializers import (
     ProductSerializer, CategorySerializer, WishlistItemSerializer, CartSerializer,
     CartItemSerializer, ProductCommentSerializer, SellerSerializer, BuyerRegisterSerializer,
     SellerRegisterSerializer, QuickDealSerializer, SellerProfileSerializer, SellerProductSerializer,
-    SellerOrderSerializer, SellerQuickDealSerializer, SellerStatsSerializer )
+    SellerOrderSerializer, SellerQuickDealSerializer, SellerStatsSerializer, NearbySellerSerializer )
 from rest_framework.permissions import AllowAny
 from django.contrib.auth import authenticate
 from rest_framework_simplejwt.tokens import RefreshToken
@@ -16,14 +16,31 @@ from django.contrib.auth.models import User
 from django.db.models import Q
 import traceback 
 from django.db import models
-from .utils import reverse_geocode
+from . import geocoding
 from django.db.models import Avg
 import json
 import logging
+import os
 from .serializers import InitiatePaymentSerializer, DusuPayWebhookSerializer  
 logger = logging.getLogger('dusupay')
 from django.shortcuts import get_object_or_404
 from .permissions import IsSeller, IsBuyer, IsOwner
+from .pagination import (
+    ProductKeysetPagination, OrderKeysetPagination, NotificationKeysetPagination,
+    CommentKeysetPagination, HelpfulCommentKeysetPagination,
+)
+from . import cache as product_cache
+from . import counters
+from .inventory import adjust_stock
+from .ratings import submit_rating
+from .reconciliation import next_check_delay
+from .webhooks import enqueue as enqueue_webhook
+from . import notifications as notification_push
+from .notifications import simple_notification_payload
+from products.services.feed_scores import schedule_refresh as schedule_feed_refresh
+from products.services.nearby import nearest_sellers, parse_nearby_query
+from products.services.ratings import apply_rating_change
+from products.services import search as product_search
 from rest_framework import filters
 from django.shortcuts import redirect
 from django.conf import settings
@@ -38,7 +55,6 @@ from .models import Notification
 from .serializers import NotificationSerializer
 import logging
 from .dusupay_utils import DusuPayClient
-from .models import DusuPayConfig
 
 from django.contrib.auth import update_session_auth_hash
 from django.contrib.auth.password_validation import validate_password
@@ -102,62 +118,32 @@ def create_seller_profile_notification(user, field_name):
     print(f"✓ Seller profile update notification created for {user.username}: {display_name}")
 
 def get_cart(request):
-    if request.user.is_authenticated and hasattr(request.user, 'buyer_profile'):
-        buyer = request.user.buyer_profile
-        carts = Cart.objects.filter(buyer=buyer)
-        if carts.exists():
-            if carts.count() > 1:
-                primary_cart = carts.first()
-                for extra_cart in carts[1:]:
-                    for item in extra_cart.items.all():
-                        cart_item, created = CartItem.objects.get_or_create(
-                            cart=primary_cart,
-                            product=item.product,
-                            defaults={'quantity': item.quantity, 'answers': item.answers}
-                        )
-                        if not created:
-                            cart_item.quantity += item.quantity
-                            cart_item.save()
-                    extra_cart.delete()
-                return primary_cart
-            else:
-                return carts.first()
-        else:
-            return Cart.objects.create(buyer=buyer)
-    else:
-        session_key = request.session.session_key or request.session.create()
-        carts = Cart.objects.filter(session_key=session_key)
-        if carts.exists():
-            if carts.count() > 1:
-                primary_cart = carts.first()
-                for extra_cart in carts[1:]:
-                    for item in extra_cart.items.all():
-                        cart_item, created = CartItem.objects.get_or_create(
-                            cart=primary_cart,
-                            product=item.product,
-                            defaults={'quantity': item.quantity, 'answers': item.answers}
-                        )
-                        if not created:
-                            cart_item.quantity += item.quantity
-                            cart_item.save()
-                    extra_cart.delete()
-                return primary_cart
-            else:
-                return carts.first()
-        else:
-            return Cart.objects.create(session_key=session_key)
+    """
+    Resolve the caller's cart with one lookup on the unique buyer /
+    session_key column (plus an INSERT the first time). The result is
+    memoized on the request so views calling this twice don't re-query.
+    Legacy duplicate carts are merged offline by `manage.py dedupe_carts`.
+    """
+    http_request = getattr(request, '_request', request)
+    cart = getattr(http_request, '_trendsync_cart', None)
+    if cart is not None:
+        return cart
 
-@api_view(['POST'])
-@permission_classes([permissions.IsAuthenticated, IsBuyer])
-def create_order_from_cart(request):
-    cart = get_cart(request)
-    if not cart.items.exists():
-        return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+    buyer = None
+    if request.user.is_authenticated:
+        buyer = getattr(request.user, 'buyer_profile', None)
 
-    buyer = request.user.buyer_profile
-    total_amount = sum(item.subtotal() for item in cart.items.all())
+    if buyer is not None:
+        cart, _ = Cart.objects.get_or_create(buyer=buyer)
+    else:
+        if not request.session.session_key:
+            request.session.create()
+        cart, _ = Cart.objects.get_or_create(session_key=request.session.session_key)
+
+    http_request._trendsync_cart = cart
+    return cart
 
-    # Use default address or create one
+def get_default_address(buyer):
     address = buyer.addresses.filter(is_default=True).first()
     if not address:
         address = Address.objects.create(
@@ -173,24 +159,67 @@ def create_order_from_cart(request):
             is_default=True
         )
         logger.info(f"Temporary address created for buyer {buyer.id}")
+    return address
 
-    order = Order.objects.create(
-        buyer=buyer,
-        total_amount=total_amount,
-        status='pending',
-        delivery_address=address,
-    )
 
-    for cart_item in cart.items.all():
-        OrderItem.objects.create(
-            order=order,
-            product=cart_item.product,
-            quantity=cart_item.quantity,
-            unit_price=cart_item.product.unit_price,
-            subtotal=cart_item.subtotal()
+@api_view(['POST'])
+@permission_classes([permissions.IsAuthenticated, IsBuyer])
+def create_order_from_cart(request):
+    """
+    Checkout runs as one transaction with a fixed number of queries:
+    cart lines and their products are loaded (and locked) together, order
+    items are bulk inserted and stock is reserved with one conditional UPDATE.
+    """
+    cart = get_cart(request)
+    buyer = request.user.buyer_profile
+
+    with transaction.atomic():
+        cart_items = list(cart.items.select_related('product').select_for_update())
+        if not cart_items:
+            return Response({'error': 'Cart is empty'}, status=status.HTTP_400_BAD_REQUEST)
+
+        quantities = {}
+        for item in cart_items:
+            quantities[item.product_id] = quantities.get(item.product_id, 0) - item.quantity
+
+        short = [
+            item.product_id for item in cart_items
+            if item.product.stock_quantity < item.quantity
+        ]
+        if short or not adjust_stock(quantities):
+            transaction.set_rollback(True)
+            return Response({
+                'error': 'Insufficient stock',
+                'product_ids': short or list(quantities),
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        total_amount = sum(item.subtotal() for item in cart_items)
+
+        # Use default address or create one
+        address = get_default_address(buyer)
+
+        order = Order.objects.create(
+            buyer=buyer,
+            total_amount=total_amount,
+            status='pending',
+            delivery_address=address,
         )
 
-    cart.items.all().delete()
+        OrderItem.objects.bulk_create([
+            OrderItem(
+                order=order,
+                product=item.product,
+                quantity=item.quantity,
+                unit_price=item.product.unit_price,
+                subtotal=item.subtotal()
+            )
+            for item in cart_items
+        ])
+
+        CartItem.objects.filter(cart=cart).delete()
+
+        products = [item.product for item in cart_items]
+        transaction.on_commit(lambda: product_cache.invalidate_products(products))
 
     return Response({'order_id': order.id}, status=status.HTTP_201_CREATED)
 
@@ -311,11 +340,21 @@ class CategoryViewSet(viewsets.ReadOnlyModelViewSet):
 
 
 
+class ProductSearchFilter(filters.BaseFilterBackend):
+    """?search= matched through the product search index instead of icontains scans."""
+
+    def filter_queryset(self, request, queryset, view):
+        text = request.query_params.get('search', '').strip()
+        if not text:
+            return queryset
+        return queryset.filter(id__in=product_search.get_backend().matches(text).values('id'))
+
+
 class ProductViewSet(viewsets.ModelViewSet):
     queryset = Product.objects.all()
     serializer_class = ProductSerializer
-    filter_backends = [filters.SearchFilter, DjangoFilterBackend]
-    search_fields = ['name', 'description']
+    pagination_class = ProductKeysetPagination
+    filter_backends = [ProductSearchFilter, DjangoFilterBackend]
     filterset_fields = ['category']
 
     def perform_create(self, serializer):
@@ -329,23 +368,97 @@ class ProductViewSet(viewsets.ModelViewSet):
                 return Product.objects.filter(seller=self.request.user.seller_profile)
         return Product.objects.all()
 
+    def get_list_cache_key(self):
+        # Only the plain and per-category listings are cached; search and
+        # paginated requests always hit the database.
+        params = set(self.request.query_params)
+        if not params:
+            return product_cache.ALL_PRODUCTS_KEY
+        category_id = self.request.query_params.get('category', '')
+        if params == {'category'} and category_id.isdigit():
+            return product_cache.category_products_key(category_id)
+        return None
+
+    def list(self, request, *args, **kwargs):
+        key = self.get_list_cache_key()
+        if key is None:
+            return super().list(request, *args, **kwargs)
+
+        def build():
+            queryset = self.filter_queryset(self.get_queryset())
+            return list(self.get_serializer(queryset, many=True).data)
+
+        data, hit = product_cache.fetch(key, build)
+        response = Response(product_cache.personalize_products(request, data))
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    def retrieve(self, request, *args, **kwargs):
+        key = product_cache.product_key(kwargs[self.lookup_field])
+        data, hit = product_cache.fetch(key, lambda: dict(self.get_serializer(self.get_object()).data))
+        response = Response(product_cache.personalize_products(request, [data])[0])
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
+    @action(detail=False, methods=['get'])
+    def search(self, request):
+        """
+        Products matching ?q=, best match first, with category and price
+        facets. Narrow with ?category=&min_price=&max_price= and page with
+        ?limit=&offset=; the last word matches as a prefix.
+        """
+        try:
+            text, category_id, min_price, max_price, limit, offset = \
+                product_search.parse_search_query(request.query_params)
+        except ValueError:
+            return Response({'error': 'category, min_price, max_price, limit and offset must be integers'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        if not text:
+            return Response({'error': 'q is required'}, status=status.HTTP_400_BAD_REQUEST)
+        products, total = product_search.search_products(
+            text, category_id=category_id, min_price=min_price, max_price=max_price, limit=limit, offset=offset
+        )
+        return Response({
+            'count': total,
+            'results': self.get_serializer(products, many=True).data,
+            'facets': product_search.search_facets(
+                text, category_id=category_id, min_price=min_price, max_price=max_price
+            ),
+        })
+
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """Typeahead: product names matching ?q= as a prefix."""
+        return Response(product_search.suggest(request.query_params.get('q', '')))
+
     @action(detail=True, methods=['post'], permission_classes=[permissions.IsAuthenticated])
     def like(self, request, pk=None):
         product = self.get_object()
         buyer = request.user.buyer_profile
         like, created = ProductLike.objects.get_or_create(product=product, buyer=buyer)
         if created:
-            product.like_count += 1
-            product.save()
+            counters.increment(product, 'like_count')
+            # The F() update skips post_save, so drop the cached like_count here.
+            transaction.on_commit(lambda: product_cache.invalidate_product(product))
         return Response({'status': 'liked' if created else 'already liked'})
 
     @action(detail=True, methods=['get', 'post'], permission_classes=[AllowAny])
     def comments(self, request, pk=None):
         product = self.get_object()
         if request.method == 'GET':
-            comments = product.comments.all().order_by('-created_at')
-            serializer = ProductCommentSerializer(comments, many=True, context={'request': request})
-            return Response(serializer.data)
+            # ?ordering=helpful for most helpful first; ?page_size= / ?cursor= to paginate.
+            if request.query_params.get('ordering') == 'helpful':
+                paginator = HelpfulCommentKeysetPagination()
+            else:
+                paginator = CommentKeysetPagination()
+            comments = product.comments.select_related('buyer')
+            page = paginator.paginate_queryset(comments, request, view=self)
+            if page is None:
+                comments = comments.order_by(*paginator.ordering)
+                serializer = ProductCommentSerializer(comments, many=True, context={'request': request})
+                return Response(serializer.data)
+            serializer = ProductCommentSerializer(page, many=True, context={'request': request})
+            return paginator.get_paginated_response(serializer.data)
         elif request.method == 'POST':
             if not request.user.is_authenticated:
                 return Response({'error': 'Authentication required'}, status=401)
@@ -356,7 +469,10 @@ class ProductViewSet(viewsets.ModelViewSet):
 
             serializer = ProductCommentSerializer(data=request.data, context={'request': request})
             if serializer.is_valid():
-                serializer.save(product=product, buyer=buyer)
+                with transaction.atomic():
+                    comment = serializer.save(product=product, buyer=buyer)
+                    apply_rating_change(product.id, comment.rating, 1)
+                    transaction.on_commit(lambda: product_cache.invalidate_product(product))
                 return Response(serializer.data, status=201)
             return Response(serializer.errors, status=400)
 
@@ -393,6 +509,18 @@ class SellerViewSet(viewsets.ReadOnlyModelViewSet):
     queryset = Seller.objects.all()
     serializer_class = SellerSerializer
 
+    @action(detail=False, methods=['get'])
+    def nearby(self, request):
+        """Sellers within ?radius_km= of ?lat=&lng=, nearest first (?type=dynamic|static)."""
+        try:
+            lat, lng, radius_km, limit = parse_nearby_query(request.query_params)
+        except (KeyError, ValueError):
+            return Response({'error': 'lat and lng are required and must be valid coordinates'},
+                            status=status.HTTP_400_BAD_REQUEST)
+        sellers = nearest_sellers(lat, lng, radius_km=radius_km, limit=limit,
+                                  location_type=request.query_params.get('type'))
+        return Response(NearbySellerSerializer(sellers, many=True, context={'request': request}).data)
+
 
 @api_view(['POST'])
 @permission_classes([AllowAny])
@@ -446,6 +574,7 @@ def verify_token_view(request):
 
 class LikedProductsView(generics.ListAPIView):
     serializer_class = ProductSerializer
+    pagination_class = ProductKeysetPagination
     permission_classes = [permissions.IsAuthenticated]
 
     def get_queryset(self):
@@ -460,21 +589,21 @@ def toggle_product_like(request, product_id):
         buyer = request.user.buyer_profile
         product = Product.objects.get(id=product_id)
 
-        like_exists = ProductLike.objects.filter(product=product, buyer=buyer).exists()
+        deleted, _ = ProductLike.objects.filter(product=product, buyer=buyer).delete()
 
-        if like_exists:
-            ProductLike.objects.filter(product=product, buyer=buyer).delete()
-            product.like_count -= 1
-            product.save()
+        if deleted:
+            counters.decrement(product, 'like_count')
+            transaction.on_commit(lambda: product_cache.invalidate_product(product))
             return Response({
                 'status': 'unliked',
                 'liked': False,
                 'like_count': product.like_count
             }, status=status.HTTP_200_OK)
         else:
-            ProductLike.objects.create(product=product, buyer=buyer)
-            product.like_count += 1
-            product.save()
+            _, created = ProductLike.objects.get_or_create(product=product, buyer=buyer)
+            if created:
+                counters.increment(product, 'like_count')
+                transaction.on_commit(lambda: product_cache.invalidate_product(product))
             return Response({
                 'status': 'liked',
                 'liked': True,
@@ -816,10 +945,24 @@ class SellerProfileView(generics.RetrieveUpdateAPIView):
 class SellerProductListCreateView(generics.ListCreateAPIView):
     permission_classes = [permissions.IsAuthenticated, IsSeller]
     serializer_class = SellerProductSerializer
+    pagination_class = ProductKeysetPagination
 
     def get_queryset(self):
         return Product.objects.filter(seller=self.request.user.seller_profile)
 
+    def list(self, request, *args, **kwargs):
+        if request.query_params:
+            return super().list(request, *args, **kwargs)
+
+        seller = request.user.seller_profile
+        data, hit = product_cache.fetch(
+            product_cache.seller_products_key(seller.id),
+            lambda: list(self.get_serializer(self.get_queryset(), many=True).data),
+        )
+        response = Response(data)
+        response['X-Cache'] = 'HIT' if hit else 'MISS'
+        return response
+
     def perform_create(self, serializer):
         serializer.save(seller=self.request.user.seller_profile)
 
@@ -835,6 +978,7 @@ class SellerProductDetailView(generics.RetrieveUpdateDestroyAPIView):
 class SellerOrderListView(generics.ListAPIView):
     permission_classes = [permissions.IsAuthenticated, IsSeller]
     serializer_class = SellerOrderSerializer
+    pagination_class = OrderKeysetPagination
 
     def get_queryset(self):
         seller = self.request.user.seller_profile
@@ -909,12 +1053,20 @@ def comment_detail(request, comment_id):
     if request.method == 'PUT':
         serializer = ProductCommentSerializer(comment, data=request.data, partial=True, context={'request': request})
         if serializer.is_valid():
-            serializer.save()
+            old_rating = comment.rating
+            with transaction.atomic():
+                serializer.save()
+                if comment.rating != old_rating:
+                    apply_rating_change(comment.product_id, comment.rating - old_rating, 0)
+                    transaction.on_commit(lambda: product_cache.invalidate_product(comment.product))
             return Response(serializer.data)
         return Response(serializer.errors, status=400)
 
     elif request.method == 'DELETE':
-        comment.delete()
+        with transaction.atomic():
+            comment.delete()
+            apply_rating_change(comment.product_id, -comment.rating, -1)
+            transaction.on_commit(lambda: product_cache.invalidate_product(comment.product))
         return Response({'message': 'Comment deleted'}, status=204)
 
 
@@ -928,8 +1080,7 @@ def mark_helpful(request, comment_id):
 
     helpful, created = CommentHelpful.objects.get_or_create(comment=comment, user=request.user)
     if created:
-        comment.helpful_votes += 1
-        comment.save()
+        counters.increment(comment, 'helpful_votes')
         return Response({'status': 'marked helpful', 'helpful_votes': comment.helpful_votes})
     else:
         return Response({'status': 'already marked helpful'}, status=400)
@@ -1001,6 +1152,8 @@ def initiate_payment(request):
     if response['success']:
         order.dusupay_internal_reference = response['internal_reference']
         order.dusupay_merchant_reference = response['merchant_reference']
+        # Give the webhook a head start before the reconciler polls.
+        order.next_reconcile_at = timezone.now() + next_check_delay(0)
         order.save()
 
         # For card payments, return redirect URL to frontend
@@ -1048,65 +1201,9 @@ def dusupay_webhook(request):
     event = serializer.validated_data['event']
     payload = serializer.validated_data['payload']
 
-    # Update config to track webhook receipt
-    config, _ = DusuPayConfig.objects.get_or_create(pk=1)
-    config.webhook_received_at = timezone.now()
-    config.save()
-
-    merchant_reference = payload.get('merchant_reference')
-    internal_reference = payload.get('internal_reference')
-
-    # Find the order
-    try:
-        if merchant_reference:
-            order = Order.objects.get(id=merchant_reference)
-        elif internal_reference:
-            order = Order.objects.get(dusupay_internal_reference=internal_reference)
-        else:
-            logger.warning("No reference found in webhook payload")
-            return Response({"status": "ok"}, status=200)
-    except Order.DoesNotExist:
-        logger.error(f"Order not found for merchant_reference: {merchant_reference}")
-        return Response({"status": "ok"}, status=200)
-
-    transaction_status = payload.get('transaction_status', '').upper()
-
-    if event == 'transaction.completed' or transaction_status == 'COMPLETED':
-        # Payment successful
-        order.status = 'paid'
-        order.payment_method = payload.get('provider_code', payload.get('bank_code', 'card'))
-        order.save()
-
-        Payment.objects.update_or_create(
-            order=order,
-            defaults={
-                'amount': payload.get('request_amount', order.total_amount),
-                'payment_method': payload.get('provider_code', payload.get('bank_code', 'card')),
-                'payment_status': 'successful',
-                'transaction_reference': internal_reference,
-                'gateway_response': json.dumps(payload),
-                'payment_date': timezone.now()
-            }
-        )
-        logger.info(f"Order {order.id} marked as paid via DusuPay")
-
-    elif event == 'transaction.failed' or transaction_status == 'FAILED':
-        # Payment failed
-        order.status = 'cancelled'
-        order.save()
-
-        Payment.objects.update_or_create(
-            order=order,
-            defaults={
-                'amount': payload.get('request_amount', order.total_amount),
-                'payment_method': payload.get('provider_code', payload.get('bank_code', 'card')),
-                'payment_status': 'failed',
-                'transaction_reference': internal_reference,
-                'gateway_response': json.dumps(payload),
-                'payment_date': timezone.now()
-            }
-        )
-        logger.info(f"Order {order.id} payment failed")
+    # Acknowledge with a single insert; process_webhooks applies it later.
+    if not enqueue_webhook(event, payload):
+        logger.warning("No reference found in webhook payload")
 
     return Response({"status": "ok"}, status=200)
 
@@ -1118,18 +1215,9 @@ def order_status(request, order_id):
         order = Order.objects.get(id=order_id, buyer=request.user.buyer_profile)
     except Order.DoesNotExist:
         return Response({'error': 'Order not found'}, status=status.HTTP_404_NOT_FOUND)
-    
-    # If payment is pending, check status with DusuPay
-    if order.status == 'pending' and order.dusupay_internal_reference:
-        status_response = dusupay_client.check_transaction_status(order.dusupay_internal_reference)
-        if status_response['success']:
-            if status_response['status'] == 'COMPLETED':
-                order.status = 'paid'
-                order.save()
-            elif status_response['status'] == 'FAILED':
-                order.status = 'cancelled'
-                order.save()
-    
+
+    # Pending payments are settled by the webhook or, failing that, by the
+    # reconciliation worker (manage.py reconcile_payments), never inline.
     return Response({
         'status': order.status,
         'dusupay_internal_reference': order.dusupay_internal_reference
@@ -1141,15 +1229,26 @@ def dusupay_health(request):
     """
     Health check for DusuPay API
     """
-    try:
-        # Simple test request to check connectivity
-        response = dusupay_client.check_transaction_status('test')
-        return Response({"status": "healthy", "message": "DusuPay API is reachable"}, status=200)
-    except Exception as e:
-        logger.error(f"DusuPay health check failed: {str(e)}")
-        return Response({"status": "unhealthy", "message": str(e)}, status=503)
+    # Simple test request to check connectivity; fails fast while the
+    # client's circuit breaker is open.
+    response = dusupay_client.check_transaction_status('test')
+    details = dusupay_client.health()
+    if response['success']:
+        return Response({"status": "healthy", "message": "DusuPay API is reachable", **details}, status=200)
+    logger.error(f"DusuPay health check failed: {response['error']}")
+    return Response({"status": "unhealthy", "message": response['error'], **details}, status=503)
 
 
+
+@api_view(['GET'])
+@permission_classes([permissions.IsAdminUser])
+def product_cache_stats(request):
+    """
+    Hit/miss counters of the product cache. They are kept per process, so
+    each worker reports its own; the pid tells them apart.
+    """
+    return Response({'pid': os.getpid(), **product_cache.stats.snapshot()})
+
 @api_view(['POST'])
 @permission_classes([permissions.IsAuthenticated])
 def toggle_follow_seller(request, seller_id):
@@ -1233,8 +1332,8 @@ def toggle_follow_seller(request, seller_id):
             if follow:
                 # Unfollow
                 follow.delete()
-                seller.followers = max(0, seller.followers - 1)
-                seller.save(update_fields=['followers'])
+                counters.decrement(seller, 'followers')
+                schedule_feed_refresh(seller_ids=[seller.id])
                 following = False
                 message = 'Unfollowed seller'
                 print("Unfollowed")
@@ -1249,8 +1348,8 @@ def toggle_follow_seller(request, seller_id):
             else:
                 # Follow
                 SellerFollow.objects.create(buyer=buyer, seller=seller)
-                seller.followers += 1
-                seller.save(update_fields=['followers'])
+                counters.increment(seller, 'followers')
+                schedule_feed_refresh(seller_ids=[seller.id])
                 following = True
                 message = 'Followed seller'
                 print("Followed")
@@ -1302,53 +1401,32 @@ def toggle_follow_seller(request, seller_id):
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_notifications(request):
-    try:
-        # Check if Notification model exists and table exists
-        from django.db import connection
-        from .models import Notification
-        
-        # Check if table exists
-        with connection.cursor() as cursor:
-            cursor.execute("SELECT name FROM sqlite_master WHERE type='table' AND name='trendsync_notification';")
-            table_exists = cursor.fetchone()
-        
-        if not table_exists:
-            # Return empty notifications if table doesn't exist
-            return Response({
-                'status': 'success',
-                'data': [],
-                'unread_count': 0,
-                'message': 'Notifications table not created yet'
-            })
-        
-        # Get notifications for the user
-        notifications = Notification.objects.filter(recipient=request.user).order_by('-created_at')
-        serializer = NotificationSerializer(notifications, many=True)
-        
-        # Count unread
-        unread_count = notifications.filter(read=False).count()
-        
-        return Response({
-            'status': 'success',
-            'data': serializer.data,
-            'unread_count': unread_count
-        })
-        
-    except Exception as e:
-        print(f"Error in get_notifications: {e}")
-        return Response({
-            'status': 'success',
-            'data': [],
-            'unread_count': 0
-        })
+    """
+    Newest notifications first, NotificationKeysetPagination.page_size at a
+    time; follow `next` for older ones. unread_count is read from the
+    user's NotificationCounter row.
+    """
+    paginator = NotificationKeysetPagination()
+    page = paginator.paginate_queryset(Notification.objects.filter(recipient=request.user), request)
+    serializer = NotificationSerializer(page, many=True)
+
+    return Response({
+        'status': 'success',
+        'data': serializer.data,
+        'unread_count': notification_push.unread_counts(request.user.id)[notification_push.NOTIFICATIONS],
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    })
     
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_notification_read(request, notification_id):
     try:
         notification = Notification.objects.get(id=notification_id, recipient=request.user)
-        notification.read = True
-        notification.save()
+        if not notification.read:
+            notification.read = True
+            notification.save(update_fields=['read'])
+            notification_push.notifications_read(notification_push.NOTIFICATIONS, request.user.id, [notification.id], 1)
         return Response({'status': 'success'})
     except Notification.DoesNotExist:
         return Response({'status': 'error', 'message': 'Notification not found'}, status=404)
@@ -1356,7 +1434,8 @@ def mark_notification_read(request, notification_id):
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_all_notifications_read(request):
-    Notification.objects.filter(recipient=request.user, read=False).update(read=True)
+    count = Notification.objects.filter(recipient=request.user, read=False).update(read=True)
+    notification_push.notifications_read(notification_push.NOTIFICATIONS, request.user.id, None, count)
     return Response({'status': 'success'})
 
 @api_view(['DELETE'])
@@ -1364,7 +1443,11 @@ def mark_all_notifications_read(request):
 def delete_notification(request, notification_id):
     try:
         notification = Notification.objects.get(id=notification_id, recipient=request.user)
+        was_unread = not notification.read
         notification.delete()
+        notification_push.notifications_deleted(
+            notification_push.NOTIFICATIONS, request.user.id, [notification_id], int(was_unread)
+        )
         return Response({'status': 'success'})
     except Notification.DoesNotExist:
         return Response({'status': 'error', 'message': 'Notification not found'}, status=404)
@@ -1372,53 +1455,28 @@ def delete_notification(request, notification_id):
 @api_view(['DELETE'])
 @permission_classes([IsAuthenticated])
 def clear_all_notifications(request):
+    # Unread rows first so the pushed delta is exact.
+    unread, _ = Notification.objects.filter(recipient=request.user, read=False).delete()
     Notification.objects.filter(recipient=request.user).delete()
+    notification_push.notifications_deleted(notification_push.NOTIFICATIONS, request.user.id, None, unread)
     return Response({'status': 'success'})
 
 @api_view(['GET'])
 @permission_classes([IsAuthenticated])
 def get_simple_notifications(request):
-    try:
-        from .models import SimpleNotification
-        
-        notifications = SimpleNotification.objects.filter(recipient=request.user).order_by('-created_at')
-        unread_count = notifications.filter(read=False).count()
-        
-        data = []
-        for note in notifications:
-            # Set title based on type
-            if note.type == 'follow':
-                title = 'New Follower'
-            elif note.type == 'follow_confirmation':
-                title = 'Follow Confirmation'
-            else:
-                title = 'Notification'
-            
-            data.append({
-                'id': note.id,
-                'notification_type': note.type,
-                'title': title,
-                'message': note.message,
-                'read': note.read,
-                'created_at': note.created_at.isoformat(),
-                'data': {
-                    'sender_name': note.sender_name
-                }
-            })
-        
-        return Response({
-            'status': 'success',
-            'data': data,
-            'unread_count': unread_count
-        })
-        
-    except Exception as e:
-        print(f"Error in get_simple_notifications: {e}")
-        return Response({
-            'status': 'success',
-            'data': [],
-            'unread_count': 0
-        })
+    from .models import SimpleNotification
+
+    paginator = NotificationKeysetPagination()
+    page = paginator.paginate_queryset(SimpleNotification.objects.filter(recipient=request.user), request)
+
+    return Response({
+        'status': 'success',
+        # Same shape as the notification.created push
+        'data': [simple_notification_payload(note) for note in page],
+        'unread_count': notification_push.unread_counts(request.user.id)[notification_push.SIMPLE],
+        'next': paginator.get_next_link(),
+        'previous': paginator.get_previous_link(),
+    })
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
@@ -1426,8 +1484,10 @@ def mark_simple_notification_read(request, notification_id):
     try:
         from .models import SimpleNotification
         note = SimpleNotification.objects.get(id=notification_id, recipient=request.user)
-        note.read = True
-        note.save()
+        if not note.read:
+            note.read = True
+            note.save(update_fields=['read'])
+            notification_push.notifications_read(notification_push.SIMPLE, request.user.id, [note.id], 1)
         return Response({'status': 'success'})
     except:
         return Response({'status': 'error'}, status=404)
@@ -1437,7 +1497,10 @@ def mark_simple_notification_read(request, notification_id):
 def delete_simple_notification(request, notification_id):
     try:
         from .models import SimpleNotification
-        SimpleNotification.objects.get(id=notification_id, recipient=request.user).delete()
+        note = SimpleNotification.objects.get(id=notification_id, recipient=request.user)
+        was_unread = not note.read
+        note.delete()
+        notification_push.notifications_deleted(notification_push.SIMPLE, request.user.id, [notification_id], int(was_unread))
         return Response({'status': 'success'})
     except:
         return Response({'status': 'error'}, status=404)
@@ -1446,14 +1509,18 @@ def delete_simple_notification(request, notification_id):
 @permission_classes([IsAuthenticated])
 def clear_simple_notifications(request):
     from .models import SimpleNotification
+    # Unread rows first so the pushed delta is exact.
+    unread, _ = SimpleNotification.objects.filter(recipient=request.user, read=False).delete()
     SimpleNotification.objects.filter(recipient=request.user).delete()
+    notification_push.notifications_deleted(notification_push.SIMPLE, request.user.id, None, unread)
     return Response({'status': 'success'})
 
 @api_view(['POST'])
 @permission_classes([IsAuthenticated])
 def mark_all_simple_notifications_read(request):
     from .models import SimpleNotification
-    SimpleNotification.objects.filter(recipient=request.user, read=False).update(read=True)
+    count = SimpleNotification.objects.filter(recipient=request.user, read=False).update(read=True)
+    notification_push.notifications_read(notification_push.SIMPLE, request.user.id, None, count)
     return Response({'status': 'success'})
 
 @api_view(['POST'])
@@ -1707,13 +1774,9 @@ def update_seller_profile(request):
 @permission_classes([IsAuthenticated, IsBuyer])
 def rate_seller(request):
     """
-    Simple rating system - stores rating as a notification
+    Rate a seller 1-5. Each buyer has one rating per seller (rating again
+    replaces it); seller trust is the average on a 0-100 scale.
     """
-    print("=" * 50)
-    print("RATE SELLER VIEW HIT!")
-    print(f"Request data: {request.data}")
-    print("=" * 50)
-    
     try:
         seller_id = request.data.get('seller_id')
         rating = request.data.get('rating')  # 1-5
@@ -1724,14 +1787,15 @@ def rate_seller(request):
             return Response({
                 'error': 'Seller ID and rating are required'
             }, status=status.HTTP_400_BAD_REQUEST)
-        
-        # Get the seller
+
         try:
-            seller = Seller.objects.get(id=seller_id)
-        except Seller.DoesNotExist:
+            rating = int(rating)
+        except (TypeError, ValueError):
+            rating = 0
+        if not 1 <= rating <= 5:
             return Response({
-                'error': 'Seller not found'
-            }, status=status.HTTP_404_NOT_FOUND)
+                'error': 'Rating must be a whole number from 1 to 5'
+            }, status=status.HTTP_400_BAD_REQUEST)
         
         # Get the buyer
         try:
@@ -1740,8 +1804,18 @@ def rate_seller(request):
             return Response({
                 'error': 'Buyer profile not found'
             }, status=status.HTTP_403_FORBIDDEN)
+
+        try:
+            seller, _ = submit_rating(
+                buyer, seller_id, rating,
+                comment=comment or '',
+                order_id=int(order_id) if str(order_id or '').isdigit() else None,
+            )
+        except (Seller.DoesNotExist, ValueError):
+            return Response({
+                'error': 'Seller not found'
+            }, status=status.HTTP_404_NOT_FOUND)
         
-        # Create a notification for the rating (using SimpleNotification)
         from .models import SimpleNotification
         
         # Notification for the seller
@@ -1760,43 +1834,11 @@ def rate_seller(request):
             type='review_confirmation'
         )
         
-        # Update seller's trust rating (simple average)
-        # Get all review notifications for this seller
-        all_reviews = SimpleNotification.objects.filter(
-            recipient=seller.user,
-            type='review'
-        )
-        
-        # Extract ratings from messages (this is a bit hacky but simple)
-        ratings = []
-        for review in all_reviews:
-            # Look for pattern like "rated your service X/5"
-            import re
-            match = re.search(r'rated your service (\d+)/5', review.message)
-            if match:
-                ratings.append(int(match.group(1)))
-        
-        # Add current rating
-        ratings.append(int(rating))
-        
-        # Calculate average
-        if ratings:
-            avg_rating = sum(ratings) / len(ratings)
-            trust_percentage = round(avg_rating * 20)
-        else:
-            trust_percentage = 0
-        
-        # Update seller's trust field
-        seller.trust = trust_percentage
-        seller.save()
-        
-        print(f"Seller trust updated to: {trust_percentage}% based on {len(ratings)} ratings")
-        
         return Response({
             'success': True,
             'message': 'Rating submitted successfully',
-            'seller_trust': trust_percentage,
-            'ratings_count': len(ratings)
+            'seller_trust': seller.trust,
+            'ratings_count': seller.rating_count
         }, status=status.HTTP_200_OK)
         
     except Exception as e:
@@ -1923,18 +1965,26 @@ def update_seller_location(request):
             seller.location_accuracy = float(accuracy)
         seller.location_updated_at = timezone.now()
 
-        # Now reverse_geocode is imported from utils
-        seller.location_address = reverse_geocode(lat, lng)
-
-        seller.save()
+        # Reverse geocoding never blocks the update: a cached cell fills the
+        # address now, otherwise the previous address is kept until the
+        # background lookup writes the new one.
+        address = geocoding.cached_address(seller.location_lat, seller.location_lng)
+        update_fields = ['location_lat', 'location_lng']
+        if address is not None:
+            seller.location_address = address
+            update_fields.append('location_address')
+        seller.save(update_fields=update_fields)
+        if address is None:
+            geocoding.schedule_seller_address(seller.id, seller.location_lat, seller.location_lng)
 
         return Response({
             "success": True,
             "lat": seller.location_lat,
             "lng": seller.location_lng,
-            "accuracy_m": seller.location_accuracy,
+            "accuracy_m": getattr(seller, 'location_accuracy', None),
             "updated_at": seller.location_updated_at,
             "address": seller.location_address,
+            "address_pending": address is None,
         })
     except Exception as e:
         return Response({"error": str(e)}, status=400)
@@ -0,0 +1,155 @@
+"""
+Batch processing of the DusuPay webhook inbox (DusuPayWebhookEvent).
+
+Deliveries are acknowledged with one INSERT by the webhook view and then
+applied here, by `manage.py process_webhooks --loop N`. Processing is
+idempotent. The inbox drops repeated deliveries. An event is applied only
+while the order is still in a state it can move out of, so replays and
+late or out-of-order events leave the order alone. Events that fail, or
+whose order isn't committed yet, are retried with exponential backoff.
+"""
+import logging
+from datetime import timedelta
+
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import DusuPayConfig, DusuPayWebhookEvent, Order
+from .reconciliation import mark_order_failed, mark_order_paid
+
+logger = logging.getLogger('dusupay')
+
+WEBHOOK_BATCH_SIZE = 200
+WEBHOOK_MAX_ATTEMPTS = 5
+# Retry delays double from WEBHOOK_BACKOFF up to WEBHOOK_BACKOFF_CAP seconds.
+WEBHOOK_BACKOFF = 10
+WEBHOOK_BACKOFF_CAP = 600
+
+PAID_STATUSES = {'paid', 'shipped', 'delivered', 'refunded'}
+
+
+def inbox_key(payload):
+    """(internal_reference, merchant_reference) used to store a delivery."""
+    merchant_reference = str(payload.get('merchant_reference') or '')
+    internal_reference = payload.get('internal_reference') or ''
+    if not internal_reference and merchant_reference:
+        internal_reference = f'merchant:{merchant_reference}'
+    return internal_reference, merchant_reference
+
+
+def enqueue(event, payload):
+    """
+    Store a delivery in the inbox with a single INSERT. Returns False when
+    the payload carries no reference at all. A repeated
+    (internal_reference, event) is silently ignored.
+    """
+    internal_reference, merchant_reference = inbox_key(payload)
+    if not internal_reference:
+        return False
+    DusuPayWebhookEvent.objects.bulk_create([
+        DusuPayWebhookEvent(
+            internal_reference=internal_reference,
+            merchant_reference=merchant_reference,
+            event=event,
+            payload=payload,
+        )
+    ], ignore_conflicts=True)
+    return True
+
+
+def apply_event(order, event):
+    transaction_status = (event.payload.get('transaction_status') or '').upper()
+    if event.event == 'transaction.completed' or transaction_status == 'COMPLETED':
+        if order.status not in PAID_STATUSES:
+            mark_order_paid(order, event.payload)
+    elif event.event == 'transaction.failed' or transaction_status == 'FAILED':
+        # A late "failed" must not cancel an order that has since been paid.
+        if order.status == 'pending':
+            mark_order_failed(order, event.payload)
+
+
+def next_attempt_delay(attempts):
+    return timedelta(seconds=min(WEBHOOK_BACKOFF_CAP, WEBHOOK_BACKOFF * 2 ** (attempts - 1)))
+
+
+def _schedule_retry(event, error, now):
+    event.attempts += 1
+    event.last_error = error
+    event.next_attempt_at = now + next_attempt_delay(event.attempts)
+    if event.attempts >= WEBHOOK_MAX_ATTEMPTS:
+        logger.error(f"Giving up on webhook {event.id} after {event.attempts} attempts: {error}")
+
+
+def _orders_for(events):
+    order_ids = {int(e.merchant_reference) for e in events if e.merchant_reference.isdigit()}
+    references = {e.internal_reference for e in events if not e.merchant_reference.isdigit()}
+    orders = Order.objects.select_for_update()
+    by_id = orders.in_bulk(order_ids)
+    by_reference = {
+        order.dusupay_internal_reference: order
+        for order in orders.filter(dusupay_internal_reference__in=references)
+    }
+
+    def lookup(event):
+        if event.merchant_reference.isdigit():
+            return by_id.get(int(event.merchant_reference))
+        return by_reference.get(event.internal_reference)
+    return lookup
+
+
+def process_webhook_inbox(batch_size=WEBHOOK_BATCH_SIZE):
+    """
+    Apply one batch of unprocessed inbox events, oldest first.
+
+    Each event runs in its own savepoint. A failing event, or one whose
+    order can't be found yet (the webhook can beat the checkout commit),
+    stays pending and is retried after a backoff, up to
+    WEBHOOK_MAX_ATTEMPTS. Neither blocks the rest of the batch.
+    """
+    summary = {'processed': 0, 'failed': 0, 'orphaned': 0}
+    now = timezone.now()
+    with transaction.atomic():
+        events = list(
+            DusuPayWebhookEvent.objects
+            .filter(processed_at__isnull=True, attempts__lt=WEBHOOK_MAX_ATTEMPTS)
+            .filter(Q(next_attempt_at__isnull=True) | Q(next_attempt_at__lte=now))
+            .select_for_update(skip_locked=True)
+            .order_by('id')[:batch_size]
+        )
+        if not events:
+            return summary
+
+        order_for = _orders_for(events)
+        done, retry = [], []
+        for event in events:
+            order = order_for(event)
+            if order is None:
+                logger.warning(f"Order not found yet for webhook {event.event} {event.internal_reference}")
+                summary['orphaned'] += 1
+                _schedule_retry(event, 'Order not found', now)
+                retry.append(event)
+                continue
+            try:
+                with transaction.atomic():
+                    apply_event(order, event)
+            except Exception as exc:
+                logger.exception(f"Failed to apply webhook {event.id}")
+                summary['failed'] += 1
+                _schedule_retry(event, str(exc), now)
+                retry.append(event)
+                # The order instance may be half-updated; reload it for
+                # any later event in this batch.
+                order.refresh_from_db()
+            else:
+                done.append(event.id)
+
+        DusuPayWebhookEvent.objects.filter(id__in=done).update(processed_at=timezone.now())
+        DusuPayWebhookEvent.objects.bulk_update(retry, ['attempts', 'next_attempt_at', 'last_error'])
+
+        # One write per batch instead of one per delivery.
+        last_received = max(event.received_at for event in events)
+        DusuPayConfig.objects.update_or_create(pk=1, defaults={'webhook_received_at': last_received})
+
+    summary['processed'] = len(done)
+    return summary
@@ -0,0 +1,37 @@
+from urllib.parse import parse_qs
+
+from channels.auth import AuthMiddlewareStack
+from channels.db import database_sync_to_async
+from channels.middleware import BaseMiddleware
+from django.contrib.auth.models import AnonymousUser
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import InvalidToken, AuthenticationFailed, TokenError
+
+
+@database_sync_to_async
+def get_user_for_token(raw_token):
+    authentication = JWTAuthentication()
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed, TokenError):
+        return AnonymousUser()
+
+
+class JWTAuthMiddleware(BaseMiddleware):
+    """
+    Authenticates WebSocket connections with the same access tokens as the
+    REST API, passed as `?token=<access>` (browsers cannot set headers on a
+    WebSocket handshake). Without a token the session user is kept.
+    """
+
+    async def __call__(self, scope, receive, send):
+        query = parse_qs(scope.get('query_string', b'').decode())
+        token = query.get('token', [None])[0]
+        if token:
+            scope = dict(scope)
+            scope['user'] = await get_user_for_token(token)
+        return await super().__call__(scope, receive, send)
+
+
+def JWTAuthMiddlewareStack(inner):
+    return AuthMiddlewareStack(JWTAuthMiddleware(inner))